@@ -0,0 +1,68 @@
+"""Compare two result files saved by the benchmarks, e.g. before and after a change.
+
+Prints every result with its relative change and fails if a result got worse
+by more than ``--tolerance`` (throughput lower, latency, CPU time or memory higher).
+
+    python benchmarks/compare.py before.json after.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import sys
+
+# results not listed are only printed
+HIGHER_IS_BETTER = ("per_sec",)
+LOWER_IS_BETTER = ("_ms", "_s", "_mb")
+
+
+def direction(name: str) -> int:
+    """1 if a higher value is better, -1 if lower is better, 0 if neither."""
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def load(path: str) -> dict:
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare(before: dict, after: dict, tolerance: float) -> list[str]:
+    """Print the comparison, return names of regressed results."""
+    if before["benchmark"] != after["benchmark"]:
+        raise ValueError(f"different benchmarks: {before['benchmark']} and {after['benchmark']}")
+    for name in sorted(set(before["params"]) | set(after["params"])):
+        if before["params"].get(name) != after["params"].get(name):
+            print(f"warning: {name} differs: {before['params'].get(name)} -> {after['params'].get(name)}")
+
+    regressions = []
+    print(f"{'':>16} {'before':>12} {'after':>12} {'change':>8}")
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change * direction(name) > tolerance
+        if worse:
+            regressions.append(name)
+        print(f"{name:>16} {old:>12} {new:>12} {change:>+8.1%}{'  worse' if worse else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", help="baseline results")
+    parser.add_argument("after", help="results to check")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    regressions = compare(load(args.before), load(args.after), args.tolerance)
+    if regressions:
+        print(f"regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
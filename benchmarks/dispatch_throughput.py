@@ -0,0 +1,109 @@
+"""Throughput of IRCServer with inline and sharded message dispatch.
+
+Starts an in-process server for every requested number of dispatch workers,
+registers pairs of clients and lets every sender flood PRIVMSGs to its
+receiver. Reports delivered messages per second.
+
+    python benchmarks/dispatch_throughput.py --pairs 8 --messages 5000 --workers 0 1 2 4
+"""
+
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from psirc.server import IRCServer, CONNECTION_MODES
+
+
+def serve(config_file: str, mode: str, workers: int, ports: "multiprocessing.Queue[int]") -> None:
+    logging.basicConfig(level=logging.ERROR)
+    server = IRCServer(
+        "bench.server", "127.0.0.1", 0, config_file=config_file, connection_mode=mode, dispatch_workers=workers
+    )
+    ports.put(server._connection._socket.getsockname()[1])
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        server.start()
+
+
+def start_server(config_file: str, mode: str, workers: int) -> tuple[multiprocessing.Process, int]:
+    """Run server in a separate process, so it does not share the interpreter with the clients."""
+    ports: multiprocessing.Queue[int] = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(config_file, mode, workers, ports), daemon=True)
+    process.start()
+    port = ports.get()
+    time.sleep(0.2)
+    return process, port
+
+
+def register(port: int, nickname: str) -> socket.socket:
+    client = socket.create_connection(("127.0.0.1", port))
+    client.sendall(f"NICK {nickname}\r\nUSER {nickname} host server :Benchmark client\r\n".encode())
+    welcome = b""
+    while b"\r\n" not in welcome:
+        welcome += client.recv(4096)
+    return client
+
+
+def receive(client: socket.socket, expected: int, done: threading.Barrier) -> None:
+    received = 0
+    leftover = b""
+    while received < expected:
+        data = leftover + client.recv(65536)
+        received += data.count(b"\r\n")
+        leftover = data[data.rfind(b"\r\n") + 2 :]
+    done.wait()
+
+
+def run(port: int, pairs: int, messages: int) -> float:
+    tag = os.urandom(3).hex()
+    senders = [register(port, f"s{tag}{idx}") for idx in range(pairs)]
+    receivers = [register(port, f"r{tag}{idx}") for idx in range(pairs)]
+    done = threading.Barrier(pairs + 1)
+    readers = [threading.Thread(target=receive, args=(client, messages, done)) for client in receivers]
+    for reader in readers:
+        reader.start()
+
+    payloads = [
+        "".join(f"PRIVMSG r{tag}{idx} :message {number}\r\n" for number in range(messages)).encode()
+        for idx in range(pairs)
+    ]
+    start = time.perf_counter()
+    writers = [threading.Thread(target=client.sendall, args=(data,)) for client, data in zip(senders, payloads)]
+    for writer in writers:
+        writer.start()
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    for client in senders + receivers:
+        client.close()
+    return pairs * messages / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=8, help="number of sender/receiver pairs")
+    parser.add_argument("--messages", type=int, default=5000, help="messages sent by every sender")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="dispatch workers to compare")
+    parser.add_argument("--mode", choices=CONNECTION_MODES.keys(), default="selector")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as config:
+        config.write("I:*@*::\n")
+
+    print(f"{'workers':>8} {'msg/s':>12}")
+    for workers in args.workers:
+        process, port = start_server(config.name, args.mode, workers)
+        rate = run(port, args.pairs, args.messages)
+        process.terminate()
+        process.join()
+        print(f"{workers:>8} {rate:>12.0f}")
+    os.unlink(config.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Client registrations per second checked against a large set of I-lines.
+
+Compares PasswordHandler, which compiles I-lines into a HostMatcher, with the
+previous linear scan re-splitting every I-line for every client. Results of
+both are compared before timing.
+
+    python benchmarks/iline_match.py --ilines 10000 --clients 20000 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import timeit
+
+from psirc.password_handler import PasswordHandler
+
+
+class LinearPasswordHandler(PasswordHandler):
+    """PasswordHandler as it was before I-lines were compiled, kept for comparison."""
+
+    def valid_user_password(self, address: str, password: str | None) -> bool:
+        hostname, address = address.split("@")
+        addr_list = address.split(".")
+
+        for password_address_full in self._passwords["I"].keys():
+            password_hostname, password_addr = password_address_full.split("@")
+            valid_parts = 0
+            passwd_addr_list = password_addr.split(".")
+            for idx, passwd_addr_element in enumerate(passwd_addr_list):
+                if idx > len(addr_list) - 1:
+                    break
+                if passwd_addr_element == "*":
+                    valid_parts = len(passwd_addr_list)
+                    break
+                elif addr_list[idx] == passwd_addr_element:
+                    valid_parts += 1
+                    continue
+                break
+            if valid_parts == len(passwd_addr_list):
+                if password_hostname == "*" or password_hostname == hostname:
+                    return self._valid_password(password_address_full, password)
+        return False
+
+
+def config(count: int, rng: random.Random) -> str:
+    """I-lines for users, subnets and single hosts, anyone else gets in with a password."""
+    lines = []
+    for idx in range(count - 1):
+        kind = idx % 3
+        if kind == 0:
+            lines.append(f"I:user{idx}@10.{rng.randrange(256)}.*:pass{idx}:")
+        elif kind == 1:
+            lines.append(f"I:*@172.{rng.randrange(16, 32)}.{rng.randrange(256)}.*:pass{idx}:")
+        else:
+            lines.append(f"I:*@192.168.{rng.randrange(256)}.{rng.randrange(256)}::")
+    lines.append("I:*@*:default:")
+    return "\n".join(lines) + "\n"
+
+
+def clients(count: int, ilines: int, rng: random.Random) -> list[tuple[str, str]]:
+    result = []
+    for _ in range(count):
+        user = f"user{rng.randrange(ilines)}"
+        address = rng.choice(
+            (
+                f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                f"172.{rng.randrange(16, 32)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                f"192.168.{rng.randrange(256)}.{rng.randrange(256)}",
+                f"host{rng.randrange(1000)}.example.com",
+            )
+        )
+        password = rng.choice((None, "default", f"pass{rng.randrange(ilines)}"))
+        result.append((f"{user}@{address}", password))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ilines", type=int, default=10000, help="number of I-lines")
+    parser.add_argument("--clients", type=int, default=20000, help="number of checked clients")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions, best is reported")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as fp:
+        fp.write(config(args.ilines, rng))
+    try:
+        handlers = {"linear": LinearPasswordHandler(fp.name), "compiled": PasswordHandler(fp.name)}
+        for handler in handlers.values():
+            handler.parse_config()
+    finally:
+        os.unlink(fp.name)
+
+    checked = clients(args.clients, args.ilines, rng)
+    linear, compiled = handlers.values()
+    for address, password in checked[:2000]:
+        expected, result = linear.valid_user_password(address, password), compiled.valid_user_password(address, password)
+        if expected != result:
+            raise SystemExit(f"Handlers disagree on {address!r} {password!r}: {expected} != {result}")
+
+    results = {}
+    for name, handler in handlers.items():
+        # the linear scan is slow, a slice is enough to time it
+        sample = checked if name == "compiled" else checked[: max(1, args.clients // 20)]
+        best = min(
+            timeit.repeat(
+                lambda: [handler.valid_user_password(address, password) for address, password in sample],
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        results[name] = len(sample) / best
+
+    print(f"{'handler':>9} {'checks/s':>12}")
+    for name, rate in results.items():
+        print(f"{name:>9} {rate:>12.0f}")
+    print(f"speedup: {results['compiled'] / results['linear']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
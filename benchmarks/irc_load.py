@@ -0,0 +1,317 @@
+"""Throughput and delivery latency of IRCServer under synthetic client load.
+
+Simulated clients register with PASS/NICK/USER, join channels of ``--fanout``
+members and flood PRIVMSGs to their channel (and, with ``--direct``, to random
+users). Every message carries its send time, receivers record the delivery
+latency. The server runs in a child process, so that clients do not share its
+interpreter. Reports delivered messages per second, p50/p99 latency and CPU
+time and RSS of the server process. Results are saved as JSON, compare two
+result files with ``benchmarks/compare.py``.
+
+    python benchmarks/irc_load.py --clients 64 --fanout 8 --messages 500 --output load.json
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import selectors
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+
+from psirc.server import CONNECTION_MODES, IRCServer
+
+PASSWORD = "benchpw"
+RESULTS_VERSION = 1
+
+
+def serve(name: str, config_file: str, options: dict, ports: "multiprocessing.Queue[int]") -> None:
+    logging.basicConfig(level=logging.ERROR)
+    server = IRCServer(name, "127.0.0.1", 0, config_file=config_file, **options)
+    ports.put(server._connection._socket.getsockname()[1])
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        server.start()
+
+
+class ServerProcess:
+    """IRCServer running in a child process, with a config accepting PASS ``PASSWORD``.
+
+    :param name: server name
+    :param options: keyword arguments of ``IRCServer``
+    :param config: extra config lines, e.g. C-lines of linked servers
+    """
+
+    def __init__(self, name: str = "bench.server", options: dict | None = None, config: str = "") -> None:
+        self.name = name
+        with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as fp:
+            fp.write(f"I:*@*:{PASSWORD}:\nO:bench:benchpw:\n{config}")
+        self._config_file = fp.name
+        ports: multiprocessing.Queue[int] = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=serve, args=(name, self._config_file, options or {}, ports), daemon=True
+        )
+        self.process.start()
+        self.port = ports.get()
+        time.sleep(0.2)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def usage(self) -> tuple[float, int]:
+        return process_usage(self.pid)
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        os.unlink(self._config_file)
+
+
+def process_usage(pid: int) -> tuple[float, int]:
+    """CPU seconds and resident bytes of a process, zeros where ``/proc`` is not available."""
+    try:
+        with open(f"/proc/{pid}/stat") as fp:
+            fields = fp.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as fp:
+            resident_pages = int(fp.read().split()[1])
+    except OSError:
+        return 0.0, 0
+    # utime and stime are the 14th and 15th field, counted from after the command name
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu, resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass
+class LoadClient:
+    nickname: str
+    sock: socket.socket
+    channel: str = ""
+    received: int = 0
+    buffer: bytes = b""
+    latencies: list[float] = field(default_factory=list)
+
+
+def register(port: int, nickname: str, channels: tuple[str, ...] = (), password: str = PASSWORD) -> LoadClient:
+    """Connect and register a client, join channels, wait until the server answered all of it."""
+    sock = socket.create_connection(("127.0.0.1", port))
+    # the server does not answer PRIVMSGs, so delayed ACKs would stall every other write
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    joins = "".join(f"JOIN {channel}\r\n" for channel in channels)
+    sock.sendall(f"PASS {password}\r\nNICK {nickname}\r\nUSER {nickname} host server :Load client\r\n{joins}".encode())
+    client = LoadClient(nickname, sock, channels[0] if channels else "")
+    expect_line(client, f"001 {nickname} ")
+    for channel in channels:
+        # topic and names replies
+        expect_line(client, f" {channel} :")
+    return client
+
+
+def expect_line(client: LoadClient, marker: str, timeout: float = 10) -> None:
+    """Read until a line containing marker was received, drop everything received up to it."""
+    deadline = time.monotonic() + timeout
+    client.sock.settimeout(timeout)
+    encoded = marker.encode()
+    while (found := client.buffer.find(encoded)) == -1:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{client.nickname} did not receive {marker!r}")
+        data = client.sock.recv(65536)
+        if not data:
+            raise ConnectionError(f"{client.nickname} disconnected during registration")
+        client.buffer += data
+    end = client.buffer.find(b"\r\n", found)
+    client.buffer = client.buffer[end + 2 :] if end != -1 else b""
+    client.sock.settimeout(None)
+
+
+@dataclass
+class Receiver:
+    """Reads all clients on a single thread, records latency of every delivered PRIVMSG."""
+
+    clients: list[LoadClient]
+    expected: int
+    latencies: list[float] = field(default_factory=list)
+    received: int = 0
+
+    def run(self, timeout: float) -> None:
+        selector = selectors.DefaultSelector()
+        for client in self.clients:
+            client.sock.setblocking(False)
+            selector.register(client.sock, selectors.EVENT_READ, client)
+        deadline = time.monotonic() + timeout
+        latencies = self.latencies
+        while self.received < self.expected and time.monotonic() < deadline:
+            for key, _ in selector.select(timeout=0.5):
+                client = key.data
+                try:
+                    data = client.sock.recv(262144)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    selector.unregister(client.sock)
+                    continue
+                now = time.perf_counter_ns()
+                data = client.buffer + data
+                end = data.rfind(b"\r\n")
+                client.buffer = data[end + 2 :]
+                for line in data[:end].split(b"\r\n"):
+                    if b" PRIVMSG " not in line:
+                        continue
+                    latency = (now - int(line.rsplit(b" ", 1)[1])) / 1e6
+                    latencies.append(latency)
+                    client.latencies.append(latency)
+                    client.received += 1
+                    self.received += 1
+        selector.close()
+
+
+def plan_load(clients: list[LoadClient], messages: int, direct: float) -> tuple[list[list[str]], int]:
+    """Pick the target of every message up front.
+
+    :return: targets of every client and the number of deliveries expected
+    """
+    rng = random.Random(0)
+    members: dict[str, int] = {}
+    for client in clients:
+        members[client.channel] = members.get(client.channel, 0) + 1
+    plan = []
+    expected = 0
+    for client in clients:
+        targets = []
+        for _ in range(messages):
+            if direct and rng.random() < direct:
+                target = rng.choice(clients).nickname
+                expected += 1
+            else:
+                # channel messages go to every other member
+                target = client.channel
+                expected += members[client.channel] - 1
+            targets.append(target)
+        plan.append(targets)
+    return plan, expected
+
+
+def send_load(senders: list[LoadClient], plan: list[list[str]], pipeline: int) -> None:
+    """Send planned PRIVMSGs from every sender, ``pipeline`` lines per write, round robin."""
+    messages = len(plan[0]) if plan else 0
+    for sent in range(0, messages, pipeline):
+        for client, targets in zip(senders, plan):
+            lines = [
+                f"PRIVMSG {targets[number]} :{client.nickname} {number} {time.perf_counter_ns()}\r\n"
+                for number in range(sent, min(sent + pipeline, messages))
+            ]
+            client.sock.sendall("".join(lines).encode())
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(path: str, benchmark: str, params: dict, results: dict) -> None:
+    """Save results in the format read by ``benchmarks/compare.py``."""
+    document = {
+        "version": RESULTS_VERSION,
+        "benchmark": benchmark,
+        "params": params,
+        "environment": environment(),
+        "results": results,
+    }
+    with open(path, "w") as fp:
+        json.dump(document, fp, indent=2)
+        fp.write("\n")
+
+
+def run(args: argparse.Namespace) -> dict:
+    options = {
+        "connection_mode": args.mode,
+        "dispatch_workers": args.workers,
+        # threaded connections take a worker of the pool each
+        "max_workers": args.clients + 4,
+    }
+    server = ServerProcess(options=options)
+    try:
+        channels = [f"#load{idx}" for idx in range(-(-args.clients // args.fanout))]
+        clients = [
+            register(server.port, f"load{idx}", (channels[idx // args.fanout],)) for idx in range(args.clients)
+        ]
+        plan, expected = plan_load(clients, args.messages, args.direct)
+
+        receiver = Receiver(clients, expected)
+        reader = threading.Thread(target=receiver.run, args=(args.timeout,))
+        reader.start()
+        cpu_before, _ = server.usage()
+        start = time.perf_counter()
+        send_load(clients, plan, args.pipeline)
+        reader.join()
+        elapsed = time.perf_counter() - start
+        cpu_after, rss = server.usage()
+        for client in clients:
+            client.sock.close()
+    finally:
+        server.stop()
+
+    if receiver.received < expected:
+        print(f"warning: {expected - receiver.received} of {expected} messages not delivered", file=sys.stderr)
+    return {
+        "sent": args.clients * args.messages,
+        "delivered": receiver.received,
+        "elapsed_s": round(elapsed, 3),
+        "msgs_per_sec": round(receiver.received / elapsed, 1),
+        "latency_p50_ms": round(percentile(receiver.latencies, 0.5), 3),
+        "latency_p99_ms": round(percentile(receiver.latencies, 0.99), 3),
+        "latency_max_ms": round(max(receiver.latencies, default=0), 3),
+        "server_cpu_s": round(cpu_after - cpu_before, 3),
+        "server_rss_mb": round(rss / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=64, help="number of simulated clients")
+    parser.add_argument("--fanout", type=int, default=8, help="members of every channel")
+    parser.add_argument("--messages", type=int, default=500, help="messages sent by every client")
+    parser.add_argument("--direct", type=float, default=0.0, help="fraction of messages sent to a random user")
+    parser.add_argument("--pipeline", type=int, default=10, help="messages written at once by a client")
+    parser.add_argument("--mode", choices=CONNECTION_MODES.keys(), default="selector")
+    parser.add_argument("--workers", type=int, default=0, help="dispatch workers of the server")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for all deliveries")
+    parser.add_argument("--output", help="save results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    for name, value in results.items():
+        print(f"{name:>16} {value:>12}")
+    if args.output:
+        params = {name: value for name, value in vars(args).items() if name not in ("output", "timeout")}
+        save_results(args.output, "irc_load", params, results)
+
+
+if __name__ == "__main__":
+    main()
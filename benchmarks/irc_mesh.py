@@ -0,0 +1,228 @@
+"""Server to server routing of IRCServers linked into a network.
+
+Starts ``--servers`` servers, every one in a child process, and links them with
+CONNECT into a chain (every server to the previous one) or a binary tree (every
+server to its parent). Every server has ``--fanout`` clients in ``#mesh``, the
+last one also ``--users`` clients in ``#burst``. A watcher on the first server
+(the root) is in both channels. Measures:
+
+* burst - from CONNECT of the last server until the watcher saw all its users join
+* latency of PRIVMSGs from the root to a user on every server, by hop count
+* fan-out - PRIVMSGs to ``#mesh``, delivered to members on all servers
+* netsplit - from killing the last server until the watcher saw all its users quit,
+  and recovery - from CONNECT of its replacement until it is reachable again
+
+    python benchmarks/irc_mesh.py --servers 4 --topology chain --users 200 --output mesh.json
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+
+from irc_load import LoadClient, Receiver, ServerProcess, percentile, register, save_results
+
+from psirc.server import CONNECTION_MODES
+
+LINK_PASSWORD = "linkpw"
+TOPOLOGIES = ("chain", "tree")
+
+
+def parent(index: int, topology: str) -> int:
+    return index - 1 if topology == "chain" else (index - 1) // 2
+
+
+def hops(index: int, topology: str) -> int:
+    """Servers between the root and server ``index``, the root itself is 0 hops away."""
+    return index if topology == "chain" else int(math.log2(index + 1))
+
+
+def wait_lines(client: LoadClient, marker: str, count: int, timeout: float) -> float:
+    """Read until ``count`` lines containing marker were received.
+
+    :return: time the last of them was received, ``time.perf_counter()``
+    """
+    deadline = time.monotonic() + timeout
+    encoded = marker.encode()
+    client.sock.settimeout(timeout)
+    seen = 0
+    while True:
+        end = client.buffer.rfind(b"\r\n")
+        if end != -1:
+            seen += sum(encoded in line for line in client.buffer[:end].split(b"\r\n"))
+            client.buffer = client.buffer[end + 2 :]
+        if seen >= count:
+            client.sock.settimeout(None)
+            return time.perf_counter()
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{client.nickname} received {seen} of {count} lines with {marker!r}")
+        data = client.sock.recv(262144)
+        if not data:
+            raise ConnectionError(f"{client.nickname} disconnected")
+        client.buffer += data
+
+
+class Mesh:
+    """Servers of the benchmark and clients registered on them.
+
+    :param args: command line arguments
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.options = {
+            "connection_mode": args.mode,
+            "dispatch_workers": args.workers,
+            # threaded connections take a worker of the pool each
+            "max_workers": args.users + args.fanout + 8,
+        }
+        self.servers: list[ServerProcess] = []
+        self.members: list[list[LoadClient]] = []
+        self.burst_users: list[LoadClient] = []
+        self.watcher: LoadClient | None = None
+
+    def start(self, index: int) -> ServerProcess:
+        """Start server ``index`` and register its clients, server is not linked yet."""
+        server = ServerProcess(f"mesh{index}.server", self.options, f"C:127.0.0.1:{LINK_PASSWORD}:\n")
+        members = [register(server.port, f"m{index}u{idx}", ("#mesh",)) for idx in range(self.args.fanout)]
+        if index == len(self.servers):
+            self.servers.append(server)
+            self.members.append(members)
+        else:
+            self.servers[index] = server
+            self.members[index] = members
+        return server
+
+    def link(self, index: int) -> float:
+        """Link server ``index`` to its parent, wait until the watcher saw its users join.
+
+        :return: seconds from sending CONNECT until all JOINs were received
+        """
+        server = self.servers[index]
+        uplink = self.servers[parent(index, self.args.topology)]
+        operator = register(server.port, f"oper{index}")
+        joins = len(self.members[index]) + (len(self.burst_users) if index == len(self.servers) - 1 else 0)
+        start = time.perf_counter()
+        operator.sock.sendall(f"OPER bench benchpw\r\nCONNECT 127.0.0.1 {uplink.port}\r\n".encode())
+        assert self.watcher
+        end = wait_lines(self.watcher, " JOIN #", joins, self.args.timeout)
+        operator.sock.close()
+        return end - start
+
+    def close(self) -> None:
+        for client in [*self.burst_users, *(client for members in self.members for client in members)]:
+            client.sock.close()
+        for server in self.servers:
+            if server.process.is_alive():
+                server.stop()
+
+
+def measure_latency(mesh: Mesh, messages: int, channel: bool) -> dict:
+    """Send PRIVMSGs from the root, to every server's first member or to ``#mesh``.
+
+    :return: p50 and p99 latency by hop count, delivered messages per second
+    """
+    sender = mesh.members[0][0]
+    if channel:
+        receivers = [client for members in mesh.members for client in members if client is not sender]
+        lines = [f"PRIVMSG #mesh :{sender.nickname} {{}} {{}}\r\n"] * messages
+    else:
+        receivers = [members[0] for members in mesh.members[1:]]
+        lines = [f"PRIVMSG {receivers[idx % len(receivers)].nickname} :{{}} {{}}\r\n" for idx in range(messages)]
+    expected = len(receivers) * messages if channel else messages
+    for client in receivers:
+        client.latencies.clear()
+
+    receiver = Receiver(receivers, expected)
+    reader = threading.Thread(target=receiver.run, args=(mesh.args.timeout,))
+    reader.start()
+    start = time.perf_counter()
+    for sent in range(0, messages, mesh.args.pipeline):
+        batch = lines[sent : sent + mesh.args.pipeline]
+        sender.sock.sendall("".join(line.format(sent + idx, time.perf_counter_ns()) for idx, line in enumerate(batch)).encode())
+    reader.join()
+    elapsed = time.perf_counter() - start
+    for client in receivers:
+        client.sock.setblocking(True)
+
+    by_hops: dict[int, list[float]] = {}
+    for index, members in enumerate(mesh.members):
+        for client in members:
+            if client in receivers:
+                by_hops.setdefault(hops(index, mesh.args.topology), []).extend(client.latencies)
+    if receiver.received < expected:
+        print(f"warning: {expected - receiver.received} of {expected} messages not delivered", file=sys.stderr)
+    results = {"delivered": receiver.received, "msgs_per_sec": round(receiver.received / elapsed, 1)}
+    for distance, latencies in sorted(by_hops.items()):
+        results[f"hop{distance}_p50_ms"] = round(percentile(latencies, 0.5), 3)
+        results[f"hop{distance}_p99_ms"] = round(percentile(latencies, 0.99), 3)
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    mesh = Mesh(args)
+    results: dict = {}
+    try:
+        root = mesh.start(0)
+        mesh.watcher = register(root.port, "watcher", ("#mesh", "#burst"))
+        for index in range(1, args.servers):
+            mesh.start(index)
+        last = len(mesh.servers) - 1
+        mesh.burst_users = [register(mesh.servers[last].port, f"burst{idx}", ("#burst",)) for idx in range(args.users)]
+        for index in range(1, last):
+            mesh.link(index)
+        results["burst_s"] = round(mesh.link(last), 3)
+
+        for name, value in measure_latency(mesh, args.messages, channel=False).items():
+            results[f"direct_{name}"] = value
+        for name, value in measure_latency(mesh, args.messages, channel=True).items():
+            results[f"channel_{name}"] = value
+
+        # netsplit: the last server goes down with all its users
+        users = len(mesh.members[last]) + len(mesh.burst_users)
+        start = time.perf_counter()
+        mesh.servers[last].stop()
+        results["netsplit_s"] = round(wait_lines(mesh.watcher, " QUIT ", users, args.timeout) - start, 3)
+        for client in [*mesh.members[last], *mesh.burst_users]:
+            client.sock.close()
+        mesh.burst_users = []
+
+        # recovery: a replacement links and its users are reachable from the root
+        mesh.start(last)
+        start = time.perf_counter()
+        mesh.link(last)
+        probe = mesh.members[last][0]
+        mesh.members[0][0].sock.sendall(f"PRIVMSG {probe.nickname} :probe\r\n".encode())
+        results["recovery_s"] = round(wait_lines(probe, " PRIVMSG ", 1, args.timeout) - start, 3)
+    finally:
+        mesh.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", type=int, default=4, help="number of linked servers")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="chain")
+    parser.add_argument("--fanout", type=int, default=4, help="members of #mesh on every server")
+    parser.add_argument("--users", type=int, default=200, help="users introduced by the burst of the last server")
+    parser.add_argument("--messages", type=int, default=2000, help="PRIVMSGs sent by the root per measurement")
+    parser.add_argument("--pipeline", type=int, default=10, help="messages written at once")
+    parser.add_argument("--mode", choices=CONNECTION_MODES.keys(), default="selector")
+    parser.add_argument("--workers", type=int, default=0, help="dispatch workers of every server")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for every phase")
+    parser.add_argument("--output", help="save results as JSON")
+    args = parser.parse_args()
+    if args.servers < 2:
+        parser.error("--servers has to be at least 2")
+
+    results = run(args)
+    for name, value in results.items():
+        print(f"{name:>24} {value:>12}")
+    if args.output:
+        params = {name: value for name, value in vars(args).items() if name not in ("output", "timeout")}
+        save_results(args.output, "irc_mesh", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cost of per-message logging in the dispatch loop.
+
+Handles PRIVMSGs (to a user and to a channel of ``--members``) with an in-process
+IRCServer, replies go to socket pairs drained by the benchmark. Logging is
+configured with ``configure_logging`` in every mode, records go to a file:
+
+* sync - every message logged and written by the dispatching thread,
+  as with INFO logging of every message before
+* queued - every message logged, written by the listener thread
+* sampled - every ``--sample``-th message logged, written by the listener thread
+* off - per-message logs disabled (the default)
+
+    python benchmarks/logging_overhead.py --messages 50000 --repeat 3
+"""
+
+import argparse
+import os
+import socket
+import tempfile
+import timeit
+
+from psirc.log_config import configure_logging
+from psirc.send_queue import SendQueue
+from psirc.server import IRCServer
+
+MODES = {
+    "sync": {"messages": True, "queued": False},
+    "queued": {"messages": True},
+    "sampled": {"messages": True},
+    "off": {},
+}
+
+
+def connect(server: IRCServer, nickname: str, channel: str) -> tuple[socket.socket, socket.socket]:
+    """Register a user joined to channel with a socket pair.
+
+    Returns the end the server handles messages of and the end receiving its replies.
+    """
+    server_end, client_end = socket.socketpair()
+    SendQueue.attach(server_end, on_pending=lambda send_queue: None, on_exceeded=lambda send_queue: None)
+    server.handle_batch(
+        [(server_end, f"NICK {nickname}"), (server_end, f"USER {nickname} host server :Bench"), (server_end, f"JOIN {channel}")]
+    )
+    client_end.setblocking(False)
+    return server_end, client_end
+
+
+def drain(clients: list[socket.socket]) -> None:
+    for client in clients:
+        try:
+            while client.recv(1 << 20):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000, help="messages handled per run")
+    parser.add_argument("--members", type=int, default=8, help="members of the channel messages are sent to")
+    parser.add_argument("--sample", type=int, default=100, help="one of how many messages is logged when sampled")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode, the fastest is reported")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as fp:
+        fp.write("I:*@*::\n")
+    configure_logging(queued=False, stream=open(os.devnull, "w"))
+    server = IRCServer("bench.server", "127.0.0.1", 0, config_file=fp.name)
+    server.password_handler.parse_config()
+    ends = [connect(server, f"member{idx}", "#bench") for idx in range(args.members)]
+    sender = ends[0][0]
+    clients = [client_end for _, client_end in ends]
+    batch = [
+        (sender, "PRIVMSG #bench :hello channel" if idx % 2 else "PRIVMSG member1 :hello user")
+        for idx in range(server.BATCH_SIZE)
+    ]
+
+    def run() -> None:
+        for _ in range(args.messages // len(batch)):
+            server.handle_batch(batch)
+            drain(clients)
+
+    handled = args.messages // len(batch) * len(batch)
+    print(f"{'mode':>8} {'us/msg':>8} {'msgs/s':>10} {'records':>8}")
+    for mode, options in MODES.items():
+        with tempfile.TemporaryFile("w+") as log_file:
+            sample = args.sample if mode == "sampled" else 1
+            listener = configure_logging(stream=log_file, sample=sample, limit=1_000_000, **options)
+            best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            if listener:
+                listener.stop()
+            log_file.seek(0)
+            records = sum(1 for _ in log_file) // args.repeat
+        print(f"{mode:>8} {best / handled * 1e6:>8.2f} {handled / best:>10.0f} {records:>8}")
+    os.unlink(fp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Memory held per user and per received message.
+
+Compares the current slotted Message, Params, SessionInfo and Client types
+with the dict based classes they replaced. Objects are kept alive and the
+allocated memory is measured with tracemalloc.
+
+    python benchmarks/memory_footprint.py --users 50000 --messages 50000
+"""
+
+import argparse
+import socket
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from psirc.client import ExternalUser, LocalUser
+from psirc.defines.responses import Command
+from psirc.message import Prefix
+from psirc.message_parser import MessageParser
+from psirc.session_info import SessionInfo, SessionType
+
+
+class DictParams:
+    def __init__(self, params: dict[str, str] | None = None, *, recepient: str | None = None) -> None:
+        self.params = params if params else {}
+        self.recepient = recepient if recepient else ""
+        self._str = None
+
+
+@dataclass(kw_only=True)
+class DataclassMessage:
+    prefix: Prefix | None = field()
+    command: Command = field()
+    params: DictParams | None = field()
+    _wire: bytes | None = field(default=None, init=False)
+    _wire_key: tuple[str, Command, str] | None = field(default=None, init=False)
+
+
+class DictSessionInfo:
+    def __init__(self, password: str | None) -> None:
+        self.password = password
+        self.nickname = ""
+        self.username = ""
+        self.realname = ""
+        self.hops = 0
+        self.type = SessionType.UNKNOWN
+
+
+class DictLocalUser:
+    def __init__(self, nick: str, socket: socket.socket) -> None:
+        self._nick = nick
+        self._socket = socket
+        self.is_oper = False
+
+
+class DictExternalUser:
+    def __init__(self, nick: str, hop_count: int, location: str) -> None:
+        self._nick = nick
+        self._location = location
+        self._hop_count = hop_count
+
+
+def measure(count: int, create: Callable[[int], object]) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [create(idx) for idx in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del objects
+    return used / count
+
+
+def old_message(line: str) -> DataclassMessage | None:
+    """Build received message the way the previous parser did - eager prefix, dict params."""
+    message = MessageParser.parse_message(line)
+    if message is None:
+        return None
+    prefix = message.prefix
+    params = DictParams(message.params.params) if message.params else None
+    return DataclassMessage(prefix=prefix, command=message.command, params=params)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000, help="number of users")
+    parser.add_argument("--messages", type=int, default=50000, help="number of messages")
+    args = parser.parse_args()
+
+    sock = socket.socket()
+    nicks = [f"user{idx}" for idx in range(args.users)]
+
+    def local_user(new: bool) -> Callable[[int], object]:
+        session_type, user_type = (SessionInfo, LocalUser) if new else (DictSessionInfo, DictLocalUser)
+
+        def create(idx: int) -> object:
+            session_info = session_type("")
+            session_info.nickname = nicks[idx]
+            session_info.username = nicks[idx]
+            session_info.realname = "Real Name"
+            session_info.type = SessionType.USER
+            return session_info, user_type(nicks[idx], sock)
+
+        return create
+
+    def external_user(new: bool) -> Callable[[int], object]:
+        user_type = ExternalUser if new else DictExternalUser
+        return lambda idx: user_type(nicks[idx], 2, "remote.server")
+
+    # fresh strings, as if every message was decoded from the socket
+    lines = [
+        (
+            f":user{idx % 1000}!user@host.example.com PRIVMSG #channel{idx % 20} :message number {idx}"
+            if idx % 4 == 0
+            else f"PRIVMSG #channel{idx % 20} :message number {idx}"
+        )
+        for idx in range(args.messages)
+    ]
+
+    rows = [
+        ("local user", args.users, local_user(False), local_user(True)),
+        ("external user", args.users, external_user(False), external_user(True)),
+        ("message", args.messages, lambda idx: old_message(lines[idx]), lambda idx: MessageParser.parse_message(lines[idx])),
+    ]
+    print(f"{'bytes per':>14} {'before':>8} {'after':>8}")
+    for name, count, before, after in rows:
+        print(f"{name:>14} {measure(count, before):>8.0f} {measure(count, after):>8.0f}")
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
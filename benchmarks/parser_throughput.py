@@ -0,0 +1,132 @@
+"""Messages per second parsed by MessageParser and by the previous regex based parser.
+
+The corpus mixes client traffic (channel and private messages, joins, pings)
+with messages relayed by other servers, which carry a prefix. Results of both
+parsers are compared before timing.
+
+    python benchmarks/parser_throughput.py --lines 100000 --repeat 5
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import re
+import timeit
+
+from psirc.defines.responses import Command
+from psirc.irc_validator import IRCValidator
+from psirc.message import Message, Params, Prefix
+from psirc.message_parser import MessageParser
+from psirc.response_params import CMD_PARAMS, parametrize
+
+
+class RegexMessageParser:
+    """MessageParser as it was before the fast path, kept for comparison."""
+
+    message_regex = r"^(:(?P<prefix>\S+)\s)?(?P<cmd>\S+)(\s(?P<params>.*?))?(?:\s:(?P<trail>.*))?$"
+    prefix_regex = r"^(?P<nick>[^\s!.@]+)(!(?P<user>[^\s@!]+))?(@(?P<host>\S+))?$|^(?P<servername>\S+)$"
+
+    @classmethod
+    def _parse_prefix(cls, prefix: str) -> Prefix | None:
+        match = re.match(cls.prefix_regex, prefix)
+        if not match:
+            return None
+        if sender := match.group("servername"):
+            return Prefix(sender) if IRCValidator.validate_host(sender) else None
+        nick, user, host = match.group("nick", "user", "host")
+        if all((IRCValidator.validate_nick(nick), host is None or IRCValidator.validate_host(host))):
+            return Prefix(nick, user or "", host or "")
+        return None
+
+    @staticmethod
+    def _valid_command(command: str) -> Command | None:
+        if command.isdigit() and int(command) in Command:
+            return Command(int(command))
+        if command in Command.__members__:
+            return Command.__members__[command]
+        return None
+
+    @staticmethod
+    def _parse_params(command: Command, params: str, trail: str) -> Params | None:
+        if command not in CMD_PARAMS.keys():
+            return None
+        params_list = params.split()
+        params_list.append(trail) if trail else None
+        params_dict = {CMD_PARAMS[command][i]: param for i, param in enumerate(params_list)}
+        return parametrize(command, **params_dict)
+
+    @classmethod
+    def parse_message(cls, data: str) -> Message | None:
+        print(f"message parse: data: {data}")
+        match = re.match(cls.message_regex, data)
+        if not match:
+            return None
+        prefix, command, params, trailing = match.group("prefix", "cmd", "params", "trail")
+        prefix = cls._parse_prefix(prefix) if prefix else None
+        command = cls._valid_command(command)
+        if not command:
+            return None
+        params = cls._parse_params(command, params, trailing)
+        return Message(prefix=prefix, command=command, params=params)
+
+
+def corpus(lines: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    nicks = [f"user{idx}" for idx in range(200)]
+    channels = [f"#channel{idx}" for idx in range(20)]
+    words = "the quick brown fox jumps over the lazy dog while reading irc logs".split()
+
+    def text() -> str:
+        return " ".join(rng.choices(words, k=rng.randint(1, 12)))
+
+    templates = [
+        (50, lambda: f"PRIVMSG {rng.choice(channels)} :{text()}"),
+        (15, lambda: f"PRIVMSG {rng.choice(nicks)} :{text()}"),
+        (15, lambda: f":{rng.choice(nicks)}!user@host.example.com PRIVMSG {rng.choice(channels)} :{text()}"),
+        (5, lambda: f"PING client{rng.randint(0, 100)}"),
+        (5, lambda: f"PONG server{rng.randint(0, 100)}"),
+        (4, lambda: f"JOIN {rng.choice(channels)}"),
+        (3, lambda: f"PART {rng.choice(channels)}"),
+        (2, lambda: f":{rng.choice(nicks)} NICK {rng.choice(nicks)}x"),
+        (1, lambda: f"USER {rng.choice(nicks)} host server :{text()}"),
+    ]
+    weights = [weight for weight, _ in templates]
+    factories = [factory for _, factory in templates]
+    return [rng.choices(factories, weights)[0]() for _ in range(lines)]
+
+
+def summary(message: Message | None) -> tuple[str, Command, dict[str, str] | None] | None:
+    if message is None:
+        return None
+    return (str(message.prefix), message.command, message.params.params if message.params else None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000, help="size of the corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions, best is reported")
+    args = parser.parse_args()
+
+    lines = corpus(args.lines)
+    parsers = {"regex": RegexMessageParser.parse_message, "fast": MessageParser.parse_message}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for line in lines[:10000]:
+            expected, result = (summary(parse(line)) for parse in parsers.values())
+            if expected != result:
+                raise SystemExit(f"Parsers disagree on {line!r}: {expected} != {result}")
+
+        results = {}
+        for name, parse in parsers.items():
+            best = min(timeit.repeat(lambda: [parse(line) for line in lines], number=1, repeat=args.repeat))
+            results[name] = args.lines / best
+
+    print(f"{'parser':>8} {'msg/s':>12}")
+    for name, rate in results.items():
+        print(f"{name:>8} {rate:>12.0f}")
+    print(f"speedup: {results['fast'] / results['regex']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Cost of formatting numeric replies with ReplyTemplate and with parametrize.
+
+Formats replies sent on registration, JOIN and failed PRIVMSGs both ways:
+building Params with ``parametrize`` and serializing a Message, as replies were
+sent before, and filling in a precompiled ``REPLY_TEMPLATES`` entry. Results of
+both are compared before timing.
+
+    python benchmarks/reply_format.py --number 100000 --repeat 5
+"""
+
+import argparse
+import timeit
+
+from psirc.defines.responses import Command
+from psirc.message import Message
+from psirc.response_params import REPLY_TEMPLATES, parametrize
+
+REPLIES = [
+    (Command.RPL_WELCOME, {}),
+    (Command.RPL_TOPIC, {"channel": "#bench", "trailing": "No topic yet"}),
+    (Command.RPL_NAMREPLY, {"symbol": "=", "channel": "#bench", "trailing": "@alice +bob +carol +dave"}),
+    (Command.RPL_ENDOFNAMES, {"channel": "#bench"}),
+    (Command.ERR_NOSUCHNICK, {"nickname": "nobody"}),
+    (Command.ERR_NOTONCHANNEL, {"channel": "#elsewhere"}),
+]
+
+
+def with_parametrize(command: Command, values: dict[str, str]) -> bytes:
+    return Message(prefix=None, command=command, params=parametrize(command, recepient="alice", **values)).to_bytes()
+
+
+def with_template(command: Command, values: dict[str, str]) -> bytes | None:
+    return REPLY_TEMPLATES[command].format("", "alice", values)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000, help="replies formatted per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per method, the fastest is reported")
+    args = parser.parse_args()
+
+    for command, values in REPLIES:
+        assert with_parametrize(command, values) == with_template(command, values), command
+
+    print(f"{'reply':>18} {'parametrize us':>15} {'template us':>12} {'speedup':>8}")
+    for command, values in REPLIES:
+        timings = []
+        for method in (with_parametrize, with_template):
+            best = min(timeit.repeat(lambda: method(command, values), number=args.number, repeat=args.repeat))
+            timings.append(best / args.number * 1e6)
+        print(f"{command.name:>18} {timings[0]:>15.2f} {timings[1]:>12.2f} {timings[0] / timings[1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 import argparse
 import logging
 import os
-from psirc.server import IRCServer
+from psirc.server import IRCServer, CONNECTION_MODES
+from psirc.send_queue import SendQueue
+from psirc.throttle import RateLimit
+from psirc.ingress_queue import IngressQueue
+from psirc.log_config import configure_logging
 
 
 def main() -> None:
@@ -10,21 +14,112 @@ def main() -> None:
     parser.add_argument("-a", "--address", dest="server_addr", default="127.0.0.1")
     parser.add_argument("-p", "--port", dest="port", default="6667")
     parser.add_argument("-n", "--name", dest="name", default="PSIrcServer")
+    parser.add_argument(
+        "-m",
+        "--mode",
+        dest="mode",
+        choices=CONNECTION_MODES.keys(),
+        default="threaded",
+        help="threaded: one thread per connection, selector: all connections on one event loop",
+    )
+
+    parser.add_argument(
+        "--sendq",
+        dest="sendq",
+        type=int,
+        default=SendQueue.DEFAULT_LIMIT,
+        help="bytes waiting to be sent to a connection before it is dropped (SendQ exceeded)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=0,
+        help="handle messages of different connections on this many threads (0 - handle on the main thread)",
+    )
+
+    parser.add_argument(
+        "--accept-limit",
+        dest="accept_limit",
+        type=RateLimit.parse,
+        default=RateLimit(1, 5),
+        help="connections accepted from a single address, rate per second:burst (default 1:5)",
+    )
+    parser.add_argument(
+        "--command-limit",
+        dest="command_limit",
+        type=RateLimit.parse,
+        default=RateLimit(0.5, 5),
+        help="lines read from a single client, rate per second:burst (default 0.5:5, the RFC 1459 penalty clock)",
+    )
+    parser.add_argument(
+        "--ingress-limit",
+        dest="ingress_limit",
+        type=int,
+        default=IngressQueue.DEFAULT_LIMIT,
+        help="received lines waiting to be handled, a single connection may hold a tenth of them",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        dest="metrics_port",
+        type=int,
+        default=None,
+        help="serve metrics in the Prometheus text format on this localhost port",
+    )
+    parser.add_argument(
+        "--log-messages",
+        dest="log_messages",
+        action="store_true",
+        help="log every received, sent and forwarded message (slow, for debugging)",
+    )
+    parser.add_argument(
+        "--log-sample",
+        dest="log_sample",
+        type=int,
+        default=1,
+        help="with --log-messages, log only every n-th message",
+    )
+    parser.add_argument(
+        "--no-limits",
+        dest="no_limits",
+        action="store_true",
+        help="do not limit connections and commands",
+    )
 
     args = parser.parse_args()
 
     address = args.server_addr
     port = args.port
     name = args.name
+    mode = args.mode
+    sendq = args.sendq
+    workers = args.workers
 
-    # Configure logging
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    # Configure logging, records are written by a separate thread
+    log_listener = configure_logging(logging.INFO, messages=args.log_messages, sample=args.log_sample)
 
     conf_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "psirc.conf")
 
-    s = IRCServer(name, address, int(port), config_file=conf_file)
+    s = IRCServer(
+        name,
+        address,
+        int(port),
+        config_file=conf_file,
+        connection_mode=mode,
+        sendq=sendq,
+        dispatch_workers=workers,
+        accept_limit=None if args.no_limits else args.accept_limit,
+        command_limit=None if args.no_limits else args.command_limit,
+        ingress_limit=args.ingress_limit,
+        metrics_port=args.metrics_port,
+    )
 
-    s.start()
+    try:
+        s.start()
+    finally:
+        if log_listener:
+            log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,15 @@
+class Burst:
+    """
+    State introduced by a server link, applied at once when the burst ends
+
+    :field users: nickname, hop count and server name of every introduced user
+    :type users: ``list[tuple[str, int, str]]``
+    :field joins: channel name to nicknames of introduced members
+    :type joins: ``dict[str, list[str]]``
+    """
+
+    __slots__ = ("users", "joins")
+
+    def __init__(self) -> None:
+        self.users: list[tuple[str, int, str]] = []
+        self.joins: dict[str, list[str]] = {}
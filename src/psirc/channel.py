@@ -1,12 +1,43 @@
-import logging
+import socket
+import threading
+from collections.abc import Callable
+from typing import NamedTuple
 from psirc.defines.exceptions import BannedFromChannel, BadChannelKey, NotOnChannel, ChanopPrivIsNeeded
+from psirc.log_config import message_log
+
+
+class FanoutPlan(NamedTuple):
+    """
+    Sockets a message sent to a channel is written to
+
+    :field local: sockets of local members
+    :type local: ``tuple[socket.socket, ...]``
+    :field links: sockets of neighbouring servers behind which are members, by server name
+    :type links: ``dict[str, socket.socket]``
+    """
+
+    local: tuple[socket.socket, ...]
+    links: dict[str, socket.socket]
 
 
 class Channel:
     """Class representing channel
     Is used to perform channel operations
+    Membership changes are guarded by a lock, so channel can be used by many threads
+
+    Listing of members sent in RPL_NAMREPLY is cached, already split into chunks
+    fitting a single reply. Joining user is appended to the last chunk,
+    the listing is rebuilt on next use after a user parts.
+
+    Sockets messages to the channel are delivered to are cached as well,
+    until membership changes or ``invalidate_fanout`` is called on a server link change.
     """
 
+    # bytes of a RPL_NAMREPLY other than nicknames and channel name:
+    # server prefix (up to 63 characters), numeric, recipient nickname, symbol, separators and CR-LF
+    NAMREPLY_OVERHEAD = 85
+    MESSAGE_LIMIT = 512
+
     def __init__(self, name: str, chanop_nickname: str) -> None:
         self.name = name
         self.chanops = {chanop_nickname}
@@ -14,6 +45,9 @@ class Channel:
         self.banned_users: set[str] = set()
         self._key = ""
         self._topic = "No topic yet"
+        self._lock = threading.RLock()
+        self._names_chunks: list[str] | None = None
+        self._fanout: FanoutPlan | None = None
 
     @property
     def key(self) -> str:
@@ -42,15 +76,23 @@ class Channel:
         :rtype: None
 
         """
-        # TODO: add better handling banned users, and incorrect password
-        if nickname in self.banned_users:
-            raise BannedFromChannel
-
-        if key != self.key:
-            raise BadChannelKey
-
-        logging.info(f"{self.name}:{nickname} joined the channel")
-        self.users.add(nickname)
+        message_log.debug("%s:%s joined the channel", self.name, nickname)
+        # checked under the lock, so that a ban or key change made under it is not missed
+        with self._lock:
+            # TODO: add better handling banned users, and incorrect password
+            if nickname in self.banned_users:
+                raise BannedFromChannel
+
+            # key given to a channel without one is ignored
+            if self.key and key != self.key:
+                raise BadChannelKey
+
+            if nickname in self.users:
+                return
+            self.users.add(nickname)
+            self._fanout = None
+            if self._names_chunks is not None:
+                self._append_name(self._names_chunks, self._name_entry(nickname))
 
     def kick(self, nickname: str, kicked_nick: str) -> None:
         """Kick user from channel
@@ -68,7 +110,7 @@ class Channel:
             raise ChanopPrivIsNeeded(
                 f"Channel operator's privileges needed to perform KICK operation. {nickname} has no such privileges."
             )
-        logging.info(f"Kicking {nickname} from channel {self.name}")
+        message_log.debug("Kicking %s from channel %s", nickname, self.name)
         self.part(kicked_nick)
 
     def part(self, nickname: str) -> None:
@@ -80,13 +122,15 @@ class Channel:
         :return: None
         :rtype: `None`
         """
-        if not self.is_in_channel(nickname):
-            raise NotOnChannel(f"user with nick: {nickname} is not on channel: {self.name}")
-        self.users.remove(nickname)
-        if self.is_chanop(nickname):
-            self.chanops.remove(nickname)
+        with self._lock:
+            if not self.is_in_channel(nickname):
+                raise NotOnChannel(f"user with nick: {nickname} is not on channel: {self.name}")
+            self.users.remove(nickname)
+            self.chanops.discard(nickname)
+            self._names_chunks = None
+            self._fanout = None
 
-        logging.info(f"{nickname} parted from channel: {self.name}")
+        message_log.debug("%s parted from channel: %s", nickname, self.name)
 
     def is_in_channel(self, nickname: str) -> bool:
         """Return information if user is on channel
@@ -106,12 +150,62 @@ class Channel:
         """
         return nickname in self.chanops
 
+    def members(self) -> list[str]:
+        """Return snapshot of nicknames in channel, safe to iterate while channel changes
+
+        :rtype: `list[str]`
+        """
+        with self._lock:
+            return list(self.users)
+
     def names(self) -> str:
         """Return string of nicknames in channel, sparated by spaces
 
         :rtype: `str`
         """
-        return " ".join((("@" + nickname if nickname in self.chanops else "+" + nickname) for nickname in self.users))
+        return " ".join(self.names_chunks())
+
+    def names_chunks(self) -> list[str]:
+        """Return nicknames in channel split into chunks, each fits a single RPL_NAMREPLY
+
+        Chunks are cached until a user parts, joining users are appended to them.
+
+        :rtype: `list[str]`
+        """
+        with self._lock:
+            if self._names_chunks is None:
+                chunks: list[str] = []
+                for nickname in self.users:
+                    self._append_name(chunks, self._name_entry(nickname))
+                self._names_chunks = chunks
+            return list(self._names_chunks)
+
+    def fanout_plan(self, build: Callable[[list[str]], FanoutPlan]) -> FanoutPlan:
+        """Return sockets messages to channel are delivered to, built from members if not cached
+
+        :param build: resolves nicknames of members to their sockets
+        :type build: ``Callable[[list[str]], FanoutPlan]``
+        :rtype: `FanoutPlan`
+        """
+        with self._lock:
+            if self._fanout is None:
+                self._fanout = build(list(self.users))
+            return self._fanout
+
+    def invalidate_fanout(self) -> None:
+        """Drop cached delivery sockets, e.g. when a server link is made or lost"""
+        with self._lock:
+            self._fanout = None
+
+    def _name_entry(self, nickname: str) -> str:
+        return "@" + nickname if nickname in self.chanops else "+" + nickname
+
+    def _append_name(self, chunks: list[str], entry: str) -> None:
+        width = self.MESSAGE_LIMIT - self.NAMREPLY_OVERHEAD - len(self.name)
+        if chunks and len(chunks[-1]) + 1 + len(entry) <= width:
+            chunks[-1] += " " + entry
+        else:
+            chunks.append(entry)
 
     def channel_symbol(self) -> str:
         """Get channel symbol * - if channel is private, = if channel is public
@@ -1,6 +1,9 @@
 import logging
-from psirc.defines.exceptions import NoSuchChannel
+import threading
+from collections.abc import Iterable
+from psirc.defines.exceptions import NoSuchChannel, NotOnChannel, BannedFromChannel, BadChannelKey
 from psirc.channel import Channel
+from psirc.log_config import message_log
 
 
 class ChannelManager:
@@ -8,10 +11,16 @@ class ChannelManager:
 
     :param channels: dict of existing channels
     :type channels: `dict[str, Channel]`
+    :field _memberships: nickname to names of channels the user is in
+    :type _memberships: `dict[str, set[str]]`
+    :field _lock: guards channels, operations can be performed concurrently
+    :type _lock: `threading.RLock`
     """
 
     def __init__(self) -> None:
         self.channels: dict[str, Channel] = {}
+        self._memberships: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
 
     def join(self, channel_name: str, nickname: str, key: str = "") -> None:
         """Handle/delegate JOIN - join the channel
@@ -26,22 +35,130 @@ class ChannelManager:
         :return: None
         :rtype: None
         """
-        try:
-            channel = self.get_channel(channel_name)
-            channel.join(nickname, key)
-            logging.info(f"{nickname} joined {channel_name}")
-        except NoSuchChannel:
-            logging.info(f"NoSuchChanel: {channel_name}, creating...")
-            self._create_channel(channel_name, nickname)
+        with self._lock:
+            try:
+                channel = self.get_channel(channel_name)
+                channel.join(nickname, key)
+                message_log.debug("%s joined %s", nickname, channel_name)
+            except NoSuchChannel:
+                logging.info("NoSuchChanel: %s, creating...", channel_name)
+                self._create_channel(channel_name, nickname)
+            self._memberships.setdefault(nickname, set()).add(channel_name)
+
+    def join_channels(self, nickname: str, channels: list[tuple[str, str]]) -> dict[str, Exception | None]:
+        """Handle/delegate JOIN of a list of channels - join them all at once
+        Channels which dont exist are created, the user's channels are updated once
+
+        :param nickname: nickname of user performing join operation
+        :type nickname: ``str``
+        :param channels: names of the channels with declared keys, empty if no key was given
+        :type channels: ``list[tuple[str, str]]``
+        :return: channel name to BannedFromChannel or BadChannelKey which prevented joining it, None if joined
+        :rtype: `dict[str, Exception | None]`
+        """
+        results: dict[str, Exception | None] = {}
+        with self._lock:
+            for channel_name, key in channels:
+                channel = self.channels.get(channel_name)
+                try:
+                    if channel is None:
+                        logging.info("NoSuchChanel: %s, creating...", channel_name)
+                        self._create_channel(channel_name, nickname)
+                    else:
+                        channel.join(nickname, key)
+                except (BannedFromChannel, BadChannelKey) as e:
+                    results[channel_name] = e
+                    continue
+                results[channel_name] = None
+            joined = [channel_name for channel_name, error in results.items() if error is None]
+            if joined:
+                self._memberships.setdefault(nickname, set()).update(joined)
+        return results
+
+    def join_many(self, channel_name: str, nicknames: list[str]) -> list[str]:
+        """Add many users to a channel at once, e.g. received in a server burst
+        If channel of declared name doesnt exits, the first user creates it
+
+        :param channel_name: name of the channel
+        :type channel_name: ``str``
+        :param nicknames: nicknames of joining users
+        :type nicknames: ``list[str]``
+        :return: nicknames which joined
+        :rtype: `list[str]`
+        """
+        joined = []
+        with self._lock:
+            for nickname in nicknames:
+                channel = self.channels.get(channel_name)
+                try:
+                    if channel is None:
+                        self._create_channel(channel_name, nickname)
+                    elif not channel.is_in_channel(nickname):
+                        channel.join(nickname)
+                    else:
+                        continue
+                except (BannedFromChannel, BadChannelKey):
+                    continue
+                self._memberships.setdefault(nickname, set()).add(channel_name)
+                joined.append(nickname)
+        logging.info(f"{len(joined)} users joined {channel_name}")
+        return joined
 
     def quit(self, nickname: str) -> None:
-        check_if_empty = []
-        for channel_name, channel in self.channels.items():
-            if channel.is_in_channel(nickname):
-                channel.part(nickname)
-                check_if_empty.append(channel_name)
-        for channel_name in check_if_empty:
-            self._check_for_cleanup(channel_name)
+        """Part user from all channels it is in
+
+        :param nickname: nickname of user quitting
+        :type nickname: ``str``
+        """
+        with self._lock:
+            for channel_name in self._memberships.pop(nickname, ()):
+                self.get_channel(channel_name).part(nickname)
+                self._check_for_cleanup(channel_name)
+
+    def quit_many(self, nicknames: Iterable[str]) -> dict[str, set[str]]:
+        """Part many users from all their channels at once, used when a server link is lost
+
+        Every affected channel is visited once, no matter how many of its members quit.
+
+        :param nicknames: nicknames of users quitting
+        :type nicknames: ``Iterable[str]``
+        :return: remaining channel members mapped to quitting users they shared a channel with
+        :rtype: `dict[str, set[str]]`
+        """
+        quitting_by_channel: dict[str, list[str]] = {}
+        witnesses: dict[str, set[str]] = {}
+        with self._lock:
+            for nickname in nicknames:
+                for channel_name in self._memberships.pop(nickname, ()):
+                    quitting_by_channel.setdefault(channel_name, []).append(nickname)
+            for channel_name, quitting in quitting_by_channel.items():
+                channel = self.get_channel(channel_name)
+                for nickname in quitting:
+                    channel.part(nickname)
+                for member in channel.members():
+                    witnesses.setdefault(member, set()).update(quitting)
+                self._check_for_cleanup(channel_name)
+        return witnesses
+
+    def memberships(self) -> dict[str, list[str]]:
+        """Get snapshot of members of every channel
+
+        :return: channel name to nicknames of its members
+        :rtype: `dict[str, list[str]]`
+        """
+        with self._lock:
+            return {channel_name: channel.members() for channel_name, channel in self.channels.items()}
+
+    def get_user_channels(self, nickname: str) -> list[str]:
+        """Get names of channels the user is in
+
+        :param nickname: nickname of user
+        :type nickname: ``str``
+        :return: channel names
+        :rtype: `list[str]`
+        """
+        with self._lock:
+            return list(self._memberships.get(nickname, ()))
 
     def kick(self, channel_name: str, nickname: str, kicked_nick: str) -> None:
         """Delegate KICK - kick from channel
@@ -57,9 +174,10 @@ class ChannelManager:
         :return: None
         :rtype: None
         """
-        channel = self.get_channel(channel_name)
-        channel.kick(nickname, kicked_nick)
-        self._check_for_cleanup(channel_name)
+        with self._lock:
+            channel = self.get_channel(channel_name)
+            channel.kick(nickname, kicked_nick)
+            self._left(channel_name, kicked_nick)
 
     def part_from_channel(self, channel_name: str, nickname: str) -> None:
         """Delegate PART - part user from channel
@@ -73,21 +191,50 @@ class ChannelManager:
         :return: None
         :rtype: `None`
         """
-        channel = self.get_channel(channel_name)
-        channel.part(nickname)
-        self._check_for_cleanup(channel_name)
+        with self._lock:
+            channel = self.get_channel(channel_name)
+            channel.part(nickname)
+            self._left(channel_name, nickname)
+
+    def part_channels(self, nickname: str, channel_names: list[str]) -> dict[str, Channel | Exception]:
+        """Delegate PART of a list of channels - part user from them all at once
+
+        :param nickname: nickname of user being parted from channels
+        :type nickname: ``str``
+        :param channel_names: names of the channels
+        :type channel_names: ``list[str]``
+        :return: channel name to the parted Channel, also if it was deleted as empty,
+            or to NoSuchChannel or NotOnChannel which prevented parting it
+        :rtype: `dict[str, Channel | Exception]`
+        """
+        results: dict[str, Channel | Exception] = {}
+        with self._lock:
+            channels = self._memberships.get(nickname, set())
+            for channel_name in channel_names:
+                try:
+                    channel = self.get_channel(channel_name)
+                    channel.part(nickname)
+                except (NoSuchChannel, NotOnChannel) as e:
+                    results[channel_name] = e
+                    continue
+                channels.discard(channel_name)
+                self._check_for_cleanup(channel_name)
+                results[channel_name] = channel
+            if not channels:
+                self._memberships.pop(nickname, None)
+        return results
 
-    def get_names(self, channel_name: str) -> str:
-        """Get nicknames string from channel - used handling NAMES
+    def get_names(self, channel_name: str) -> list[str]:
+        """Get nicknames from channel - used handling NAMES and JOIN
 
         :param: channel_name: name of the channel
         :type channel_name: ``str``
         :raises: NotOnChannel: if channel of the given name doesnt exist
-        :return: nicknames separated by space
-        :rtype: `str`
+        :return: nicknames separated by space, in chunks fitting a single RPL_NAMREPLY
+        :rtype: `list[str]`
         """
         channel = self.get_channel(channel_name)
-        return channel.names()
+        return channel.names_chunks()
 
     def get_symbol(self, channel_name: str) -> str:
         """Get channel symbol indicating if its private or public
@@ -112,6 +259,12 @@ class ChannelManager:
         channel = self.get_channel(channel_name)
         return channel.topic
 
+    def invalidate_fanout(self) -> None:
+        """Drop cached delivery sockets of every channel - used when a server link is made or lost"""
+        with self._lock:
+            for channel in self.channels.values():
+                channel.invalidate_fanout()
+
     def get_channel(self, channel_name: str) -> Channel:
         """Get Channel with name
 
@@ -121,14 +274,25 @@ class ChannelManager:
         :return: Channel instance corresponding to given name
         :rtype: Channel
         """
-        if channel_name not in self.channels.keys():
+        channel = self.channels.get(channel_name)
+        if channel is None:
             raise NoSuchChannel(f"Channel with name: {channel_name} does not exist")
-        return self.channels[channel_name]
+        return channel
+
+    def _left(self, channel_name: str, nickname: str) -> None:
+        channels = self._memberships.get(nickname)
+        if channels is not None:
+            channels.discard(channel_name)
+            if not channels:
+                del self._memberships[nickname]
+        self._check_for_cleanup(channel_name)
 
     def _check_for_cleanup(self, channel_name: str) -> None:
-        if not self.get_channel(channel_name).names():
-            logging.info(f"Channel: {channel_name} empty, deletng")
-            del self.channels[channel_name]
+        with self._lock:
+            if not self.get_channel(channel_name).users:
+                logging.info("Channel: %s empty, deletng", channel_name)
+                del self.channels[channel_name]
 
     def _create_channel(self, channel_name: str, nickname: str) -> None:
-        self.channels[channel_name] = Channel(channel_name, nickname)
+        with self._lock:
+            self.channels[channel_name] = Channel(channel_name, nickname)
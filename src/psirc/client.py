@@ -9,6 +9,8 @@ class Client:
     :type nick: ``str``
     """
 
+    __slots__ = ("_nick",)
+
     def __init__(self, nick: str) -> None:
         self._nick = nick
 
@@ -27,6 +29,8 @@ class LocalUser(Client):
     :type socket: ``socket.socket``
     """
 
+    __slots__ = ("_socket", "is_oper")
+
     def __init__(self, nick: str, socket: socket.socket) -> None:
         super().__init__(nick)
         self._socket = socket
@@ -50,6 +54,8 @@ class ExternalUser(Client):
     :type location: ``str``
     """
 
+    __slots__ = ("_location", "_hop_count")
+
     def __init__(self, nick: str, hop_count: int, location: str) -> None:
         super().__init__(nick)
         self._location = location
@@ -72,12 +78,21 @@ class Server(Client):
     :type nick: ``str``
     :param hop_count: the number of hops required to reach the server
     :type hop_count: int
+    :param location: neighbouring server through which the server is reached, the server itself if empty
+    :type location: ``str``
     """
 
-    def __init__(self, nick: str, hop_count: int) -> None:
+    __slots__ = ("_hop_count", "_location")
+
+    def __init__(self, nick: str, hop_count: int, location: str = "") -> None:
         super().__init__(nick)
         self._hop_count = hop_count
+        self._location = location if location else nick
 
     @property
     def hop_count(self) -> int:
         return self._hop_count
+
+    @property
+    def location(self) -> str:
+        return self._location
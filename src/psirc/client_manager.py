@@ -2,19 +2,66 @@ import socket
 import threading
 from psirc.defines.exceptions import NoSuchNick, NickAlreadyInUse
 from psirc.client import Client, LocalUser, ExternalUser, Server
-from collections.abc import Sequence
+from psirc.log_config import message_log
+from collections.abc import Iterable, Sequence
 
 
 class ClientManager:
     """
     Manages the sockets connected to current server, including user and server.
+
+    External users are also indexed by their location, so users behind a server
+    can be removed without scanning all users.
     """
 
     def __init__(self) -> None:
         self._users: dict[str, LocalUser | ExternalUser] = dict()
         self._servers: dict[str, Server] = dict()
+        self._locations: dict[str, set[str]] = dict()
+        # nicknames claimed by connections which are not registered users yet
+        self._reserved: dict[str, socket.socket] = dict()
         self._lock = threading.Lock()
 
+    def reserve(self, user_nick: str, user_socket: socket.socket) -> bool:
+        """
+        Claim nick for a connection until it registers as a local user
+
+        Checked and claimed taking the lock once, so that of connections handled
+        concurrently only one gets the nick. A previous nick claimed by the connection is released.
+
+        :param user_nick: nick of user
+        :type user_nick: ``str``
+        :param user_socket: socket object representing user connection
+        :type user_socket: ``socket.socket``
+        :return: True if the nick was claimed, False if it is in use or claimed by another connection
+        :rtype: ``bool``
+        """
+        with self._lock:
+            if user_nick in self._users or user_nick in self._servers:
+                return False
+            if self._reserved.get(user_nick, user_socket) is not user_socket:
+                return False
+            for reserved_nick, reserved_socket in list(self._reserved.items()):
+                if reserved_socket is user_socket:
+                    del self._reserved[reserved_nick]
+            self._reserved[user_nick] = user_socket
+            return True
+
+    def release(self, user_nick: str, user_socket: socket.socket) -> None:
+        """
+        Release nick claimed by a connection which did not register
+
+        :param user_nick: nick of user
+        :type user_nick: ``str``
+        :param user_socket: socket object representing user connection
+        :type user_socket: ``socket.socket``
+        :return: None
+        :rtype: None
+        """
+        with self._lock:
+            if self._reserved.get(user_nick) is user_socket:
+                del self._reserved[user_nick]
+
     def add_local(self, user_nick: str, user_socket: socket.socket) -> None:
         """
         Add local user to the list of users
@@ -23,13 +70,14 @@ class ClientManager:
         :type user_nick: ``str``
         :param user_socket: socket object representing user connection
         :type user_socket: ``socket.socket``
-        :raises NickAlreadyInUse: if user nick is already in use
+        :raises NickAlreadyInUse: if user nick is already in use or claimed by another connection
         :return: None
         :rtype: None
         """
         with self._lock:
-            if user_nick in self._users.keys():
+            if user_nick in self._users.keys() or self._reserved.get(user_nick, user_socket) is not user_socket:
                 raise NickAlreadyInUse(f'Nick "{user_nick}" in use')
+            self._reserved.pop(user_nick, None)
             self._users[user_nick] = LocalUser(user_nick, user_socket)
 
     def add_external(self, user_nick: str, hop_count: int, server_name: str) -> None:
@@ -50,15 +98,48 @@ class ClientManager:
             if user_nick in self._users.keys():
                 raise NickAlreadyInUse(f'Nick "{user_nick}" in use')
             self._users[user_nick] = ExternalUser(user_nick, hop_count, server_name)
-            print(f"added: {user_nick} as an external user")
+            self._locations.setdefault(server_name, set()).add(user_nick)
+            message_log.debug("added: %s as an external user", user_nick)
+
+    def add_external_many(self, users: Iterable[tuple[str, int, str]]) -> list[str]:
+        """
+        Add many external users at once, e.g. received in a server burst
+
+        :param users: nick, hop count and server name of every user
+        :type users: ``Iterable[tuple[str, int, str]]``
+        :return: nicks which were not added, because they are already in use or have invalid hop count
+        :rtype: ``list[str]``
+        """
+        rejected = []
+        with self._lock:
+            for user_nick, hop_count, server_name in users:
+                if hop_count < 1 or user_nick in self._users:
+                    rejected.append(user_nick)
+                    continue
+                self._users[user_nick] = ExternalUser(user_nick, hop_count, server_name)
+                self._locations.setdefault(server_name, set()).add(user_nick)
+        return rejected
+
+    def add_server(self, server_nick: str, hop_count: int, location: str = "") -> None:
+        """
+        Add server to the list of servers
 
-    def add_server(self, server_nick: str, hop_count: int) -> None:
+        :param server_nick: name of server
+        :type server_nick: ``str``
+        :param hop_count: distance from server
+        :type hop_count: ``int``
+        :param location: neighbouring server through which the server is reached, empty for neighbours
+        :type location: ``str``
+        :raises NickAlreadyInUse: if server name is already in use
+        :return: None
+        :rtype: None
+        """
         if hop_count < 1:
             raise ValueError("Hop count of server has to be a positive integer")
         with self._lock:
             if server_nick in self._servers.keys():
                 raise NickAlreadyInUse(f"Nickname '{server_nick}' is already in use!")
-            self._servers[server_nick] = Server(server_nick, hop_count)
+            self._servers[server_nick] = Server(server_nick, hop_count, location)
 
     def get_user(self, user_nick: str) -> Client | None:
         """
@@ -104,26 +185,43 @@ class ClientManager:
         :rtype: None
         """
         with self._lock:
-            self._users.pop(user_nick, None)
+            user = self._users.pop(user_nick, None)
+            if isinstance(user, ExternalUser):
+                self._unindex(user)
 
     def remove_from_server(self, server_nickname: str) -> Sequence[Client]:  # Sequence is used for derived client types
         """
-        Remove all users socket from
+        Remove all users located behind a server
 
-        :param client_name: name of client
-        :type client_name: ``str``
+        :param server_nickname: name of the neighbouring server
+        :type server_nickname: ``str``
         :return: list of removed users
         :rtype: a Sequence object of users
         """
         with self._lock:
-            disconnected_users = [
-                user
-                for user in self._users.values()
-                if isinstance(user, ExternalUser) and user.location == server_nickname
-            ]
-            for user in disconnected_users:
-                self._users.pop(user.nick)
-            return disconnected_users
+            return [self._users.pop(user_nick) for user_nick in self._locations.pop(server_nickname, ())]
+
+    def remove_servers_behind(self, server_nickname: str) -> list[Server]:
+        """
+        Remove neighbouring server and all servers reached through it
+
+        :param server_nickname: name of the neighbouring server
+        :type server_nickname: ``str``
+        :return: list of removed servers
+        :rtype: ``list[Server]``
+        """
+        with self._lock:
+            removed = [irc_server for irc_server in self._servers.values() if irc_server.location == server_nickname]
+            for irc_server in removed:
+                del self._servers[irc_server.nick]
+            return removed
+
+    def _unindex(self, user: ExternalUser) -> None:
+        users = self._locations.get(user.location)
+        if users is not None:
+            users.discard(user.nick)
+            if not users:
+                del self._locations[user.location]
 
     def add_oper_privileges(self, user_nick: str) -> None:
         """
@@ -169,15 +267,23 @@ class ClientManager:
                     result.append(user)
         return result
 
-    def get_external_users(self) -> dict[str, int]:
+    def get_external_users(self, exclude_location: str = "") -> dict[str, int]:
+        """
+        Get nicknames and hop counts of users connected to other servers
+
+        :param exclude_location: skip users located behind this server
+        :type exclude_location: ``str``
+        :return: nickname to hop count association
+        :rtype: `dict[str, int]`
+        """
         result = {}
         with self._lock:
             for user in self._users:
                 ext_user = self._users[user]
-                if isinstance(ext_user, ExternalUser):
+                if isinstance(ext_user, ExternalUser) and ext_user.location != exclude_location:
                     result[ext_user.nick] = ext_user.hop_count
         return result
-    
+
     def list_servers(self) -> dict[str, Server]:
         with self._lock:
-            return self._servers
+            return dict(self._servers)
@@ -1,48 +1,215 @@
+import math
 import socket
+import logging
 
 from psirc.server import IRCServer
 from psirc.routing_manager import RoutingManager
 from psirc.defines.responses import Command
-from psirc.message import Message, Prefix
-from psirc.session_info import SessionType
+from psirc.message import Message, Params, Prefix
+from psirc.session_info import SessionInfo, SessionType
+from psirc.client import LocalUser
+from psirc.burst import Burst
+from psirc.defines.exceptions import NickAlreadyInUse
+from psirc.response_params import REPLY_TEMPLATES
+from collections.abc import Iterator
 
-
-def send_local_user_nicks(client_socket: socket.socket, server: IRCServer, hop_count: str) -> None:
-    for user in server.get_local_users():
-        print(f"sending local user: {user}")
-        RoutingManager.send_command(client_socket, command=Command.NICK, nickname=user, hopcount=hop_count)
-
-
-def send_external_user_nicks(client_socket: socket.socket, server: IRCServer) -> None:
-    external_users = server.get_external_users()
-    for user in external_users:
-        print(f"external user: {user}")
-        RoutingManager.send_command(client_socket, command=Command.NICK, nickname=user, hopcount=str(external_users[user]))
+# bytes of burst serialized at once
+BURST_CHUNK = 16 * 1024
 
 
 def broadcast_server_to_neighbours(server: IRCServer, message: Message) -> None:
     server_sessions = server._sessions.get_sessions_by_type(SessionType.SERVER)
     if not message.prefix or not message.params:
-        print("Tried to broadcast to neighbours but no prefix/params found!")
+        logging.warning("Tried to broadcast to neighbours but no prefix/params found!")
         return
     message.params["hopcount"] = str(int(message.params["hopcount"]) + 1)
+    data = message.to_bytes()
     for peer_socket in server_sessions:
         if server_sessions[peer_socket].nickname == message.prefix.sender:
             continue
-        RoutingManager.send(peer_socket, message)
-
-
-def send_known_servers(nickname: str, client_socket: socket.socket, server: IRCServer) -> None:
-    servers = server._users.list_servers()
-    for irc_server in servers:
-        print(f"sending info on {irc_server}")
-        if irc_server != nickname:
-            RoutingManager.send_command(
-                client_socket,
-                prefix=Prefix(server.nickname),
-                command=Command.SERVER,
-                servername=irc_server,
-                hopcount=str(servers[irc_server].hop_count + 1),
-                trailing="placeholder"
-            )
+        RoutingManager.send_bytes(peer_socket, data)
+
+
+def send_burst(server: IRCServer, peer_socket: socket.socket, peer_name: str = "") -> None:
+    """Send state of the network known to this server to a newly linked server.
+
+    Known servers, users with hop counts and channel memberships are serialized
+    into large chunks, streamed to the peer as its socket drains. The burst ends
+    with PING, before which the peer applies received users at once.
+
+    :param server: Current server instance
+    :type server: ``IRCServer``
+    :param peer_socket: socket of the linked server
+    :type peer_socket: ``socket.socket``
+    :param peer_name: name of the linked server, servers and users behind it are not sent back
+    :type peer_name: ``str``
+    """
+    servers = {
+        name: irc_server.hop_count
+        for name, irc_server in server._users.list_servers().items()
+        if irc_server.location != peer_name
+    }
+    users = {nickname: 1 for nickname in server.get_local_users()}
+    users.update(server._users.get_external_users(exclude_location=peer_name))
+    logging.info(f"Sending burst of {len(servers)} servers and {len(users)} users to {peer_name or 'new link'}")
+    RoutingManager.stream_bytes(
+        peer_socket, _chunked(_burst_lines(server.nickname, servers, users, server._channels.memberships()))
+    )
+
+
+def _burst_lines(
+    server_name: str, servers: dict[str, int], users: dict[str, int], memberships: dict[str, list[str]]
+) -> Iterator[str]:
+    for irc_server, hop_count in servers.items():
+        yield f":{server_name} SERVER {irc_server} {hop_count + 1} :placeholder\r\n"
+    for nickname, hop_count in users.items():
+        yield f"NICK {nickname} {hop_count}\r\n"
+    for channel_name, members in memberships.items():
+        for nickname in members:
+            if nickname in users:
+                yield f":{nickname} JOIN {channel_name}\r\n"
+    yield f"PING {server_name}\r\n"
+
+
+def _chunked(lines: Iterator[str], size: int = BURST_CHUNK) -> Iterator[bytes]:
+    chunk: list[str] = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk).encode()
+            chunk = []
+            length = 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def send_names(client_socket: socket.socket, nickname: str, channel_name: str, symbol: str, chunks: list[str]) -> None:
+    """Send members of a channel to a local user, RPL_NAMREPLY for every chunk and RPL_ENDOFNAMES.
+
+    Replies are serialized lazily and streamed as the socket drains,
+    so listing a large channel does not fill the send queue at once.
+
+    :param client_socket: socket of the user
+    :type client_socket: ``socket.socket``
+    :param nickname: nickname of the user
+    :type nickname: ``str``
+    :param channel_name: name of the channel
+    :type channel_name: ``str``
+    :param symbol: channel symbol, see ``Channel.channel_symbol``
+    :type symbol: ``str``
+    :param chunks: nicknames of members, as returned by ``Channel.names_chunks``
+    :type chunks: ``list[str]``
+    """
+    RoutingManager.stream_bytes(client_socket, _names_replies(nickname, channel_name, symbol, chunks))
+
+
+def _names_replies(nickname: str, channel_name: str, symbol: str, chunks: list[str]) -> Iterator[bytes]:
+    reply = REPLY_TEMPLATES[Command.RPL_NAMREPLY]
+    for chunk in chunks:
+        data = reply.format("", nickname, {"symbol": symbol, "channel": channel_name, "trailing": chunk})
+        if data:
+            yield data
+    data = REPLY_TEMPLATES[Command.RPL_ENDOFNAMES].format("", nickname, {"channel": channel_name})
+    if data:
+        yield data
+
+
+def apply_burst(server: IRCServer, server_socket: socket.socket, burst: Burst) -> None:
+    """Apply state received from a server link at once.
+
+    Users are registered taking the lock once, members are added channel by channel.
+    Every local channel member gets JOINs of all new members of its channels in one write,
+    every other server link gets the new users and their JOINs in one write, ended with
+    PING so it applies them as a burst too.
+
+    :param server: Current server instance
+    :type server: ``IRCServer``
+    :param server_socket: socket of the server which sent the burst
+    :type server_socket: ``socket.socket``
+    :param burst: state introduced by the server
+    :type burst: ``Burst``
+    """
+    rejected = set(server._users.add_external_many(burst.users))
+    for nickname in rejected:
+        logging.warning(f"Ignoring introduced user {nickname}, nickname in use")
+    logging.info(f"Registered burst of {len(burst.users) - len(rejected)} users")
+
+    notifications: dict[socket.socket, list[bytes]] = {}
+    relayed = [
+        "".join(
+            f"NICK {nickname} {hop_count}\r\n" for nickname, hop_count, _ in burst.users if nickname not in rejected
+        ).encode()
+    ]
+    for channel_name, nicknames in burst.joins.items():
+        nicknames = [nickname for nickname in nicknames if nickname not in rejected and server._users.get_user(nickname)]
+        joined = server._channels.join_many(channel_name, nicknames)
+        if not joined:
+            continue
+        data = "".join(f":{nickname} JOIN {channel_name}\r\n" for nickname in joined).encode()
+        relayed.append(data)
+        for member in server._channels.get_channel(channel_name).members():
+            user = server._users.get_user(member)
+            if isinstance(user, LocalUser):
+                notifications.setdefault(user.socket, []).append(data)
+
+    for client_socket, chunks in notifications.items():
+        RoutingManager.send_bytes(client_socket, b"".join(chunks))
+    if len(burst.users) > len(rejected) or len(relayed) > 1:
+        relayed.append(f"PING {server.nickname}\r\n".encode())
+        data = b"".join(relayed)
+        for peer_socket in server._sessions.get_sessions_by_type(SessionType.SERVER):
+            if peer_socket is not server_socket:
+                RoutingManager.send_bytes(peer_socket, data)
+
+
+def introduce_external_user(
+    server: IRCServer, server_socket: socket.socket, nickname: str, hop_count: int, session_info: SessionInfo
+) -> None:
+    """Register user introduced by a server after its burst and relay it to other server links."""
+    try:
+        server.register_external_user(nickname, hop_count, session_info)
+    except NickAlreadyInUse:
+        logging.warning(f"Ignoring introduced user {nickname}, nickname in use")
+        return
+    data = f"NICK {nickname} {hop_count}\r\n".encode()
+    for peer_socket in server._sessions.get_sessions_by_type(SessionType.SERVER):
+        if peer_socket is not server_socket:
+            RoutingManager.send_bytes(peer_socket, data)
+
+
+def quit_external_users(server: IRCServer, nicknames: list[str], reason: str, source_socket: socket.socket) -> None:
+    """Part already removed external users from channels and notify others about their QUIT.
+
+    Every local channel member gets QUITs of all users it shared a channel with in one write,
+    every server link other than the source gets all QUITs in one write.
+    """
+    if not nicknames:
+        return
+    params = Params({"trailing": reason})
+    quits = {
+        nickname: Message(prefix=Prefix(nickname), command=Command.QUIT, params=params).to_bytes()
+        for nickname in nicknames
+    }
+    for member, quitting in server._channels.quit_many(nicknames).items():
+        user = server._users.get_user(member)
+        if isinstance(user, LocalUser):
+            RoutingManager.send_bytes(user.socket, b"".join(quits[nickname] for nickname in quitting))
+
+    data = b"".join(quits.values())
+    for peer_socket in server._sessions.get_sessions_by_type(SessionType.SERVER):
+        if peer_socket is not source_socket:
+            RoutingManager.send_bytes(peer_socket, data)
+
+
+def netsplit(server: IRCServer, server_socket: socket.socket, session_info: SessionInfo) -> None:
+    """Remove everything reachable through a lost server link and notify about users that quit."""
+    logging.warning(f"Netsplit: lost link to {session_info.nickname}")
+    nicknames = server.remove_server_link(server_socket, session_info)
+    quit_external_users(server, nicknames, f"{server.nickname} {session_info.nickname}", server_socket)
+
 
+def microseconds(seconds: float) -> str:
+    """Format a duration for STATS replies, ``inf`` if it is longer than the histogram covers."""
+    return "inf" if math.isinf(seconds) else str(round(seconds * 1e6))
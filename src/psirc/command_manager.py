@@ -5,12 +5,26 @@ from psirc.server import IRCServer, AlreadyRegistered
 from psirc.message import Message, Prefix
 from psirc.defines.responses import Command
 from psirc.session_info import SessionInfo, SessionType
+from psirc.channel import Channel
+from psirc.client import Client
 from psirc.routing_manager import RoutingManager
 from psirc.irc_validator import IRCValidator
-from psirc.defines.exceptions import NoSuchChannel, NoSuchNick, NotOnChannel, ChanopPrivIsNeeded
+from psirc.defines.exceptions import (
+    NoSuchChannel,
+    NoSuchNick,
+    NotOnChannel,
+    ChanopPrivIsNeeded,
+    BannedFromChannel,
+    BadChannelKey,
+    NickAlreadyInUse,
+)
+from psirc.response_params import parametrize
 
 import psirc.command_helpers as helpers
 
+# receivers of a single PRIVMSG, messages with more are refused with ERR_TOOMANYTARGETS
+MAX_TARGETS = 8
+
 
 def handle_connect_command(
     server: IRCServer, client_socket: socket.socket, session_info: SessionInfo, message: Message
@@ -32,33 +46,27 @@ def handle_connect_command(
         return
 
     target_server = message.params["target_server"]
-    print(f"target server: {target_server}")
     port = message.params["port"] if message.params["port"] else str(server.port)
-    print(f"port: {port}")
+    logging.info("%s requested connecting to %s:%s", nickname, target_server, port)
 
     # get server socket
     server_socket = server.connect_to_server(target_server, port)
     if not server_socket:
         RoutingManager.respond_client_error(client_socket, Command.ERR_NOSUCHSERVER, session_info.nickname)
         return
-    print(f"connected to server {target_server}:{port}")
 
     # create session
     server.register_local_connection(server_socket, None, None)
-    server_session = server._sessions.get_info(client_socket)
+    server_session = server._sessions.get_info(server_socket)
     if not server_session:
         return
 
     # set password
     server_session.password = server.password_handler.get_c_password(target_server)
     if not server_session.password:
-        print("Connected to server but no password found")
-        # TODO: raise some error or log in console?
+        logging.warning("Connected to %s but no C-line password found", target_server)
         return
 
-    print(f"found password: {server_session.password}")
-    print(f"server nickname: {server.nickname}")
-
     # Send PASS message
     RoutingManager.send_command(server_socket, command=Command.PASS, password=server_session.password)
 
@@ -71,8 +79,7 @@ def handle_connect_command(
         hopcount="1",
         trailing="Placeholder server message",
     )
-    helpers.send_local_user_nicks(server_socket, server, "1")
-    helpers.send_external_user_nicks(server_socket, server)
+    # burst is sent once the server introduces itself
 
 
 def handle_oper_command(
@@ -121,6 +128,118 @@ def handle_oper_command(
         RoutingManager.respond_client_error(client_socket, Command.ERR_PASSWDMISMATCH, session_info.nickname)
 
 
+def handle_rehash_command(
+    server: IRCServer, client_socket: socket.socket, session_info: SessionInfo | None, message: Message
+) -> None:
+    """Handle Rehash command.
+
+    Command: REHASH
+        Parameters: None
+
+    Numeric Replies:
+    - RPL_REHASHING
+    - ERR_NOPRIVILEGES
+    - ERR_NOTREGISTERED
+
+    Reloads the config file, only irc operators are allowed to. The file is parsed
+    in the background, current credentials are used until the new ones are ready.
+
+    :param server: Current server instance
+    :type server: ``IRCServer``
+    :param client_socket: Socket from which the message was received
+    :type client_socket: ``socket.socket``
+    :param session_info: Session information instance associated with the client socket
+    :type session_info: ``SessionInfo | None``
+    :param message: Parsed message received from the socket
+    :type message: ``Message``
+    :return: None
+    :rtype: None
+    """
+    if not session_info or session_info.type is not SessionType.USER:
+        RoutingManager.respond_client_error(client_socket, Command.ERR_NOTREGISTERED, "*")
+        return
+    nickname = session_info.nickname
+    if not server._users.has_oper_privileges(nickname):
+        RoutingManager.respond_client_error(client_socket, Command.ERR_NOPRIVILEGES, nickname)
+        return
+
+    logging.info(f"{nickname} requested rehash")
+    RoutingManager.respond_client(
+        client_socket, command=Command.RPL_REHASHING, recepient=nickname, config_file=server.password_handler.filename
+    )
+    server.rehash()
+
+
+def handle_stats_command(
+    server: IRCServer, client_socket: socket.socket, session_info: SessionInfo | None, message: Message
+) -> None:
+    """Handle STATS command.
+
+    Command: STATS
+        Parameters: [<query> [<server>]]
+
+    Numeric Replies:
+    - RPL_STATSCOMMANDS
+    - RPL_STATSLINKINFO
+    - RPL_ENDOFSTATS
+    - ERR_NOPRIVILEGES
+    - ERR_NOTREGISTERED
+
+    Queries:
+    - m - calls, handler errors and handler latency (p50, p99 in microseconds) of every command
+    - l - traffic of every connection, irc operators only
+
+    Other queries (and the server parameter) are ignored, only RPL_ENDOFSTATS is sent.
+
+    :param server: Current server instance
+    :type server: ``IRCServer``
+    :param client_socket: Socket from which the message was received
+    :type client_socket: ``socket.socket``
+    :param session_info: Session information instance associated with the client socket
+    :type session_info: ``SessionInfo | None``
+    :param message: Parsed message received from the socket
+    :type message: ``Message``
+    :return: None
+    :rtype: None
+    """
+    if not session_info or session_info.type is not SessionType.USER:
+        RoutingManager.respond_client_error(client_socket, Command.ERR_NOTREGISTERED, "*")
+        return
+    nickname = session_info.nickname
+    query = message.params["query"][:1] if message.params and "query" in message.params else ""
+
+    if query == "m":
+        for stats in server.metrics.commands():
+            RoutingManager.respond_client(
+                client_socket,
+                command=Command.RPL_STATSCOMMANDS,
+                recepient=nickname,
+                name=stats.command,
+                count=str(stats.calls),
+                errors=str(stats.errors),
+                p50_us=helpers.microseconds(stats.latency.quantile(0.5)),
+                p99_us=helpers.microseconds(stats.latency.quantile(0.99)),
+            )
+    elif query == "l":
+        if not server._users.has_oper_privileges(nickname):
+            RoutingManager.respond_client_error(client_socket, Command.ERR_NOPRIVILEGES, nickname)
+            return
+        for link in server.link_stats():
+            RoutingManager.respond_client(
+                client_socket,
+                command=Command.RPL_STATSLINKINFO,
+                recepient=nickname,
+                linkname=link.name,
+                sendq=str(link.sendq),
+                sent_messages=str(link.sent_messages),
+                sent_bytes=str(link.sent_bytes),
+                received_messages=str(link.received_messages),
+                received_bytes=str(link.received_bytes),
+                time_open=str(link.seconds_open),
+            )
+    RoutingManager.respond_client(client_socket, command=Command.RPL_ENDOFSTATS, recepient=nickname, query=query or "*")
+
+
 def handle_quit_command(
     server: IRCServer, client_socket: socket.socket, session_info: SessionInfo | None, message: Message
 ) -> None:
@@ -147,12 +266,42 @@ def handle_quit_command(
     if message.command is not Command.QUIT:
         raise ValueError("Implementation error: Wrong command type")
     if session_info is None or session_info.type is SessionType.USER:
+        # TODO: notify channel members and other servers about quit of a local user
         server.remove_local_user(client_socket, session_info)
     elif session_info.type is SessionType.SERVER and message.prefix:
-        server.remove_external_user(message.prefix.user)
+        nickname = message.prefix.sender
+        reason = message.params["trailing"] if message.params and "trailing" in message.params else nickname
+        server._users.remove(nickname)
+        helpers.quit_external_users(server, [nickname], reason, client_socket)
     else:
         raise ValueError("Unhandled quit command error")
-    # TODO: notify other servers about user quit
+
+
+def handle_connection_lost(server: IRCServer, client_socket: socket.socket, session_info: SessionInfo | None) -> None:
+    """Clean up after a connection closed without QUIT.
+
+    Lost user is removed like after QUIT, lost server link is handled as a netsplit:
+    servers and users behind it are removed and their QUITs are sent to channel members
+    and remaining server links.
+
+    :param server: Current server instance
+    :type server: ``IRCServer``
+    :param client_socket: Socket which was closed
+    :type client_socket: ``socket.socket``
+    :param session_info: Session information instance associated with the socket
+    :type session_info: ``SessionInfo | None``
+    :return: None
+    :rtype: None
+    """
+    if session_info is None:
+        return
+    if session_info.type is SessionType.SERVER:
+        helpers.netsplit(server, client_socket, session_info)
+    elif session_info.type is SessionType.USER:
+        server.remove_local_user(client_socket, session_info)
+    else:
+        server.release_nickname(session_info.nickname, client_socket)
+        server._sessions.remove(client_socket)
 
 
 def handle_pass_command(
@@ -230,7 +379,13 @@ def handle_nick_command(
             raise ValueError("Unexpectedly didnt get session info")
 
     if session_info.type is SessionType.SERVER and message.params:
-        server.register_external_user(message.params["nickname"], session_info)
+        # hop count of the user as seen by the introducing server, one more from here
+        if "hopcount" in message.params and message.params["hopcount"].isdigit():
+            hop_count = int(message.params["hopcount"]) + 1
+        else:
+            hop_count = session_info.hops + 1
+        if not server.queue_external_user(client_socket, message.params["nickname"], hop_count, session_info):
+            helpers.introduce_external_user(server, client_socket, message.params["nickname"], hop_count, session_info)
         return
 
     if message.params and "nickname" in message.params:
@@ -239,8 +394,14 @@ def handle_nick_command(
         RoutingManager.respond_client_error(client_socket, Command.ERR_NONICKNAMEGIVEN, "*")
         return
 
-    if not server.is_unique(nickname):
+    if session_info.type is SessionType.USER:
+        unique = server.is_unique(nickname)
+    else:
+        # claimed at once, other connections may be registering on other dispatcher shards
+        unique = server.reserve_nickname(nickname, client_socket)
+    if not unique:
         RoutingManager.respond_client_error(client_socket, Command.ERR_NICKCOLLISION, "*")
+        return
 
     session_info.nickname = nickname
 
@@ -293,12 +454,19 @@ def handle_user_command(
             return
 
         if not server.password_handler.valid_user_password(address, session_info.password):
-            logging.info(f"Incorrect password given for {session_info.username}: {session_info.password}")
+            logging.info("Incorrect password given for %s", session_info.username)
             RoutingManager.respond_client_error(client_socket, Command.ERR_PASSWDMISMATCH, session_info.nickname)
             server.remove_local_user(client_socket, session_info)
             return
 
-        server.register_local_user(client_socket, session_info)
+        try:
+            server.register_local_user(client_socket, session_info)
+        except NickAlreadyInUse:
+            # introduced by a server since it was claimed, the client has to choose another one
+            RoutingManager.respond_client_error(client_socket, Command.ERR_NICKCOLLISION, "*")
+            session_info.type = SessionType.UNKNOWN
+            session_info.nickname = ""
+            return
         logging.info(f"Registered: {session_info}")
 
         RoutingManager.respond_client(
@@ -330,13 +498,13 @@ def handle_server_command(
         return
 
     if not message.prefix:
-        print("server message has no prefix")
+        logging.warning("SERVER message has no prefix")
         return
 
     # 1. we made the connection, the server responds with more info about itself
     # 2. OR we are getting info about another server on the network
     if session_info.type == SessionType.SERVER:
-        print("got SERVER message from existing server")
+        logging.debug("got SERVER message from existing server")
 
         if session_info.nickname != message.params["servername"]:
 
@@ -346,11 +514,13 @@ def handle_server_command(
                 logging.info(
                     f"got relayed server information about {message.params['servername']} from {session_info.nickname}, the server is {message.params['hopcount']} hops away"
                 )
-                server.register_server(message.params["servername"], int(message.params["hopcount"]))
+                server.register_server(
+                    message.params["servername"], int(message.params["hopcount"]), session_info.nickname
+                )
             # we know this server already, just relay
             return
 
-        print(f"connected server has identified itself as: {session_info.nickname}")
+        logging.info("connected server has identified itself as: %s", nickname)
 
         # if server is responding with this to SERVER msg:
         session_info.nickname = nickname
@@ -377,7 +547,7 @@ def handle_server_command(
     session_info.nickname = nickname
     session_info.hops = int(hop_count)
 
-    server.register_server(session_info.nickname, session_info.hops)
+    server.register_server_link(client_socket, session_info)
     logging.info(f"Registered: {session_info}")
 
     RoutingManager.send_command(
@@ -388,7 +558,7 @@ def handle_server_command(
         hopcount=hop_count,
         trailing="Server desc placeholder",
     )
-    helpers.send_known_servers(session_info.nickname, client_socket, server)
+    helpers.send_burst(server, client_socket, session_info.nickname)
     helpers.broadcast_server_to_neighbours(server, message)
 
 
@@ -406,8 +576,10 @@ def handle_privmsg_command(
     - ERR_NOSUCHNICK
     - ERR_NOSUCHCHANNEL
     - ERR_NOTONCHANNEL
+    - ERR_TOOMANYTARGETS
 
-    Forwards message to user or channel
+    Forwards message to users and channels, at most MAX_TARGETS of them.
+    Repeated receivers are ignored, a user reached through several receivers gets a single message
     Checks if: user is known(session info), required channel name is present
     Delegates forwarding message to routing manager
 
@@ -443,30 +615,61 @@ def handle_privmsg_command(
         RoutingManager.respond_client_error(client_socket, Command.ERR_NONICKNAMEGIVEN, session_info.nickname)
         return
 
-    message_to_send = message
+    targets = list(dict.fromkeys(receiver.split(",")))
+    if len(targets) > MAX_TARGETS:
+        RoutingManager.respond_client_error(
+            client_socket, Command.ERR_TOOMANYTARGETS, session_info.nickname, target=receiver
+        )
+        return
 
-    try:
-        if IRCValidator.validate_channel(receiver):
-            channel = server._channels.get_channel(receiver)
-            if session_info.nickname not in channel.users:
-                RoutingManager.respond_client_error(
-                    client_socket, Command.ERR_NOTONCHANNEL, session_info.nickname, channel=receiver
-                )
-                return
-            RoutingManager.send_to_channel(server, channel, message_to_send)
-            return
+    resolved = []
+    for target in targets:
+        target_receiver = _resolve_privmsg_target(server, client_socket, session_info, message, target)
+        if target_receiver:
+            resolved.append((target, target_receiver))
 
-        receiver_user = server._users.get_user(receiver)
-        if not receiver_user:
-            RoutingManager.respond_client_error(client_socket, Command.ERR_NOSUCHCHANNEL, session_info.nickname)
-            return
-        RoutingManager.forward_to_user(server, receiver, message_to_send)
+    if len(resolved) == 1:
+        # others were repeated or unknown, don't forward them
+        message.params["receiver"] = resolved[0][0]
+    try:
+        if len(resolved) > 1:
+            RoutingManager.send_to_targets(server, resolved, message)
+        elif resolved and isinstance(resolved[0][1], Channel):
+            RoutingManager.send_to_channel(server, resolved[0][1], message)
+        elif resolved:
+            RoutingManager.forward_to_user(server, resolved[0][0], message)
     except NoSuchNick:
         RoutingManager.respond_client_error(client_socket, Command.ERR_NOSUCHNICK, session_info.nickname)
-    except NoSuchChannel:
+
+
+def _resolve_privmsg_target(
+    server: IRCServer, client_socket: socket.socket, session_info: SessionInfo, message: Message, target: str
+) -> Channel | Client | None:
+    """Find channel or user a PRIVMSG receiver names, respond with an error if there is none."""
+    if IRCValidator.validate_channel(target):
+        try:
+            channel = server._channels.get_channel(target)
+        except NoSuchChannel:
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=target
+            )
+            return None
+        # relayed by a server on behalf of one of its users
+        sender = message.prefix.sender if message.prefix else session_info.nickname
+        if sender not in channel.users:
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOTONCHANNEL, session_info.nickname, channel=target
+            )
+            return None
+        return channel
+
+    receiver_user = server._users.get_user(target)
+    if not receiver_user:
         RoutingManager.respond_client_error(
-            client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=receiver
+            client_socket, Command.ERR_NOSUCHNICK, session_info.nickname, nickname=target
         )
+        return None
+    return receiver_user
 
 
 def handle_ping_command(
@@ -504,20 +707,23 @@ def handle_join_command(
     Handles recieved JOIN command
 
     Command: JOIN
-        Parameters: <channel>
+        Parameters: <channel>{,<channel>} [<key>{,<key>}]
 
     Numeric Replies:
     - ERR_NEEDMOREPARAMS
     - ERR_NOSUCHCHANNEL
-    - RPL_TOPIC and RPL_NAMREPLY
+    - ERR_BANNEDFROMCHAN
+    - ERR_BADCHANNELKEY
+    - RPL_TOPIC, RPL_NAMREPLY and RPL_ENDOFNAMES
 
 
     Checks if: user is known(session info), required channel name is present
-    Delegates performing JOIN operation to channel manager.
+    Delegates performing JOIN operation of all listed channels at once to channel manager.
     If channel did not exist it is created and user becomes channel operator
     If JOIN operation performed correctly:
-    - sends to user a pair of: TOPIC, NAMREPLY:
-        - NAMREPLY containis channel name and nicknames of users on channel separated by spaces
+    - sends to user TOPIC, NAMREPLY and ENDOFNAMES:
+        - NAMREPLY containis channel name and nicknames of users on channel separated by spaces,
+          split into many replies for large channels
         - TOPIC contains channel name and channel topic
     - notifies user on channel about joining of new user
 
@@ -536,40 +742,68 @@ def handle_join_command(
 
     if not message.params or not session_info:
         return
-    channel_name = message.params["channel"]
-    if not channel_name:
+    channel_names = message.params["channel"].split(",")
+    if session_info.type is SessionType.SERVER:
+        # user behind the server joined, no replies to servers
+        if not message.prefix:
+            return
+        for channel_name in channel_names:
+            if server.queue_join(client_socket, channel_name, message.prefix.sender):
+                continue
+            if server._users.get_user(message.prefix.sender):
+                server._channels.join(channel_name, message.prefix.sender)
+                params = parametrize(Command.JOIN, channel=channel_name)
+                join = Message(prefix=message.prefix, command=Command.JOIN, params=params)
+                RoutingManager.send_to_channel(server, server._channels.get_channel(channel_name), join)
+        return
+    if not message.params["channel"]:
         RoutingManager.respond_client_error(client_socket, Command.ERR_NEEDMOREPARAMS, recepient=session_info.nickname)
-    try:
-        server._channels.join(channel_name, session_info.nickname)
-        names = server._channels.get_names(channel_name)
-        symbol = server._channels.get_symbol(channel_name)
-        topic = server._channels.get_topic(channel_name)
-    except NoSuchChannel:
-        RoutingManager.respond_client_error(
-            client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
-        )
+        return
 
-    RoutingManager.respond_client(
-        client_socket,
-        prefix=None,
-        command=Command.RPL_TOPIC,
-        recepient=session_info.nickname,
-        channel=channel_name,
-        trailing=topic,
-    )
-    RoutingManager.respond_client(
-        client_socket,
-        prefix=None,
-        command=Command.RPL_NAMREPLY,
-        recepient=session_info.nickname,
-        symbol=symbol,
-        channel=channel_name,
-        trailing=names,
-    )
-    channel = server._channels.get_channel(channel_name)
-    message.prefix = Prefix(session_info.nickname, session_info.username, server.nickname)
+    keys = message.params["key"].split(",") if "key" in message.params else []
+    requested: dict[str, str] = {}
+    for idx, channel_name in enumerate(channel_names):
+        if not IRCValidator.validate_channel(channel_name):
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
+            )
+            continue
+        requested.setdefault(channel_name, keys[idx] if idx < len(keys) else "")
 
-    RoutingManager.send_to_channel(server, channel, message)
+    prefix = Prefix(session_info.nickname, session_info.username, server.nickname)
+    for channel_name, error in server._channels.join_channels(session_info.nickname, list(requested.items())).items():
+        if isinstance(error, BannedFromChannel):
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_BANNEDFROMCHAN, recepient=session_info.nickname, channel=channel_name
+            )
+            continue
+        if isinstance(error, BadChannelKey):
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_BADCHANNELKEY, recepient=session_info.nickname, channel=channel_name
+            )
+            continue
+        try:
+            channel = server._channels.get_channel(channel_name)
+        except NoSuchChannel:
+            # kicked by another thread before the replies were sent
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
+            )
+            continue
+
+        RoutingManager.respond_client(
+            client_socket,
+            prefix=None,
+            command=Command.RPL_TOPIC,
+            recepient=session_info.nickname,
+            channel=channel_name,
+            trailing=channel.topic,
+        )
+        helpers.send_names(
+            client_socket, session_info.nickname, channel_name, channel.channel_symbol(), channel.names_chunks()
+        )
+        join = Message(prefix=prefix, command=Command.JOIN, params=parametrize(Command.JOIN, channel=channel_name))
+        RoutingManager.send_to_channel(server, channel, join)
 
 
 def handle_names_command(
@@ -611,24 +845,9 @@ def handle_names_command(
         RoutingManager.respond_client_error(
             client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
         )
+        return
 
-    RoutingManager.respond_client(
-        client_socket,
-        prefix=None,
-        command=Command.RPL_NAMREPLY,
-        recepient=session_info.nickname,
-        channel=channel_name,
-        symbol=symbol,
-        trailing=names,
-    )
-
-    RoutingManager.respond_client(
-        client_socket,
-        prefix=None,
-        command=Command.RPL_ENDOFNAMES,
-        recepient=session_info.nickname,
-        channel=channel_name,
-    )
+    helpers.send_names(client_socket, session_info.nickname, channel_name, symbol, names)
 
 
 def handle_part_command(
@@ -638,7 +857,7 @@ def handle_part_command(
     Handles recieved PART command
 
     Command: PART
-        Parameters: <channel>
+        Parameters: <channel>{,<channel>}
 
     Numeric Replies:
     - ERR_NEEDMOREPARAMS
@@ -646,7 +865,7 @@ def handle_part_command(
     - ERR_NOTONCHANNEL
 
     Checks if: user is known(session info), required channel name is present
-    Delegates performing PART operation to channel manager.
+    Delegates performing PART operation of all listed channels at once to channel manager.
     If PART operation performed correctly, notifies channel users and user kicked from channel.
 
     :param server: Current server instance
@@ -671,20 +890,20 @@ def handle_part_command(
         RoutingManager.respond_client_error(client_socket, Command.ERR_NEEDMOREPARAMS)
         return
     prefix = Prefix(session_info.nickname, session_info.username, server.nickname)
-    message.prefix = prefix
-    try:
-        server._channels.part_from_channel(channel_name, session_info.nickname)
-        channel = server._channels.get_channel(channel_name)
-        RoutingManager.send_to_channel(server, channel, message)
-        RoutingManager.forward_to_user(server, session_info.nickname, message)
-    except NoSuchChannel:
-        RoutingManager.respond_client_error(
-            client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
-        )
-    except NotOnChannel:
-        RoutingManager.respond_client_error(
-            client_socket, Command.ERR_NOTONCHANNEL, recepient=session_info.nickname, channel=channel_name
-        )
+    channel_names = list(dict.fromkeys(channel_name.split(",")))
+    for channel_name, result in server._channels.part_channels(session_info.nickname, channel_names).items():
+        if isinstance(result, NoSuchChannel):
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOSUCHCHANNEL, recepient=session_info.nickname, channel=channel_name
+            )
+        elif isinstance(result, NotOnChannel):
+            RoutingManager.respond_client_error(
+                client_socket, Command.ERR_NOTONCHANNEL, recepient=session_info.nickname, channel=channel_name
+            )
+        elif isinstance(result, Channel):
+            part = Message(prefix=prefix, command=Command.PART, params=parametrize(Command.PART, channel=channel_name))
+            RoutingManager.send_to_channel(server, result, part)
+            RoutingManager.forward_to_user(server, session_info.nickname, part)
 
 
 def handle_kick_command(
@@ -771,4 +990,6 @@ CMD_FUNCTIONS = {
     Command.PART: handle_part_command,
     Command.KICK: handle_kick_command,
     Command.CONNECT: handle_connect_command,
+    Command.REHASH: handle_rehash_command,
+    Command.STATS: handle_stats_command,
 }
@@ -1,7 +1,14 @@
 import socket
+import select
+import time
 import logging
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from queue import Queue, Empty
+from psirc.ingress_queue import IngressQueue, IngressStats
+from psirc.line_buffer import LineBuffer
+from psirc.metrics import LinkStats, Traffic
+from psirc.send_queue import SendQueue
+from psirc.throttle import AcceptThrottle, RateLimit, TokenBucket
 
 
 class ConnectionManager:
@@ -14,26 +21,71 @@ class ConnectionManager:
     :type port: `string`
     :param executor: thread pool executor for class
     :type executor: `ThreadPoolExecutor`
+    :param sendq: maximum number of bytes waiting to be sent to a single connection
+    :type sendq: `int`
+    :param accept_limit: connections accepted from a single ip address, unlimited if None
+    :type accept_limit: `RateLimit | None`
+    :param command_limit: lines read from a single accepted connection, unlimited if None.
+        Lines over the limit are not read, they wait in the socket buffer.
+    :type command_limit: `RateLimit | None`
+    :param ingress_limit: maximum number of received lines waiting to be handled
+    :type ingress_limit: `int`
+    :param ingress_per_socket: maximum number of waiting lines received from a single socket,
+        the socket is not read until some of them are handled
+    :type ingress_per_socket: `int`
     :field _running: set True after start method,
     :type _running: `bool`
     :field _socket: server's socket
     :type _socket: `socket.socket`
-    :field _queue: queue of messages received from connected sockets
-    :type queue: `Queue`
+    :field _queue: bounded queue of messages received from connected sockets
+    :type queue: `IngressQueue`
     :field _connection: set of connected sockets
     :type _connections: `set`
+    :field _pending_sends: send queues waiting for their socket to become writable
+    :type _pending_sends: `deque`
+    :field _command_buckets: command rate limit of every limited connection
+    :type _command_buckets: `dict[socket.socket, TokenBucket]`
+    :field _addresses: printable peer address of every connected socket
+    :type _addresses: `dict[socket.socket, str]`
+    :field _traffic: data received from every connected socket
+    :type _traffic: `dict[socket.socket, Traffic]`
     """
 
-    def __init__(self, host: str, port: int, thread_pool: ThreadPoolExecutor) -> None:
+    RECV_SIZE = 4096
+    # queued in place of a message once a connection is closed, received lines are never empty
+    CONNECTION_LOST = ""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        thread_pool: ThreadPoolExecutor,
+        *,
+        sendq: int = SendQueue.DEFAULT_LIMIT,
+        accept_limit: RateLimit | None = None,
+        command_limit: RateLimit | None = None,
+        ingress_limit: int = IngressQueue.DEFAULT_LIMIT,
+        ingress_per_socket: int = IngressQueue.DEFAULT_PER_SOCKET,
+    ) -> None:
         self.host = host
         self.port = port
         self.executor = thread_pool
+        self.sendq = sendq
+        self.command_limit = command_limit
+        self._accept_throttle = AcceptThrottle(accept_limit) if accept_limit else None
+        self._command_buckets: dict[socket.socket, TokenBucket] = {}
         self._running = False
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._socket.bind((self.host, self.port))
-        self._queue: Queue[tuple[socket.socket, str]] = Queue()
+        self._queue = IngressQueue(ingress_limit, ingress_per_socket, marker=self.CONNECTION_LOST)
         self._connections: set[socket.socket] = set()
+        self._addresses: dict[socket.socket, str] = {}
+        self._traffic: dict[socket.socket, Traffic] = {}
+        self._pending_sends: deque[SendQueue] = deque()
+        self._flush_waker, self._flush_wakeup_socket = socket.socketpair()
+        self._flush_waker.setblocking(False)
+        self._flush_wakeup_socket.setblocking(False)
 
     def start(self) -> None:
         """Start thread accepting connections.
@@ -46,10 +98,27 @@ class ConnectionManager:
         self._running = True
 
         self.executor.submit(self._accept_connections)
+        self.executor.submit(self._flush_send_queues)
+
+    def exempt(self, client_socket: socket.socket) -> None:
+        """Stop limiting commands read from a connection, e.g. once it registers as a server.
+
+        :param client_socket: connected socket
+        :type client_socket: ``socket.socket``
+        """
+        self._command_buckets.pop(client_socket, None)
 
     def disconnect_client(self, client_socket: socket.socket) -> None:
-        if client_socket in self._connections:
-            self._connections.remove(client_socket)
+        self._connections.discard(client_socket)
+        self._command_buckets.pop(client_socket, None)
+        self._addresses.pop(client_socket, None)
+        self._traffic.pop(client_socket, None)
+        SendQueue.detach(client_socket)
+        try:
+            # wakes up the thread blocked on recv
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         client_socket.close()
 
     def _accept_connections(self) -> None:
@@ -57,52 +126,195 @@ class ConnectionManager:
             try:
                 logging.info("ConnectionManager: waiting for connection...")
                 client_socket, client_address = self._socket.accept()
+                if not self._accept_allowed(client_socket, client_address[0]):
+                    continue
                 logging.info(f"ConnectionManager: Connected with {client_address}")
-                self._connections.add(client_socket)
-
-                self.executor.submit(self._handle_connection, client_socket, client_address)
+                self._limit_commands(client_socket)
+                self._serve(client_socket, str(client_address))
             except socket.error as e:
                 if not self._running:
                     break
                 logging.warning(f"ConnectionManager: server socket error: {e}")
             except Exception as e:
-                print(f"exception: {e}")
+                logging.error("ConnectionManager: unexpected error while accepting: %s", e)
+
+    def _accept_allowed(self, client_socket: socket.socket, address: str) -> bool:
+        """Check accept throttle, close the connection if address connects too often."""
+        if self._accept_throttle is None or self._accept_throttle.allow(address):
+            return True
+        logging.warning(f"ConnectionManager: {address} is reconnecting too fast, connection refused")
+        try:
+            client_socket.send(b"ERROR :Trying to reconnect too fast.\r\n", socket.MSG_DONTWAIT)
+        except OSError:
+            pass
+        client_socket.close()
+        return False
+
+    def _limit_commands(self, client_socket: socket.socket) -> None:
+        if self.command_limit:
+            self._command_buckets[client_socket] = self.command_limit.bucket()
+
+    def _serve(self, client_socket: socket.socket, client_address: str) -> None:
+        """Start receiving data from a newly connected socket.
+
+        :param client_socket: connected socket
+        :type client_socket: ``socket.socket``
+        :param client_address: printable address of the peer
+        :type client_address: ``str``
+        """
+        self._connections.add(client_socket)
+        self._addresses[client_socket] = client_address
+        self._traffic[client_socket] = Traffic()
+        self._attach_send_queue(client_socket)
+        self.executor.submit(self._handle_connection, client_socket, client_address)
+
+    def _attach_send_queue(self, client_socket: socket.socket) -> None:
+        # writes are already coalesced per batch, don't hold them waiting for ACKs of previous ones
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        SendQueue.attach(
+            client_socket, self.sendq, on_pending=self._send_pending, on_exceeded=self._send_queue_exceeded
+        )
+
+    def _send_pending(self, send_queue: SendQueue) -> None:
+        """Hand send queue over to the thread flushing queues of slow readers."""
+        self._pending_sends.append(send_queue)
+        try:
+            self._flush_wakeup_socket.send(b"\0")
+        except OSError:
+            pass
+
+    def _send_queue_exceeded(self, send_queue: SendQueue) -> None:
+        logging.warning("ConnectionManager: SendQ exceeded, disconnecting client")
+        self.disconnect_client(send_queue.socket)
+
+    def _flush_send_queues(self) -> None:
+        """Flush send queues as their sockets become writable."""
+        waiting: set[SendQueue] = set()
+        waker_fd = self._flush_waker.fileno()
+        while self._running:
+            poller = select.poll()
+            poller.register(waker_fd, select.POLLIN)
+            queues_by_fd = {}
+            for send_queue in list(waiting):
+                fd = send_queue.socket.fileno()
+                if send_queue.closed or fd == -1:
+                    waiting.discard(send_queue)
+                    continue
+                queues_by_fd[fd] = send_queue
+                poller.register(fd, select.POLLOUT)
+
+            for fd, _ in poller.poll(1000):
+                if fd == waker_fd:
+                    try:
+                        while self._flush_waker.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    while self._pending_sends:
+                        waiting.add(self._pending_sends.popleft())
+                elif queues_by_fd[fd].flush():
+                    waiting.discard(queues_by_fd[fd])
 
     def _handle_connection(self, client_socket: socket.socket, client_address: str) -> None:
+        lines = LineBuffer()
+        recv_buffer = bytearray(self.RECV_SIZE)
+        recv_view = memoryview(recv_buffer)
+        traffic = self._traffic.get(client_socket) or Traffic()
         while self._running:
             try:
-                data_recieved = client_socket.recv(4096)
-                data_list = data_recieved.decode().splitlines(True)
-                for data in data_list:
-                    if data:
-                        self._queue.put((client_socket, data))
-                        continue
-                    # TODO: handle disconnecting (send info downstream)
-
-            except UnicodeError:
-                logging.warning("ConnectionManager: " + f"Message from {client_address} was not valid unicode")
+                received = client_socket.recv_into(recv_buffer)
+                if not received:
+                    # connection closed by peer
+                    break
+                traffic.received_bytes += received
+                for data in lines.feed(recv_view[:received]):
+                    traffic.received_lines += 1
+                    self._wait_for_token(client_socket)
+                    self._enqueue(client_socket, data)
 
             except OSError as e:
                 if not self._running and client_socket in self._connections:
                     logging.warning("ConnectionManager: " + f"{client_address} socket error: {e}")
                 break
             except Exception as e:
-                print(f"exception in handle connection {e}")
+                logging.error("ConnectionManager: unexpected error in handle connection: %s", e)
 
+        if self._running:
+            self._queue.put(client_socket, self.CONNECTION_LOST)
         self.disconnect_client(client_socket)
 
+    def _wait_for_token(self, client_socket: socket.socket) -> None:
+        """Block reading thread until connection is allowed to send another line."""
+        while self._running and (bucket := self._command_buckets.get(client_socket)):
+            delay = bucket.take()
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def _enqueue(self, client_socket: socket.socket, data: str) -> None:
+        """Queue received line, block reading thread while the queue is full."""
+        if self._queue.try_put(client_socket, data):
+            return
+        logging.warning(f"ConnectionManager: ingress queue full, pausing {self._addresses.get(client_socket)}")
+        while not self._queue.put(client_socket, data, timeout=1):
+            if not self._running or client_socket not in self._connections:
+                self._queue.drop(1)
+                return
+
+    def ingress_stats(self) -> IngressStats:
+        """Get a snapshot of the queue of received messages, waiting lines are counted per peer address.
+
+        :rtype: ``IngressStats``
+        """
+        stats = self._queue.stats()
+        pending = {self._addresses.get(client_socket, "closed"): count for client_socket, count in stats.pending.items()}
+        return stats._replace(pending=pending)
+
+    def link_stats(self) -> dict[socket.socket, LinkStats]:
+        """Get traffic of every connection, named by peer address.
+
+        :rtype: ``dict[socket.socket, LinkStats]``
+        """
+        now = time.monotonic()
+        stats = {}
+        for client_socket, traffic in list(self._traffic.items()):
+            send_queue = SendQueue.of(client_socket)
+            stats[client_socket] = LinkStats(
+                self._addresses.get(client_socket, "closed"),
+                send_queue.size if send_queue else 0,
+                send_queue.sent_messages if send_queue else 0,
+                send_queue.sent_bytes if send_queue else 0,
+                traffic.received_lines,
+                traffic.received_bytes,
+                int(now - traffic.connected),
+            )
+        return stats
+
     def get_message(self, blocking: bool = True, timeout: float | None = None) -> tuple[socket.socket, str] | None:
         """Get received message from a connected socket.
 
+        Once a connection is closed, ``CONNECTION_LOST`` is returned as its last message.
+
         :param blocking: block until new message is available
         :type blocking: ``bool``
         :return: Socket and data received from said socket
         :rtype: ``Tuple[socket.socket, str]``
         """
-        try:
-            return self._queue.get(blocking, timeout=timeout)
-        except Empty:
-            return None
+        return self._queue.get(blocking, timeout=timeout)
+
+    def get_messages(self, max_n: int, timeout: float | None = None) -> list[tuple[socket.socket, str]]:
+        """Get up to ``max_n`` received messages at once, wait only for the first one.
+
+        Messages of a single socket are returned in the order they were received.
+
+        :param max_n: maximum number of messages
+        :type max_n: ``int``
+        :param timeout: seconds to wait for the first message, as long as needed if None
+        :type timeout: ``float | None``
+        :return: Sockets and data received from said sockets, empty if there was none in time
+        :rtype: ``list[tuple[socket.socket, str]]``
+        """
+        return self._queue.get_many(max_n, timeout)
 
     def stop(self) -> None:
         """Close server socket and connected sockets.
@@ -110,9 +322,14 @@ class ConnectionManager:
         Should terminate related threads
         """
         self._running = False
+        try:
+            # wakes up the thread blocked on accept
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self._socket.close()
         while self._connections:
-            self._connections.pop().close()
+            self.disconnect_client(self._connections.pop())
 
     def connect_to(self, address: str, port: int) -> socket.socket | None:
         """Open new connection with address. Used to connect to other servers.
@@ -131,9 +348,7 @@ class ConnectionManager:
             logging.info(f"ConnectionManager: Connected to {address}:{port}")
 
             client_socket.settimeout(None)
-            self._connections.add(client_socket)
-
-            self.executor.submit(self._handle_connection, client_socket, f"{address}:{port}")
+            self._serve(client_socket, f"{address}:{port}")
             return client_socket
         except socket.timeout:
             logging.warning(f"ConnectionManager: Connection to {address}:{port} timed out")
@@ -7,6 +7,11 @@ class Command(Enum):
     RPL_NONE = 300
     RPL_USERHOST = 302
 
+    # Stats message
+    RPL_STATSLINKINFO = 211
+    RPL_STATSCOMMANDS = 212
+    RPL_ENDOFSTATS = 219
+
     # Away message
     RPL_AWAY = 305
     RPL_UNAWAY = 301
@@ -24,6 +29,7 @@ class Command(Enum):
     RPL_NAMREPLY = 353
     RPL_ENDOFNAMES = 366
     RPL_YOUREOPER = 381
+    RPL_REHASHING = 382
 
     # ------------ ERRORS -------------
     ERR_NOSUCHNICK = 401
@@ -45,6 +51,8 @@ class Command(Enum):
     ERR_NEEDMOREPARAMS = 461
     ERR_ALREADYREGISTRED = 462
     ERR_PASSWDMISMATCH = 464
+    ERR_BANNEDFROMCHAN = 474
+    ERR_BADCHANNELKEY = 475
     ERR_NOPRIVILEGES = 481
     ERR_CHANOPRIVSNEEDED = 482
 
@@ -66,6 +74,8 @@ class Command(Enum):
     NAMES = 1012
     PART = 1013
     KICK = 1014
+    REHASH = 1015
+    STATS = 1016
 
     CAP = 2000
 
@@ -0,0 +1,101 @@
+import socket
+import logging
+import threading
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from queue import Empty, Queue
+
+
+class ShardedDispatcher:
+    """
+    Runs message handling on a fixed set of worker threads.
+
+    Work is partitioned by connection - every message received from a socket is
+    handled by the same worker, so messages of one connection are handled in
+    the order they were received, while messages of different connections are
+    handled concurrently. Worker queues are bounded, a busy worker blocks
+    ``submit`` so that received messages pile up in the connection manager,
+    which then stops reading from the noisiest sockets. Workers take every message
+    waiting in their queue (up to ``BATCH_SIZE``) and handle them inside a single
+    ``batch`` context, e.g. with replies written once per socket at its end.
+
+    :param workers: number of worker threads
+    :type workers: ``int``
+    :param handler: function handling a single received message
+    :type handler: ``Callable[[socket.socket, str], None]``
+    :param limit: maximum number of messages waiting for a single worker
+    :type limit: ``int``
+    :param batch: context manager entered around every batch of messages
+    :type batch: ``Callable[[], AbstractContextManager]``
+    """
+
+    DEFAULT_LIMIT = 1000
+    BATCH_SIZE = 256
+
+    def __init__(
+        self,
+        workers: int,
+        handler: Callable[[socket.socket, str], None],
+        limit: int = DEFAULT_LIMIT,
+        *,
+        batch: Callable[[], AbstractContextManager] = nullcontext,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Dispatcher needs at least one worker")
+        self._handler = handler
+        self._batch = batch
+        self._queues: list[Queue[tuple[socket.socket, str] | None]] = [Queue(limit) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(work_queue,), name=f"psirc-dispatch-{idx}", daemon=True)
+            for idx, work_queue in enumerate(self._queues)
+        ]
+
+    def start(self) -> None:
+        """Start worker threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, client_socket: socket.socket, data: str) -> None:
+        """Queue message to be handled by the worker owning the socket, wait while its queue is full.
+
+        :param client_socket: socket from which the message was received
+        :type client_socket: ``socket.socket``
+        :param data: received message
+        :type data: ``str``
+        """
+        self._queues[hash(client_socket) % len(self._queues)].put((client_socket, data))
+
+    def depth(self) -> int:
+        """Number of messages waiting for workers."""
+        return sum(work_queue.qsize() for work_queue in self._queues)
+
+    def stop(self) -> None:
+        """Handle messages already queued and stop worker threads."""
+        for work_queue in self._queues:
+            work_queue.put(None)
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+
+    def _work(self, work_queue: "Queue[tuple[socket.socket, str] | None]") -> None:
+        stopping = False
+        while not stopping:
+            items = []
+            item = work_queue.get()
+            while item is not None:
+                items.append(item)
+                if len(items) >= self.BATCH_SIZE:
+                    break
+                try:
+                    item = work_queue.get_nowait()
+                except Empty:
+                    break
+            stopping = item is None
+            if not items:
+                continue
+            with self._batch():
+                for client_socket, data in items:
+                    try:
+                        self._handler(client_socket, data)
+                    except Exception as e:
+                        logging.error(f"Dispatcher: unhandled error while handling message: {e}")
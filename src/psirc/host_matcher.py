@@ -0,0 +1,121 @@
+import ipaddress
+
+
+class _Node:
+    """Element of an address pattern, ``ends`` hold patterns ending here, ``rest`` patterns ending with ``*``"""
+
+    __slots__ = ("children", "ends", "rest")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.ends: dict[str, tuple[int, str]] = {}
+        self.rest: dict[str, tuple[int, str]] = {}
+
+
+class HostMatcher:
+    """
+    I-line ``hostname@address`` patterns compiled for lookup
+
+    The hostname is either ``*`` or matched exactly. The address is matched element by
+    element (split on dots) as a prefix of the client address, a ``*`` element matches
+    the rest of it. Address patterns are kept in a trie, so a lookup walks the client
+    address once, no matter how many patterns there are. An address can also be
+    a CIDR network (``10.0.0.0/8``, ``fe80::/10``), networks are kept by prefix length.
+    When more patterns match, the one added first wins.
+
+    :field _root: root of the address element trie
+    :type _root: ``_Node``
+    :field _networks: ip version to prefix length to network to patterns
+    :type _networks: ``dict[int, dict[int, dict[int, dict[str, tuple[int, str]]]]]``
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self._networks: dict[int, dict[int, dict[int, dict[str, tuple[int, str]]]]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, pattern: str) -> bool:
+        """Add a ``hostname@address`` pattern, matched after all patterns added before
+
+        :param pattern: The pattern
+        :type pattern: ``str``
+        :return: False if pattern is not valid
+        :rtype: ``bool``
+        """
+        hostname, separator, address = pattern.partition("@")
+        if not separator or "@" in address:
+            return False
+        entry = (self._count, pattern)
+        self._count += 1
+
+        if "/" in address:
+            try:
+                network = ipaddress.ip_network(address, strict=False)
+            except ValueError:
+                pass
+            else:
+                networks = self._networks.setdefault(network.version, {}).setdefault(network.prefixlen, {})
+                key = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+                networks.setdefault(key, {}).setdefault(hostname, entry)
+                return True
+
+        node = self._root
+        for element in address.split("."):
+            if element == "*":
+                # elements past the wildcard are never compared
+                node.rest.setdefault(hostname, entry)
+                return True
+            node = node.children.setdefault(element, _Node())
+        node.ends.setdefault(hostname, entry)
+        return True
+
+    def match(self, hostname: str, address: str) -> str | None:
+        """Find the first added pattern matching the client
+
+        :param hostname: hostname of the client
+        :type hostname: ``str``
+        :param address: address of the client
+        :type address: ``str``
+        :return: The matching pattern, as it was added
+        :rtype: ``str`` or ``None``
+        """
+        best: tuple[int, str] | None = None
+        node = self._root
+        for element in address.split("."):
+            # wildcard matches only when there is an element left
+            best = self._first(best, node.rest, hostname)
+            next_node = node.children.get(element)
+            if next_node is None:
+                break
+            node = next_node
+            best = self._first(best, node.ends, hostname)
+
+        if self._networks:
+            best = self._match_network(best, hostname, address)
+        return best[1] if best else None
+
+    def _match_network(self, best: tuple[int, str] | None, hostname: str, address: str) -> tuple[int, str] | None:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return best
+        value = int(ip)
+        for prefixlen, networks in self._networks.get(ip.version, {}).items():
+            patterns = networks.get(value >> (ip.max_prefixlen - prefixlen))
+            if patterns:
+                best = self._first(best, patterns, hostname)
+        return best
+
+    @staticmethod
+    def _first(
+        best: tuple[int, str] | None, patterns: dict[str, tuple[int, str]], hostname: str
+    ) -> tuple[int, str] | None:
+        if not patterns:
+            return best
+        for candidate in (patterns.get(hostname), patterns.get("*")):
+            if candidate and (best is None or candidate < best):
+                best = candidate
+        return best
@@ -0,0 +1,217 @@
+from __future__ import annotations
+import socket
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import NamedTuple
+
+
+class IngressStats(NamedTuple):
+    """
+    Snapshot of the ingress queue
+
+    :field depth: lines waiting to be handled
+    :type depth: ``int``
+    :field limit: maximum number of waiting lines
+    :type limit: ``int``
+    :field pending: lines waiting per socket (or per peer address)
+    :type pending: ``dict[socket.socket, int] | dict[str, int]``
+    :field paused: sockets not being read because of a full queue
+    :type paused: ``int``
+    :field pauses: times a socket was paused since start
+    :type pauses: ``int``
+    :field dropped: lines dropped since start, e.g. received from a socket closed while paused
+    :type dropped: ``int``
+    """
+
+    depth: int
+    limit: int
+    pending: dict[socket.socket, int] | dict[str, int]
+    paused: int
+    pauses: int
+    dropped: int
+
+
+class IngressQueue:
+    """
+    Bounded queue of lines received from all connections
+
+    Holds at most ``limit`` lines, a single socket at most ``per_socket`` of them,
+    so a noisy connection is paused long before others are. Producers either block
+    until there is room (threaded connections), or use ``try_put`` and wait
+    for ``on_room`` to be called (event loop). Paused producers are woken up once
+    a quarter of the limit is free, not on every taken line. Connection lost markers
+    are always accepted, they are never counted towards the limits.
+
+    :param limit: maximum number of waiting lines
+    :type limit: ``int``
+    :param per_socket: maximum number of waiting lines of a single socket
+    :type per_socket: ``int``
+    :param marker: data put when a connection is lost
+    :type marker: ``str``
+    :field on_room: called by the consumer when room was made for paused producers
+    :type on_room: ``Callable[[], None] | None``
+    """
+
+    DEFAULT_LIMIT = 10000
+    DEFAULT_PER_SOCKET = 1000
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, per_socket: int = DEFAULT_PER_SOCKET, *, marker: str = "") -> None:
+        self.limit = limit
+        self.per_socket = min(per_socket, limit)
+        self.marker = marker
+        self._low = limit - max(1, limit // 4)
+        self._low_per_socket = self.per_socket - max(1, self.per_socket // 4)
+        self.on_room: Callable[[], None] | None = None
+        self._items: deque[tuple[socket.socket, str]] = deque()
+        self._pending: dict[socket.socket, int] = {}
+        self._depth = 0  # lines, markers excluded
+        self._paused: set[socket.socket] = set()
+        self._pauses = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._room = threading.Condition(self._lock)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def try_put(self, client_socket: socket.socket, data: str) -> bool:
+        """Put a line received from socket if there is room for it, mark socket paused if not.
+
+        :param client_socket: socket the line was received from
+        :type client_socket: ``socket.socket``
+        :param data: received line
+        :type data: ``str``
+        :return: False if there was no room, ``on_room`` is called once there is
+        :rtype: ``bool``
+        """
+        with self._lock:
+            if not self._fits(client_socket):
+                self._pause(client_socket)
+                return False
+            self._append(client_socket, data)
+            return True
+
+    def put(self, client_socket: socket.socket, data: str, timeout: float | None = None) -> bool:
+        """Put a line received from socket, wait until there is room for it.
+
+        :param client_socket: socket the line was received from
+        :type client_socket: ``socket.socket``
+        :param data: received line or the connection lost marker
+        :type data: ``str``
+        :param timeout: seconds to wait for room, wait as long as needed if None
+        :type timeout: ``float | None``
+        :return: False if there was no room in time, the line is not put then
+        :rtype: ``bool``
+        """
+        with self._lock:
+            if data != self.marker and not self._fits(client_socket):
+                self._pause(client_socket)
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while not self._fits(client_socket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._paused.discard(client_socket)
+                        return False
+                    self._room.wait(remaining)
+                self._paused.discard(client_socket)
+            self._append(client_socket, data)
+        return True
+
+    def get(self, blocking: bool = True, timeout: float | None = None) -> tuple[socket.socket, str] | None:
+        """Take the oldest line.
+
+        :return: Socket and data received from said socket, None if there was none in time
+        :rtype: ``tuple[socket.socket, str] | None``
+        """
+        with self._lock:
+            if not self._items:
+                if not blocking:
+                    return None
+                self._not_empty.wait_for(lambda: self._items, timeout)
+                if not self._items:
+                    return None
+            item = self._items.popleft()
+            notify = self._remove(item)
+        if notify and self.on_room:
+            self.on_room()
+        return item
+
+    def get_many(self, max_n: int, timeout: float | None = None) -> list[tuple[socket.socket, str]]:
+        """Take up to ``max_n`` oldest lines at once, wait only for the first one.
+
+        :param max_n: maximum number of lines taken
+        :type max_n: ``int``
+        :param timeout: seconds to wait for the first line, as long as needed if None
+        :type timeout: ``float | None``
+        :return: Sockets and data received from said sockets, empty if there was none in time
+        :rtype: ``list[tuple[socket.socket, str]]``
+        """
+        with self._lock:
+            if not self._items:
+                self._not_empty.wait_for(lambda: self._items, timeout)
+            items = []
+            notify = False
+            while self._items and len(items) < max_n:
+                item = self._items.popleft()
+                items.append(item)
+                notify |= self._remove(item)
+        if notify and self.on_room:
+            self.on_room()
+        return items
+
+    def drop(self, count: int) -> None:
+        """Count lines dropped by a producer, e.g. held lines of a closed socket."""
+        with self._lock:
+            self._dropped += count
+
+    def resumed(self, client_socket: socket.socket) -> None:
+        """Mark socket paused by ``try_put`` as no longer paused."""
+        with self._lock:
+            self._paused.discard(client_socket)
+
+    def stats(self) -> IngressStats:
+        with self._lock:
+            return IngressStats(
+                self._depth, self.limit, dict(self._pending), len(self._paused), self._pauses, self._dropped
+            )
+
+    def _fits(self, client_socket: socket.socket) -> bool:
+        return self._depth < self.limit and self._pending.get(client_socket, 0) < self.per_socket
+
+    def _pause(self, client_socket: socket.socket) -> None:
+        if client_socket not in self._paused:
+            self._paused.add(client_socket)
+            self._pauses += 1
+
+    def _append(self, client_socket: socket.socket, data: str) -> None:
+        self._items.append((client_socket, data))
+        if data != self.marker:
+            self._depth += 1
+            self._pending[client_socket] = self._pending.get(client_socket, 0) + 1
+        self._not_empty.notify()
+
+    def _remove(self, item: tuple[socket.socket, str]) -> bool:
+        """Count out a taken line, wake up paused producers.
+
+        :return: True if ``on_room`` has to be called
+        """
+        client_socket, data = item
+        if data == self.marker:
+            return False
+        self._depth -= 1
+        pending = self._pending[client_socket] - 1
+        if pending:
+            self._pending[client_socket] = pending
+        else:
+            del self._pending[client_socket]
+        if not self._paused:
+            return False
+        if self._depth == self._low or (
+            client_socket in self._paused and pending == self._low_per_socket and self._depth < self.limit
+        ):
+            self._room.notify_all()
+            return True
+        return False
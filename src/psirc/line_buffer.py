@@ -0,0 +1,80 @@
+import logging
+
+
+class LineBuffer:
+    """
+    Reassembles IRC lines from data received on a stream socket.
+
+    Received bytes are appended to a per-connection ``bytearray`` and only
+    complete lines are returned. Lines are split at the byte level, before
+    decoding, so a UTF-8 codepoint split between two ``recv`` calls is decoded
+    only once the whole line arrived. Lines longer than the RFC 1459 limit of
+    512 bytes (including CR-LF) are dropped.
+
+    :param max_line_length: maximum length of a line in bytes, including CR-LF
+    :type max_line_length: ``int``
+    :field dropped: number of lines dropped because of length or encoding
+    :type dropped: ``int``
+    """
+
+    MAX_LINE_LENGTH = 512
+
+    def __init__(self, max_line_length: int = MAX_LINE_LENGTH) -> None:
+        self.max_line_length = max_line_length
+        self.dropped = 0
+        self._buffer = bytearray()
+        self._scanned = 0  # bytes of _buffer already checked for a line feed
+        self._discarding = False  # dropping the rest of an overlong line
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes | bytearray | memoryview) -> list[str]:
+        """Add received data to the buffer and return all complete lines.
+
+        Line terminators are stripped, both ``\\r\\n`` and bare ``\\n`` end a line.
+        Empty lines are skipped.
+
+        :param data: data received from the socket
+        :type data: ``bytes | bytearray | memoryview``
+        :return: decoded complete lines
+        :rtype: ``list[str]``
+        """
+        buffer = self._buffer
+        buffer += data
+        lines: list[str] = []
+        start = 0
+        end = buffer.find(b"\n", self._scanned)
+        while end != -1:
+            if self._discarding:
+                self._discarding = False
+            elif end + 1 - start > self.max_line_length:
+                self._drop("line too long")
+            else:
+                stop = end - 1 if end > start and buffer[end - 1] == 13 else end  # 13 - \r
+                if stop > start:
+                    self._decode(buffer, start, stop, lines)
+            start = end + 1
+            end = buffer.find(b"\n", start)
+
+        if self._discarding or len(buffer) - start >= self.max_line_length:
+            # no line feed in sight - drop what we have and skip until the next one
+            if not self._discarding:
+                self._drop("line too long")
+                self._discarding = True
+            start = len(buffer)
+
+        if start:
+            del buffer[:start]
+        self._scanned = len(buffer)
+        return lines
+
+    def _decode(self, buffer: bytearray, start: int, stop: int, lines: list[str]) -> None:
+        try:
+            lines.append(buffer[start:stop].decode())
+        except UnicodeError:
+            self._drop("not valid unicode")
+
+    def _drop(self, reason: str) -> None:
+        self.dropped += 1
+        logging.warning("LineBuffer: dropped received line: %s", reason)
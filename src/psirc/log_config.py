@@ -0,0 +1,105 @@
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import TextIO
+
+FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# per-message logs (received lines, responses, forwarded messages, joins), logged at DEBUG
+# and off unless enabled with ``configure_logging(messages=True)``, whatever the root level is
+message_log = logging.getLogger("psirc.messages")
+message_log.setLevel(logging.WARNING)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Passes every ``rate``-th record, drops the others
+
+    :param rate: one of how many records is passed
+    :type rate: ``int``
+    """
+
+    def __init__(self, rate: int) -> None:
+        super().__init__()
+        self.rate = rate
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return next(self._counter) % self.rate == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler which never blocks the logging thread, records are dropped while the queue is full
+
+    :param limit: maximum number of records waiting to be written
+    :type limit: ``int``
+    :field dropped: records dropped because of a full queue
+    :type dropped: ``int``
+    """
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(queue.Queue(limit))
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    *,
+    messages: bool = False,
+    sample: int = 1,
+    queued: bool = True,
+    limit: int = 10000,
+    stream: TextIO | None = None,
+) -> logging.handlers.QueueListener | None:
+    """Set up logging of the server, replacing handlers of the root logger.
+
+    When queued, the thread logging a record still merges its message with
+    the arguments (``QueueHandler.prepare`` does ``msg % args``) before putting
+    it on a queue, formatting timestamps and writing to the stream is done by
+    a listener thread.
+
+    :param level: level of the root logger
+    :type level: ``int``
+    :param messages: log every received, sent and forwarded message
+    :type messages: ``bool``
+    :param sample: log only every ``sample``-th message, other logs are not sampled
+    :type sample: ``int``
+    :param queued: write records on a listener thread, write them right away if False
+    :type queued: ``bool``
+    :param limit: maximum number of records waiting for the listener
+    :type limit: ``int``
+    :param stream: stream written to, ``sys.stderr`` if None
+    :type stream: ``TextIO | None``
+    :return: started listener, stop it to write remaining records; None if not queued
+    :rtype: ``logging.handlers.QueueListener | None``
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    root = logging.getLogger()
+    for previous in root.handlers[:]:
+        root.removeHandler(previous)
+    root.setLevel(level)
+
+    message_log.setLevel(logging.DEBUG if messages else logging.WARNING)
+    for previous_filter in message_log.filters[:]:
+        message_log.removeFilter(previous_filter)
+    if sample > 1:
+        message_log.addFilter(SampleFilter(sample))
+
+    if not queued:
+        root.addHandler(handler)
+        return None
+    queue_handler = DroppingQueueHandler(limit)
+    root.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler)
+    listener.start()
+    return listener
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+import re
 from psirc.defines.responses import Command
+from psirc.irc_validator import IRCValidator
 
 
 class Prefix:
@@ -15,18 +16,55 @@ class Prefix:
     :type host: `string`
     """
 
+    prefix_regex = re.compile(
+        r"^(?P<nick>[^\s!.@]+)(!(?P<user>[^\s@!]+))?(@(?P<host>\S+))?$|^(?P<servername>\S+)$"
+    )
+
     def __init__(self, sender: str, user: str = "", host: str = "") -> None:
         self.sender = sender
         self.user = user
         self.host = host.lower()
-        self._set_hostname()
+
+    @classmethod
+    def parse(cls, prefix: str) -> Prefix | None:
+        """Parse a command prefix into a Prefix type object
+
+        :param prefix: The prefix string, without leading colon
+        :type prefix: ``str``
+        :return: A prefix type object if the prefix was valid
+        :rtype: ``Prefix`` or ``None``
+        """
+        match = cls.prefix_regex.match(prefix)
+        if not match:
+            return None
+
+        if sender := match.group("servername"):
+            return Prefix(sender) if IRCValidator.validate_host(sender) else None
+
+        nick, user, host = match.group("nick", "user", "host")
+
+        if all(
+            (
+                IRCValidator.validate_nick(nick),
+                host is None or IRCValidator.validate_host(host),
+            )
+        ):
+            return Prefix(nick, user or "", host or "")
+        return None
+
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        if name in ("sender", "user", "host"):
+            super().__setattr__("_str", None)
 
     def _set_hostname(self) -> None:
         self._hostname = f"{self.user}{'@' if self.host else ''}{self.host}"
 
     def __str__(self) -> str:
-        hostname = f"{self.user}{'@' if self.host else ''}{self.host}"
-        return f":{self.sender}{'!' if hostname else ''}{hostname}"
+        if self._str is None:
+            self._set_hostname()
+            self._str = f":{self.sender}{'!' if self._hostname else ''}{self._hostname}"
+        return self._str
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Prefix):
@@ -41,31 +79,175 @@ class Prefix:
 
 
 class Params:
+    """
+    Class representing parameters of an IRC message
+
+    Parameters are kept as a tuple of keys, shared between messages of the same
+    command, and a tuple of values.
+
+    :param params: parameter name to value association
+    :type params: ``dict[str, str] | None``
+    :param recepient: recepient of a numeric reply
+    :type recepient: ``str | None``
+    """
+
+    __slots__ = ("_keys", "_values", "_recepient", "_str")
+
     def __init__(self, params: dict[str, str] | None = None, *, recepient: str | None = None) -> None:
-        self.params = params if params else {}
-        self.recepient = recepient if recepient else ""  # used in numeric replies
+        self._keys: tuple[str, ...] = tuple(params) if params else ()
+        self._values: tuple[str, ...] = tuple(params.values()) if params else ()
+        self._recepient = recepient if recepient else ""  # used in numeric replies
+        self._str: str | None = None
+
+    @classmethod
+    def from_values(cls, keys: tuple[str, ...], values: tuple[str, ...]) -> Params:
+        """Create params without building a dictionary.
+
+        :param keys: parameter names, usually a prefix of the command's CMD_PARAMS schema
+        :type keys: ``tuple[str, ...]``
+        :param values: parameter values, in order of keys
+        :type values: ``tuple[str, ...]``
+        :return: new params
+        :rtype: ``Params``
+        """
+        params = cls.__new__(cls)
+        params._keys = keys
+        params._values = values
+        params._recepient = ""
+        params._str = None
+        return params
+
+    @property
+    def params(self) -> dict[str, str]:
+        return dict(zip(self._keys, self._values))
+
+    @params.setter
+    def params(self, params: dict[str, str]) -> None:
+        self._keys = tuple(params)
+        self._values = tuple(params.values())
+        self._str = None
+
+    @property
+    def recepient(self) -> str:
+        return self._recepient
+
+    @recepient.setter
+    def recepient(self, recepient: str) -> None:
+        self._recepient = recepient
+        self._str = None
 
     def __str__(self) -> str:
-        return (self.recepient + " " if self.recepient else "") + " ".join(
-            (":" if key == "trailing" else "") + self[key] for key in self.params.keys() if self[key]
-        )
+        if self._str is None:
+            self._str = (self._recepient + " " if self._recepient else "") + " ".join(
+                (":" if key == "trailing" else "") + value for key, value in zip(self._keys, self._values) if value
+            )
+        return self._str
 
     def __getitem__(self, key: str) -> str:
-        return self.params[key]
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
 
     def __setitem__(self, key: str, value: str) -> None:
-        self.params[key] = value
+        if key in self._keys:
+            idx = self._keys.index(key)
+            self._values = self._values[:idx] + (value,) + self._values[idx + 1 :]
+        else:
+            self._keys += (key,)
+            self._values += (value,)
+        self._str = None
 
     def __contains__(self, key: str) -> bool:
-        return key in self.params
+        return key in self._keys
 
 
-@dataclass(kw_only=True)
 class Message:
-    prefix: Prefix | None = field()
-    command: Command = field()
-    params: Params | None = field()
+    """
+    Class representing an IRC message
 
-    def __str__(self) -> str:
+    Prefix of a received message is kept as text and parsed when it is first read.
 
-        return (" ".join((str(x) for x in (self.prefix, self.command, self.params) if x))).strip() + "\r\n"
+    :param prefix: prefix of the message
+    :type prefix: ``Prefix | None``
+    :param command: command of the message
+    :type command: ``Command``
+    :param params: parameters of the message
+    :type params: ``Params | None``
+    """
+
+    __slots__ = ("_prefix", "_raw_prefix", "command", "params", "_wire", "_wire_key")
+
+    def __init__(self, *, prefix: Prefix | None, command: Command, params: Params | None) -> None:
+        self._prefix = prefix
+        self._raw_prefix: str | None = None
+        self.command = command
+        self.params = params
+        self._wire: bytes | None = None
+        self._wire_key: tuple[str, Command, str] | None = None
+
+    @classmethod
+    def received(cls, raw_prefix: str | None, command: Command, params: Params | None) -> Message:
+        """Create message with a prefix which is parsed on first access.
+
+        :param raw_prefix: prefix text without leading colon
+        :type raw_prefix: ``str | None``
+        :param command: command of the message
+        :type command: ``Command``
+        :param params: parameters of the message
+        :type params: ``Params | None``
+        :return: new message
+        :rtype: ``Message``
+        """
+        message = cls(prefix=None, command=command, params=params)
+        message._raw_prefix = raw_prefix
+        return message
+
+    @property
+    def prefix(self) -> Prefix | None:
+        if self._raw_prefix is not None:
+            self._prefix = Prefix.parse(self._raw_prefix)
+            self._raw_prefix = None
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, prefix: Prefix | None) -> None:
+        self._prefix = prefix
+        self._raw_prefix = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.prefix, self.command, self.params) == (other.prefix, other.command, other.params)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Message(prefix={self.prefix!r}, command={self.command!r}, params={self.params!r})"
+
+    def _parts(self) -> tuple[str, Command, str]:
+        return (str(self.prefix) if self.prefix else "", self.command, str(self.params) if self.params else "")
+
+    @staticmethod
+    def _join(prefix: str, command: Command, params: str) -> str:
+        return (" ".join(x for x in (prefix, str(command), params) if x)).strip() + "\r\n"
+
+    def __str__(self) -> str:
+        return self._join(*self._parts())
+
+    def to_bytes(self) -> bytes:
+        """Return the message encoded for sending.
+
+        The encoded message is cached until prefix, command or params change,
+        so a message sent to many sockets is serialized once and every socket
+        gets the same ``bytes`` object. Prefix and Params cache their own string
+        form and invalidate it when modified.
+
+        :return: encoded message, including CR-LF
+        :rtype: ``bytes``
+        """
+        parts = self._parts()
+        if self._wire is None or parts != self._wire_key:
+            self._wire = self._join(*parts).encode()
+            self._wire_key = parts
+        return self._wire
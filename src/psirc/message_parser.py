@@ -1,14 +1,37 @@
-import re
 from psirc.message import Message, Prefix, Params
-from psirc.irc_validator import IRCValidator
 from psirc.defines.responses import Command
 
-from psirc.response_params import CMD_PARAMS, parametrize
+from psirc.response_params import CMD_PARAMS
 
 
 class MessageParser:
-    message_regex = r"^(:(?P<prefix>\S+)\s)?(?P<cmd>\S+)(\s(?P<params>.*?))?(?:\s:(?P<trail>.*))?$"
-    prefix_regex = r"^(?P<nick>[^\s!.@]+)(!(?P<user>[^\s@!]+))?(@(?P<host>\S+))?$|^(?P<servername>\S+)$"
+    """
+    Parses received lines into Message objects
+
+    Lines are split on spaces, commands are looked up in a prebuilt table and
+    the prefix is parsed only when a handler reads it.
+
+    :field commands: command text to Command association, both names and numerics
+    :type commands: ``dict[str, Command]``
+    :field schemas: params keys by number of given parameters and number of required parameters of text commands
+    :type schemas: ``dict[Command, tuple[list[tuple[str, ...]], int]]``
+    """
+
+    commands: dict[str, Command] = {
+        **Command.__members__,
+        **{str(command): command for command in Command if command.value < 1000},
+        **{str(command.value): command for command in Command if command.value < 1000},
+    }
+    schemas: dict[Command, tuple[list[tuple[str, ...]], int]] = {
+        # numeric replies need a recepient, they never get params when received
+        # optional parameters come last, so given parameters are always a prefix of the schema
+        command: (
+            [tuple(name.strip("[]") for name in names[:count]) for count in range(len(names) + 1)],
+            sum(not name.startswith("[") for name in names),
+        )
+        for command, names in CMD_PARAMS.items()
+        if command.value >= 1000
+    }
 
     @classmethod
     def _parse_prefix(cls, prefix: str) -> Prefix | None:
@@ -19,24 +42,7 @@ class MessageParser:
         :return: A prefix type object if the prefix was valid
         :rtype: ``Prefix`` or ``None``
         """
-
-        match = re.match(cls.prefix_regex, prefix)
-        if not match:
-            return None
-
-        if sender := match.group("servername"):
-            return Prefix(sender) if IRCValidator.validate_host(sender) else None
-
-        nick, user, host = match.group("nick", "user", "host")
-
-        if all(
-            (
-                IRCValidator.validate_nick(nick),
-                host is None or IRCValidator.validate_host(host),
-            )
-        ):
-            return Prefix(nick, user or "", host or "")
-        return None
+        return Prefix.parse(prefix)
 
     @staticmethod
     def _numeric_command(command: str) -> Command | None:
@@ -46,19 +52,11 @@ class MessageParser:
         :type command: ``str``
         """
 
-        if command.isdigit() and int(command) in Command:
-            return Command(int(command))
-        return None
-
-    @staticmethod
-    def _text_command(command: str) -> Command | None:
-        """Check if command is a valid text command
-
-        :param command: The command to be tested
-        :type command: ``str``
-        """
-        if command in Command.__members__:
-            return Command.__members__[command]
+        if command.isdigit():
+            try:
+                return Command(int(command))
+            except ValueError:
+                return None
         return None
 
     @classmethod
@@ -70,12 +68,10 @@ class MessageParser:
         :return: Command enum object if the command is valid
         :rtype: ``Command`` or ``None``
         """
+        return cls.commands.get(command) or cls._numeric_command(command)
 
-        numeric_command = cls._numeric_command(command)
-        return numeric_command if numeric_command else cls._text_command(command)
-
-    @staticmethod
-    def _parse_params(command: Command, params: str, trail: str) -> Params | None:
+    @classmethod
+    def _parse_params(cls, command: Command, params: str, trail: str) -> Params | None:
         """Parse the command params into a valid Params object
 
         :param command: The command for which the params are parsed
@@ -88,19 +84,24 @@ class MessageParser:
         :rtype: ``Params`` or ``None``
         """
 
+        schema = cls.schemas.get(command)
         # command has no params defined
-        if command not in CMD_PARAMS.keys():
+        if schema is None:
             return None
 
+        keys, required = schema
         params_list = params.split()
-        params_list.append(trail) if trail else None
+        if trail:
+            params_list.append(trail)
+        if len(params_list) < required:
+            return None
 
-        params_dict = {CMD_PARAMS[command][i]: param for i, param in enumerate(params_list)}
-        return parametrize(command, **params_dict)
+        # parameters past the schema are ignored
+        count = min(len(params_list), len(keys) - 1)
+        return Params.from_values(keys[count], tuple(params_list[:count]))
 
     @classmethod
     def parse_message(cls, data: str) -> Message | None:
-        print(f"message parse: data: {data}")
         """Parse a received message string
 
         :param data: The received message
@@ -109,13 +110,17 @@ class MessageParser:
         :rtype: ``Message`` or ``None``
         """
 
-        match = re.match(cls.message_regex, data)
-        if not match:
-            return None
-        prefix, command, params, trailing = match.group("prefix", "cmd", "params", "trail")
-        prefix = cls._parse_prefix(prefix) if prefix else None
-        command = cls._valid_command(command)
+        prefix = None
+        if data.startswith(":"):
+            prefix, _, data = data[1:].partition(" ")
+            if not prefix:
+                return None
+        command_text, _, data = data.partition(" ")
+        command = cls._valid_command(command_text)
         if not command:
             return None
-        params = cls._parse_params(command, params, trailing)
-        return Message(prefix=prefix, command=command, params=params)
+        if data.startswith(":"):
+            params, trailing = "", data[1:]
+        else:
+            params, _, trailing = data.partition(" :")
+        return Message.received(prefix, command, cls._parse_params(command, params, trailing))
@@ -0,0 +1,278 @@
+from __future__ import annotations
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+from psirc.defines.responses import Command
+
+
+class Histogram:
+    """
+    Durations counted in fixed buckets, as a Prometheus histogram
+
+    :field counts: observations per bucket, bucket ``i`` counts durations up to ``BOUNDS[i]``,
+        the last bucket counts all longer ones
+    :type counts: ``list[int]``
+    :field total: sum of all observed durations in seconds
+    :type total: ``float``
+    """
+
+    # seconds, from 10 microseconds to a second
+    BOUNDS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def copy(self) -> Histogram:
+        histogram = Histogram()
+        histogram.counts = list(self.counts)
+        histogram.total = self.total
+        return histogram
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += seconds
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket it falls into.
+
+        :param fraction: quantile, e.g. 0.99
+        :type fraction: ``float``
+        :return: seconds, ``math.inf`` if it falls into the last bucket, 0 if nothing was observed
+        :rtype: ``float``
+        """
+        rank = fraction * self.count
+        if not rank:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class CommandStats(NamedTuple):
+    """
+    Snapshot of the handling of a single command
+
+    :field command: command name
+    :type command: ``str``
+    :field calls: handled messages
+    :type calls: ``int``
+    :field errors: messages whose handler raised an exception
+    :type errors: ``int``
+    :field latency: handler durations
+    :type latency: ``Histogram``
+    """
+
+    command: str
+    calls: int
+    errors: int
+    latency: Histogram
+
+
+class LinkStats(NamedTuple):
+    """
+    Traffic of a single connection, fields of RPL_STATSLINKINFO
+
+    :field name: peer address, or nickname of a registered connection
+    :type name: ``str``
+    :field sendq: bytes waiting to be sent
+    :type sendq: ``int``
+    :field sent_messages: messages queued to be sent
+    :type sent_messages: ``int``
+    :field sent_bytes: bytes written to the socket
+    :type sent_bytes: ``int``
+    :field received_messages: lines received
+    :type received_messages: ``int``
+    :field received_bytes: bytes received
+    :type received_bytes: ``int``
+    :field seconds_open: seconds since the connection was made
+    :type seconds_open: ``int``
+    """
+
+    name: str
+    sendq: int
+    sent_messages: int
+    sent_bytes: int
+    received_messages: int
+    received_bytes: int
+    seconds_open: int
+
+
+class Traffic:
+    """
+    Data received from a single connection, written by its reading thread only
+
+    :field received_bytes: bytes received
+    :type received_bytes: ``int``
+    :field received_lines: complete lines received
+    :type received_lines: ``int``
+    :field connected: ``time.monotonic()`` of the connection
+    :type connected: ``float``
+    """
+
+    __slots__ = ("received_bytes", "received_lines", "connected")
+
+    def __init__(self) -> None:
+        self.received_bytes = 0
+        self.received_lines = 0
+        self.connected = time.monotonic()
+
+
+class Metrics:
+    """
+    Counters of parsed and handled messages, shared by all threads handling them
+
+    Cheap enough to be always on - an observation is a bucket lookup
+    and a few increments under a lock.
+
+    :field parse: durations of parsing received lines
+    :type parse: ``Histogram``
+    :field invalid: received lines which could not be parsed
+    :type invalid: ``int``
+    """
+
+    def __init__(self) -> None:
+        self.parse = Histogram()
+        self.invalid = 0
+        self._commands: dict[Command, Histogram] = {}
+        self._errors: dict[Command, int] = {}
+        self._lock = threading.Lock()
+
+    def observe_parse(self, seconds: float, valid: bool = True) -> None:
+        with self._lock:
+            self.parse.observe(seconds)
+            if not valid:
+                self.invalid += 1
+
+    def observe_command(self, command: Command, seconds: float, failed: bool = False) -> None:
+        """Count a handled message.
+
+        :param command: command of the message
+        :type command: ``Command``
+        :param seconds: duration of its handler
+        :type seconds: ``float``
+        :param failed: True if the handler raised an exception
+        :type failed: ``bool``
+        """
+        with self._lock:
+            latency = self._commands.get(command)
+            if latency is None:
+                latency = self._commands[command] = Histogram()
+            latency.observe(seconds)
+            if failed:
+                self._errors[command] = self._errors.get(command, 0) + 1
+
+    def commands(self) -> list[CommandStats]:
+        """Get a snapshot of every handled command, ordered by name.
+
+        :rtype: ``list[CommandStats]``
+        """
+        with self._lock:
+            stats = []
+            for command, latency in self._commands.items():
+                latency = latency.copy()
+                stats.append(CommandStats(command.name, latency.count, self._errors.get(command, 0), latency))
+        return sorted(stats, key=lambda stats: stats.command)
+
+    def render(self, gauges: dict[str, float], counters: dict[str, float], links: list[LinkStats]) -> str:
+        """Format metrics in the Prometheus text exposition format.
+
+        :param gauges: current values, e.g. queue depths, by metric name
+        :type gauges: ``dict[str, float]``
+        :param counters: totals counted elsewhere, by metric name
+        :type counters: ``dict[str, float]``
+        :param links: traffic of every connection
+        :type links: ``list[LinkStats]``
+        :rtype: ``str``
+        """
+        lines = ["# TYPE psirc_command_duration_seconds histogram"]
+        errors = ["# TYPE psirc_command_errors_total counter"]
+        for stats in self.commands():
+            labels = f'command="{stats.command}"'
+            lines.extend(_histogram("psirc_command_duration_seconds", labels, stats.latency))
+            errors.append(f"psirc_command_errors_total{{{labels}}} {stats.errors}")
+        lines.extend(errors)
+        with self._lock:
+            parse = self.parse.copy()
+            invalid = self.invalid
+        lines.append("# TYPE psirc_parse_duration_seconds histogram")
+        lines.extend(_histogram("psirc_parse_duration_seconds", "", parse))
+        lines.append("# TYPE psirc_invalid_messages_total counter")
+        lines.append(f"psirc_invalid_messages_total {invalid}")
+        for kind, values in (("gauge", gauges), ("counter", counters)):
+            for name, value in values.items():
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        for metric, field, kind in (
+            ("psirc_connection_sendq_bytes", "sendq", "gauge"),
+            ("psirc_connection_sent_bytes_total", "sent_bytes", "counter"),
+            ("psirc_connection_received_bytes_total", "received_bytes", "counter"),
+            ("psirc_connection_received_messages_total", "received_messages", "counter"),
+        ):
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(f'{metric}{{peer="{_escape(link.name)}"}} {getattr(link, field)}' for link in links)
+        return "\n".join(lines) + "\n"
+
+
+def _histogram(name: str, labels: str, histogram: Histogram) -> list[str]:
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*Histogram.BOUNDS, "+Inf"), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    totals = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{totals} {histogram.total}")
+    lines.append(f"{name}_count{totals} {cumulative}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def serve_metrics(port: int, render: Callable[[], str]) -> ThreadingHTTPServer:
+    """Serve metrics over HTTP on localhost, on a daemon thread.
+
+    :param port: port to listen on, 0 picks a free one
+    :type port: ``int``
+    :param render: called for every request, returns the Prometheus text format
+    :type render: ``Callable[[], str]``
+    :return: running server, stop it with ``shutdown``
+    :rtype: ``ThreadingHTTPServer``
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            # scraped every few seconds, not worth a log line
+            pass
+
+    endpoint = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    endpoint.daemon_threads = True
+    threading.Thread(target=endpoint.serve_forever, name="psirc-metrics", daemon=True).start()
+    return endpoint
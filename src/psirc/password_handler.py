@@ -1,12 +1,44 @@
 from psirc.irc_validator import IRCValidator
+from psirc.host_matcher import HostMatcher
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+import threading
 import logging
 
 
+class Credentials(NamedTuple):
+    """
+    Credentials read from a config file, never modified once built
+
+    :field passwords: password of every host or user by line type (I, C, N, O)
+    :type passwords: ``Mapping[str, Mapping[str, str | None]]``
+    :field i_lines: compiled I-line patterns
+    :type i_lines: ``HostMatcher``
+    """
+
+    passwords: Mapping[str, Mapping[str, str | None]]
+    i_lines: HostMatcher
+
+
 class PasswordHandler:
+    """
+    Credentials of the server, read from a config file
+
+    ``parse_config`` builds a new table and replaces the current one at once,
+    so it can be called again (REHASH) while clients are being checked.
+
+    :param filename: path to the config file
+    :type filename: ``str``
+    """
+
     def __init__(self, filename: str) -> None:
-        self._filename = filename
-        self._passwords: dict[str, dict[str, str | None]] = {"I": {}, "C": {}, "N": {}, "O": {}}
-        self._oper_credentials: dict[str, str] = dict()
+        self.filename = filename
+        self._credentials = Credentials(MappingProxyType({"I": {}, "C": {}, "N": {}, "O": {}}), HostMatcher())
+        self._reload_lock = threading.Lock()
+
+    @property
+    def _passwords(self) -> Mapping[str, Mapping[str, str | None]]:
+        return self._credentials.passwords
 
     @staticmethod
     def _valid_i_host(data: str) -> bool:
@@ -27,33 +59,19 @@ class PasswordHandler:
         return all((type == "O", password is not None, IRCValidator.validate_user(user=user)))
 
     def valid_operator(self, user: str, password: str) -> bool:
-        return user in self._passwords["O"].keys() and password == self._passwords["O"][user]
+        operators = self._passwords["O"]
+        return user in operators.keys() and password == operators[user]
 
-    def _valid_password(self, address: str, password: str | None) -> bool:
-        return not self._passwords["I"][address] or self._passwords["I"][address] == password
+    def _valid_password(self, address: str, password: str | None, credentials: Credentials | None = None) -> bool:
+        i_lines = (credentials or self._credentials).passwords["I"]
+        return not i_lines[address] or i_lines[address] == password
 
     def valid_user_password(self, address: str, password: str | None) -> bool:
-        hostname, address = address.split("@")
-        addr_list = address.split(".")
-
-        for password_address_full in self._passwords["I"].keys():
-            password_hostname, password_addr = password_address_full.split("@")
-            valid_parts = 0
-            passwd_addr_list = password_addr.split(".")
-            for idx, passwd_addr_element in enumerate(passwd_addr_list):
-                if idx > len(addr_list) - 1:
-                    break
-                if passwd_addr_element == "*":
-                    valid_parts = len(passwd_addr_list)
-                    break
-                elif addr_list[idx] == passwd_addr_element:
-                    valid_parts += 1
-                    continue
-                break
-            if valid_parts == len(passwd_addr_list):
-                if password_hostname == "*" or password_hostname == hostname:
-                    return self._valid_password(password_address_full, password)
-        return False
+        # a single table for the whole check, even if it gets replaced meanwhile
+        credentials = self._credentials
+        hostname, _, address = address.partition("@")
+        pattern = credentials.i_lines.match(hostname, address)
+        return pattern is not None and self._valid_password(pattern, password, credentials)
 
     def valid_connect_password(self, hostname: str, password: str | None) -> bool:
         return self._passwords["C"].get(hostname) == password
@@ -65,17 +83,40 @@ class PasswordHandler:
         return str(self._passwords["C"].get(hostname))
 
     def parse_config(self) -> None:
-        with open(self._filename, "r") as fp:
+        """Read the config file and replace current credentials with it.
+
+        If the file can't be read, current credentials are kept and ``OSError`` is raised.
+        """
+        with self._reload_lock:
+            credentials = self._load()
+            self._credentials = credentials
+        logging.info(f"Config set, {len(credentials.i_lines)} I-lines compiled")
+
+    def _load(self) -> Credentials:
+        passwords: dict[str, dict[str, str | None]] = {"I": {}, "C": {}, "N": {}, "O": {}}
+        with open(self.filename, "r") as fp:
             lines = fp.readlines()
             for line in lines:
                 type = line[0]
                 if type == "#":
                     continue
-                if type not in "ICNO" or line[1] != ":":
+                if type not in "ICNO" or line[1:2] != ":":
                     continue
                 line = line.split("#")[0].rstrip()  # strip comments
-                line_list = line[2:].split(":")  # split into parts
+                if type == "I":
+                    # address can be IPv6, password and the trailing field are split off from the right
+                    line_list = line[2:].rsplit(":", 2)
+                else:
+                    line_list = line[2:].split(":")  # split into parts
+                if len(line_list) < 2:
+                    logging.warning(f"Skipping malformed config line: {line}")
+                    continue
                 if not self.valid_host(type, line_list[0]):
                     continue
-                self._passwords[type][line_list[0]] = line_list[1] if line_list[1] else None
-        logging.info("Config set")
+                passwords[type][line_list[0]] = line_list[1] if line_list[1] else None
+
+        # first occurrence of an I-line decides its place in the order
+        i_lines = HostMatcher()
+        for pattern in passwords["I"]:
+            i_lines.add(pattern)
+        return Credentials(MappingProxyType({type: MappingProxyType(lines) for type, lines in passwords.items()}), i_lines)
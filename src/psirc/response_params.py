@@ -19,6 +19,18 @@ CMD_PARAMS = {
     Command.RPL_TOPIC: ["channel", "trailing"],
     Command.RPL_NAMREPLY: ["symbol", "channel", "trailing"],
     Command.RPL_ENDOFNAMES: ["channel"],
+    Command.RPL_REHASHING: ["config_file"],
+    Command.RPL_STATSLINKINFO: [
+        "linkname",
+        "sendq",
+        "sent_messages",
+        "sent_bytes",
+        "received_messages",
+        "received_bytes",
+        "time_open",
+    ],
+    Command.RPL_STATSCOMMANDS: ["name", "count", "errors", "p50_us", "p99_us"],
+    Command.RPL_ENDOFSTATS: ["query"],
     Command.ERR_NOSUCHNICK: ["nickname"],
     Command.ERR_NOSUCHCHANNEL: ["channel"],
     Command.ERR_NOSUCHSERVER: ["server"],
@@ -28,13 +40,15 @@ CMD_PARAMS = {
     Command.ERR_TOOMANYTARGETS: ["target"],
     Command.ERR_NOTONCHANNEL: ["channel"],
     Command.ERR_CHANOPRIVSNEEDED: ["channel"],
+    Command.ERR_BANNEDFROMCHAN: ["channel"],
+    Command.ERR_BADCHANNELKEY: ["channel"],
     Command.PASS: ["password"],
     Command.NICK: ["nickname", "[hopcount]"],
     Command.USER: ["username", "hostname", "servername", "realname"],
     Command.PRIVMSG: ["receiver", "trailing"],
     Command.PING: ["receiver"],
     Command.PONG: ["receivedby"],
-    Command.JOIN: ["channel"],
+    Command.JOIN: ["channel", "[key]"],
     Command.CAP: ["param", "spec"],
     Command.OPER: ["user", "password"],
     Command.CONNECT: ["target_server", "[port]", "[remote_server]"],
@@ -42,6 +56,8 @@ CMD_PARAMS = {
     Command.NAMES: ["[channel]"],
     Command.PART: ["channel"],
     Command.KICK: ["channel", "nickname", "trailing"],
+    Command.STATS: ["[query]", "[server]"],
+    Command.QUIT: ["[trailing]"],
 }
 
 CMD_MESSAGES = {
@@ -52,6 +68,8 @@ CMD_MESSAGES = {
     Command.RPL_ENDOFWHOIS: "end of /WHOIS list",
     Command.RPL_ENDOFNAMES: "End of /NAMES list",
     Command.RPL_YOUREOPER: "You are now an IRC operator",
+    Command.RPL_REHASHING: "Rehashing",
+    Command.RPL_ENDOFSTATS: "End of /STATS report",
     Command.ERR_NOSUCHNICK: "No such nick/channel",
     Command.ERR_NOSUCHSERVER: "No such server",
     Command.ERR_NOSUCHCHANNEL: "No such channel",
@@ -68,6 +86,8 @@ CMD_MESSAGES = {
     Command.ERR_ALREADYREGISTRED: "You may not reregister",
     Command.ERR_NOTONCHANNEL: "You're not on that channel",
     Command.ERR_CHANOPRIVSNEEDED: "You're not channel operator",
+    Command.ERR_BANNEDFROMCHAN: "Cannot join channel (+b)",
+    Command.ERR_BADCHANNELKEY: "Cannot join channel (+k)",
     Command.ERR_NOPRIVILEGES: "Permission Denied- You're not an IRC operator",
 }
 
@@ -103,3 +123,59 @@ def parametrize(command: Command, *, recepient: str | None = None, **kwargs: str
         params["response"] = f":{CMD_MESSAGES[command]}"
 
     return Params(params, recepient=recepient)
+
+
+class ReplyTemplate:
+    """
+    Numeric reply of a single command, compiled from CMD_PARAMS and CMD_MESSAGES
+
+    Schema is resolved once, formatting a reply only fills in the values and
+    encodes the line, no Params or Message is built. Produces the same bytes
+    as a Message with params returned by ``parametrize``.
+
+    :param command: numeric reply or error
+    :type command: ``Command``
+    """
+
+    __slots__ = ("command", "_head", "_keys", "_response", "_needs_recepient")
+
+    def __init__(self, command: Command) -> None:
+        names = CMD_PARAMS.get(command, [])
+        self.command = command
+        self._head = str(command)
+        # name, text put before the value and if the value is required
+        self._keys = tuple(
+            (name.strip("[]"), ":" if name == "trailing" else "", not name.startswith("[")) for name in names
+        )
+        self._response = f":{CMD_MESSAGES[command]}" if command in CMD_MESSAGES else ""
+        self._needs_recepient = command in CMD_PARAMS
+
+    def format(self, prefix: str, recepient: str | None, values: dict[str, str]) -> bytes | None:
+        """Format the reply.
+
+        :param prefix: prefix of the reply including leading colon, empty for none
+        :type prefix: ``str``
+        :param recepient: nickname the reply is sent to
+        :type recepient: ``str | None``
+        :param values: parameters of the reply by name, as passed to ``parametrize``
+        :type values: ``dict[str, str]``
+        :return: encoded reply including CR-LF, None if recepient or a required parameter is missing
+        :rtype: ``bytes | None``
+        """
+        parts = [prefix, self._head] if prefix else [self._head]
+        if recepient:
+            parts.append(recepient)
+        elif self._needs_recepient:
+            return None
+        for name, before, required in self._keys:
+            value = values.get(name)
+            if value:
+                parts.append(before + value)
+            elif required:
+                return None
+        if self._response:
+            parts.append(self._response)
+        return (" ".join(parts).rstrip() + "\r\n").encode()
+
+
+REPLY_TEMPLATES = {command: ReplyTemplate(command) for command in Command if command.value < 1000}
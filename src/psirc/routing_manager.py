@@ -1,14 +1,17 @@
 import socket
 import logging
+from collections.abc import Iterator
 
 from psirc.message import Message, Prefix
-from psirc.response_params import parametrize
+from psirc.response_params import REPLY_TEMPLATES, parametrize
 from psirc.server import IRCServer
-from psirc.client import LocalUser, ExternalUser
-from psirc.channel import Channel
+from psirc.client import Client, LocalUser, ExternalUser
+from psirc.channel import Channel, FanoutPlan
 from psirc.defines.responses import Command
 from psirc.defines.exceptions import NoSuchNick
 from psirc.session_info import SessionType
+from psirc.send_queue import SendQueue
+from psirc.log_config import message_log
 
 
 class RoutingManager:
@@ -22,7 +25,42 @@ class RoutingManager:
         :param message: message to send.
         :type message: ``Message``
         """
-        client_socket.send(str(message).encode())
+        RoutingManager.send_bytes(client_socket, message.to_bytes())
+
+    @staticmethod
+    def send_bytes(client_socket: socket.socket, data: bytes) -> None:
+        """Queue serialized data to be sent via the specified socket.
+
+        Data is written without blocking, the rest is flushed by the connection manager.
+        Data sent to a socket which is already disconnected is dropped.
+
+        :param client_socket: client socket.
+        :type client_socket: ``socket.socket``
+        :param data: serialized message(s).
+        :type data: ``bytes``
+        """
+        send_queue = SendQueue.of(client_socket)
+        if send_queue:
+            send_queue.put(data)
+        else:
+            logging.debug("Dropping data sent to a disconnected socket")
+
+    @staticmethod
+    def stream_bytes(client_socket: socket.socket, chunks: Iterator[bytes]) -> None:
+        """Queue serialized data produced lazily to be sent via the specified socket.
+
+        Chunks are pulled as the socket drains, data sent later is queued behind them.
+
+        :param client_socket: client socket.
+        :type client_socket: ``socket.socket``
+        :param chunks: iterator producing serialized messages.
+        :type chunks: ``Iterator[bytes]``
+        """
+        send_queue = SendQueue.of(client_socket)
+        if send_queue:
+            send_queue.put_stream(chunks)
+        else:
+            logging.debug("Dropping data sent to a disconnected socket")
 
     @classmethod
     def respond_client(
@@ -36,6 +74,8 @@ class RoutingManager:
     ) -> None:
         """Respond to a local client with a specific command and parameters.
 
+        Numeric replies are formatted with templates compiled from the reply schemas, ``REPLY_TEMPLATES``.
+
         :param client_socket: client's socket.
         :type client_socket: ``socket.socket``
         :param prefix: prefix of the response (optional).
@@ -49,9 +89,14 @@ class RoutingManager:
         """
         if command.value >= 1000:
             logging.warning("IRC Command passed in numeric reply function")
-        response = Message(prefix=prefix, command=command, params=parametrize(command, **kwargs, recepient=recepient))
-        logging.info(f"Responding to client:{response}")
-        cls.send(client_socket, response)
+        template = REPLY_TEMPLATES.get(command)
+        data = template.format(str(prefix) if prefix else "", recepient, kwargs) if template else None
+        if data is None:
+            # missing params, sent the way parametrize makes it, with its warning
+            params = parametrize(command, **kwargs, recepient=recepient)
+            data = Message(prefix=prefix, command=command, params=params).to_bytes()
+        message_log.debug("Responding to client: %r", data)
+        cls.send_bytes(client_socket, data)
 
     @classmethod
     def send_command(
@@ -86,13 +131,16 @@ class RoutingManager:
         :param kwargs: Additional parameters for the error response.
         :type kwargs: ``dict[str, str]``
         """
-        message_error = Message(
-            prefix=None,
-            command=error_type,
-            params=parametrize(error_type, recepient=recepient, **kwargs),
-        )
-        logging.info(f"Responding to client with error: {message_error}")
-        cls.send(client_socket, message_error)
+        template = REPLY_TEMPLATES.get(error_type)
+        data = template.format("", recepient, kwargs) if template else None
+        if data is None:
+            data = Message(
+                prefix=None,
+                command=error_type,
+                params=parametrize(error_type, recepient=recepient, **kwargs),
+            ).to_bytes()
+        message_log.debug("Responding to client with error: %r", data)
+        cls.send_bytes(client_socket, data)
 
     @classmethod
     def forward_to_user(cls, server: IRCServer, receiver_nick: str, message: Message) -> None:
@@ -110,10 +158,10 @@ class RoutingManager:
         receiver = server._users.get_user(receiver_nick)
 
         if not receiver:
-            logging.warning(f"No user with nickname: {receiver_nick}")
+            logging.warning("No user with nickname: %s", receiver_nick)
             raise NoSuchNick("No user with given nickname")
 
-        logging.info(f"Forwarding private message: {message}")
+        message_log.debug("Forwarding private message: %s", message)
         if isinstance(receiver, LocalUser):
             cls.send(receiver.socket, message)
         elif isinstance(receiver, ExternalUser):
@@ -130,16 +178,18 @@ class RoutingManager:
             message.prefix = Prefix(server.nickname)
         if message.params and 'hopcount' in message.params:
             message.params['hopcount'] = str(int(message.params['hopcount']) + 1)
+        data = message.to_bytes()
         server_sessions = server._sessions.get_sessions_by_type(SessionType.SERVER)
         for peer_socket in server_sessions:
             if server_sessions[peer_socket].nickname != sender_nick:
-                RoutingManager.send(peer_socket, message)
+                cls.send_bytes(peer_socket, data)
 
     @classmethod
     def send_to_channel(cls, server: IRCServer, channel: Channel, message: Message) -> None:
         """Send message to channel members.
 
         Doesn't send message to local user if local user sent the message or to closest server from which message was received.
+        Members are resolved to sockets once, the channel keeps them until its membership or server links change.
 
         :param server: IRC server instance.
         :type server: ``IRCServer``
@@ -150,50 +200,117 @@ class RoutingManager:
         :raises ValueError: If the sender or message prefix is missing.
         :raises NoSuchNick: If a user in the channel does not exist.
         """
-        logging.info(f"Forwarding message to channel: {message}")
+        message_log.debug("Forwarding message to channel: %s", message)
         if not message.prefix:
             raise ValueError("Implementation error inside the code")
         sender_nick = message.prefix.sender
         if not sender_nick:
             raise ValueError("Missing sender nick in send to channel")
+        plan = channel.fanout_plan(lambda members: cls._fanout_plan(server, members))
+        # Dont resend message to server
+        sender_socket = cls._sender_socket(server, sender_nick, plan.links)
+
+        # serialized once, every receiver gets the same bytes
+        data = message.to_bytes()
+        for receiver_socket in plan.local:
+            if receiver_socket is not sender_socket:
+                cls.send_bytes(receiver_socket, data)
+        # broadcast to servers
+        for next_hop_sock in plan.links.values():
+            if next_hop_sock is not sender_socket:
+                cls.send_bytes(next_hop_sock, data)
+
+    @classmethod
+    def send_to_targets(cls, server: IRCServer, targets: list[tuple[str, Channel | Client]], message: Message) -> None:
+        """Send message with many receivers, e.g. PRIVMSG to a list of nicknames and channels.
+
+        Every local user gets a single copy, addressed to the first of the targets it was reached through.
+        Every neighbouring server gets a single copy, addressed to all targets behind it.
+        Channels are not sent back to the local user or closest server the message was received from.
+
+        :param server: IRC server instance.
+        :type server: ``IRCServer``
+        :param targets: receivers named in the message with the channel or user each of them resolved to
+        :type targets: ``list[tuple[str, Channel | Client]]``
+        :param message: message to send, its ``receiver`` param is replaced for every copy
+        :type message: ``Message``
+        :raises ValueError: If the sender, message prefix or params are missing.
+        :raises NoSuchNick: If a user in one of the channels does not exist.
+        """
+        message_log.debug("Forwarding message to targets: %s", message)
+        if not message.prefix or not message.params:
+            raise ValueError("Implementation error inside the code")
+        sender_socket = cls._sender_socket(server, message.prefix.sender)
+
+        local: dict[socket.socket, str] = {}
+        links: dict[socket.socket, list[str]] = {}
+        for target, receiver in targets:
+            if isinstance(receiver, Channel):
+                plan = receiver.fanout_plan(lambda members: cls._fanout_plan(server, members))
+                for receiver_socket in plan.local:
+                    if receiver_socket is not sender_socket:
+                        local.setdefault(receiver_socket, target)
+                for next_hop_sock in plan.links.values():
+                    if next_hop_sock is not sender_socket:
+                        links.setdefault(next_hop_sock, []).append(target)
+            elif isinstance(receiver, LocalUser):
+                local.setdefault(receiver.socket, target)
+            elif isinstance(receiver, ExternalUser):
+                next_hop_sock = server._sessions.get_socket(receiver.location)
+                if not next_hop_sock:
+                    raise ValueError("Implementation error inside the code")
+                links.setdefault(next_hop_sock, []).append(target)
+            else:
+                raise ValueError("Implementation error inside the code")
+
+        # serialized once per distinct receiver list
+        encoded: dict[str, bytes] = {}
+        for peer_socket, receivers in [*local.items(), *((sock, ",".join(names)) for sock, names in links.items())]:
+            data = encoded.get(receivers)
+            if data is None:
+                message.params["receiver"] = receivers
+                data = encoded[receivers] = message.to_bytes()
+            cls.send_bytes(peer_socket, data)
+
+    @staticmethod
+    def _sender_socket(
+        server: IRCServer, sender_nick: str, links: dict[str, socket.socket] | None = None
+    ) -> socket.socket:
+        """Socket the message of a user was received from - its own, or of the closest server behind which it is"""
+        if not sender_nick:
+            raise ValueError("Missing sender nick")
         sender = server._users.get_user(sender_nick)
         if not sender:
             raise ValueError("Sender not a registered user")
-
-        # Dont resend message to server. Finding the sender socket
         sender_socket = None
         if isinstance(sender, LocalUser):
-            sender_socket = server._sessions.get_socket(sender_nick)
+            sender_socket = sender.socket
         elif isinstance(sender, ExternalUser):
-            sender_socket = server._sessions.get_socket(sender.location)
+            sender_socket = (links or {}).get(sender.location) or server._sessions.get_socket(sender.location)
         if not sender_socket:
             raise ValueError("Cant find sender socket")
+        return sender_socket
 
-        next_hop_socks = set()
-        # send to local users
-        for nickname in channel.users:
+    @staticmethod
+    def _fanout_plan(server: IRCServer, members: list[str]) -> FanoutPlan:
+        local = []
+        links: dict[str, socket.socket] = {}
+        for nickname in members:
             receiver = server._users.get_user(nickname)
 
             if not receiver:
-                logging.warning(f"No user with nickname: {nickname}")
+                logging.warning("No user with nickname: %s", nickname)
                 raise NoSuchNick("No user with given nickname")
 
             if isinstance(receiver, LocalUser):
-                if receiver.socket == sender_socket:
-                    # dont send to sender
-                    continue
-                cls.send(receiver.socket, message)
+                local.append(receiver.socket)
             elif isinstance(receiver, ExternalUser):
+                if receiver.location in links:
+                    continue
                 next_hop_sock = server._sessions.get_socket(receiver.location)
                 if not next_hop_sock:
                     raise ValueError("Implementation error inside the code")
-                if next_hop_sock == sender_socket:
-                    # dont send to sender
-                    continue
-                next_hop_socks.add(next_hop_sock)
+                links[receiver.location] = next_hop_sock
             else:
                 raise ValueError("Implementation error inside the code")
-
-        # broadcast to servers
-        for next_hop_sock in next_hop_socks:
-            cls.send(next_hop_sock, message)
+        return FanoutPlan(tuple(local), links)
@@ -0,0 +1,319 @@
+import socket
+import selectors
+import time
+import logging
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from psirc.connection_manager import ConnectionManager
+from psirc.line_buffer import LineBuffer
+from psirc.metrics import Traffic
+from psirc.send_queue import SendQueue
+from psirc.throttle import RateLimit
+from psirc.ingress_queue import IngressQueue
+
+
+class SelectorConnectionManager(ConnectionManager):
+    """
+    Connection manager multiplexing every connected socket on a single event loop.
+
+    Keeps the contract of ``ConnectionManager`` (``start``, ``get_message``,
+    ``disconnect_client``, ``connect_to``, ``stop``), but instead of occupying
+    one worker of the thread pool per socket, a single worker runs a
+    ``selectors`` loop serving the listening socket, clients and server links.
+    The loop also flushes send queues of sockets which were not writable.
+    Sockets out of command tokens are not read until their tokens refill,
+    sockets with too many lines waiting in the ingress queue are not read
+    until the dispatcher handles some of them. Lines already received are
+    held back meanwhile.
+
+    :param host: server ip address,
+    :type host: `string`
+    :param port: server port,
+    :type port: `string`
+    :param executor: thread pool executor for class, only one worker is used
+    :type executor: `ThreadPoolExecutor`
+    :field _selector: selector watching all sockets
+    :type _selector: `selectors.BaseSelector`
+    :field _pending: callbacks scheduled from other threads, run by the event loop
+    :type _pending: `deque`
+    :field _line_buffers: line reassembly buffer of every watched socket
+    :type _line_buffers: `dict[socket.socket, LineBuffer]`
+    :field _held: received lines of paused sockets, waiting for command tokens or room in the ingress queue
+    :type _held: `dict[socket.socket, deque[str]]`
+    :field _resume_at: time at which a throttled socket gets a token again
+    :type _resume_at: `dict[socket.socket, float]`
+    :field _waiting_room: sockets waiting for room in the ingress queue
+    :type _waiting_room: `set[socket.socket]`
+    :field _writing: sockets waiting to become writable
+    :type _writing: `set[socket.socket]`
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        thread_pool: ThreadPoolExecutor,
+        *,
+        sendq: int = SendQueue.DEFAULT_LIMIT,
+        accept_limit: RateLimit | None = None,
+        command_limit: RateLimit | None = None,
+        ingress_limit: int = IngressQueue.DEFAULT_LIMIT,
+        ingress_per_socket: int = IngressQueue.DEFAULT_PER_SOCKET,
+    ) -> None:
+        super().__init__(
+            host,
+            port,
+            thread_pool,
+            sendq=sendq,
+            accept_limit=accept_limit,
+            command_limit=command_limit,
+            ingress_limit=ingress_limit,
+            ingress_per_socket=ingress_per_socket,
+        )
+        self._selector = selectors.DefaultSelector()
+        self._waker, self._wakeup_socket = socket.socketpair()
+        self._waker.setblocking(False)
+        self._wakeup_socket.setblocking(False)
+        self._pending: deque[Callable[[], None]] = deque()
+        self._line_buffers: dict[socket.socket, LineBuffer] = {}
+        self._held: dict[socket.socket, deque[str]] = {}
+        self._resume_at: dict[socket.socket, float] = {}
+        self._waiting_room: set[socket.socket] = set()
+        self._writing: set[socket.socket] = set()
+        self._queue.on_room = lambda: self._call_soon(self._resume_waiting_room)
+        self._recv_buffer = bytearray(self.RECV_SIZE)
+        self._recv_view = memoryview(self._recv_buffer)
+
+    def start(self) -> None:
+        """Start the event loop thread.
+
+        The loop accepts connections and reads from every connected socket.
+        Data received from clients gets added into message queue.
+        Retrieve messages using the ``get_message`` method.
+        """
+        self._socket.listen()
+        self._socket.setblocking(False)
+        self._running = True
+
+        self._selector.register(self._socket, selectors.EVENT_READ, self._accept)
+        self._selector.register(self._waker, selectors.EVENT_READ, self._run_pending)
+        self.executor.submit(self._run)
+
+    def disconnect_client(self, client_socket: socket.socket) -> None:
+        """Close connection with a socket.
+
+        The socket is unregistered and closed by the event loop thread,
+        so it is safe to call from the dispatcher.
+        """
+        self._call_soon(lambda: self._close(client_socket))
+
+    def exempt(self, client_socket: socket.socket) -> None:
+        """Stop limiting commands read from a connection, held lines are released by the loop."""
+        super().exempt(client_socket)
+        self._call_soon(lambda: self._resume(client_socket))
+
+    def stop(self) -> None:
+        """Stop the event loop. Closing sockets is left to the loop thread."""
+        self._running = False
+        self._wakeup()
+
+    def _serve(self, client_socket: socket.socket, client_address: str) -> None:
+        self._attach_send_queue(client_socket)
+        self._call_soon(lambda: self._register(client_socket, client_address))
+
+    def _send_pending(self, send_queue: SendQueue) -> None:
+        self._call_soon(lambda: self._watch_writable(send_queue))
+
+    def _watch_writable(self, send_queue: SendQueue) -> None:
+        if send_queue.closed or send_queue.socket not in self._connections:
+            return
+        self._writing.add(send_queue.socket)
+        self._update_events(send_queue.socket)
+
+    def _update_events(self, client_socket: socket.socket) -> None:
+        """Watch socket for reading unless it is throttled, for writing if it has data waiting."""
+        events = 0 if client_socket in self._held else selectors.EVENT_READ
+        if client_socket in self._writing:
+            events |= selectors.EVENT_WRITE
+        try:
+            key = self._selector.get_key(client_socket)
+        except KeyError:
+            key = None
+        if not events:
+            if key:
+                self._selector.unregister(client_socket)
+        elif key is None:
+            self._selector.register(client_socket, events, self._ready)
+        elif key.events != events:
+            self._selector.modify(client_socket, events, self._ready)
+
+    def _call_soon(self, callback: Callable[[], None]) -> None:
+        """Schedule callback to be run by the event loop thread."""
+        self._pending.append(callback)
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        try:
+            self._wakeup_socket.send(b"\0")
+        except (BlockingIOError, OSError):
+            # buffer full - loop is going to wake up anyway
+            pass
+
+    def _run_pending(self, waker: socket.socket, _: int) -> None:
+        try:
+            while waker.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while self._pending:
+            self._pending.popleft()()
+
+    def _run(self) -> None:
+        try:
+            while self._running:
+                for key, mask in self._selector.select(timeout=self._select_timeout()):
+                    try:
+                        key.data(key.fileobj, mask)
+                    except Exception as e:
+                        logging.error(f"ConnectionManager: exception in event loop: {e}")
+                if self._resume_at:
+                    self._resume_due()
+        finally:
+            self._shutdown()
+
+    def _select_timeout(self) -> float:
+        if not self._resume_at:
+            return 1
+        return min(1, max(0, min(self._resume_at.values()) - time.monotonic()))
+
+    def _resume_due(self) -> None:
+        now = time.monotonic()
+        for client_socket in [client_socket for client_socket, at in self._resume_at.items() if at <= now]:
+            self._resume(client_socket)
+
+    def _resume(self, client_socket: socket.socket) -> None:
+        """Release held lines of a throttled socket, start reading it again if all were released."""
+        lines = self._held.pop(client_socket, None)
+        if lines is None:
+            return
+        self._resume_at.pop(client_socket, None)
+        self._deliver(client_socket, lines)
+        if client_socket not in self._held:
+            self._update_events(client_socket)
+
+    def _resume_waiting_room(self) -> None:
+        for client_socket in list(self._waiting_room):
+            self._waiting_room.discard(client_socket)
+            self._queue.resumed(client_socket)
+            self._resume(client_socket)
+
+    def _deliver(self, client_socket: socket.socket, lines: deque[str]) -> None:
+        """Queue received lines while there is room and socket has command tokens, hold back the rest."""
+        if (held := self._held.get(client_socket)) is not None:
+            # read in the same pass it got throttled
+            held.extend(lines)
+            return
+        bucket = self._command_buckets.get(client_socket)
+        now = time.monotonic()
+        while lines:
+            if bucket and (delay := bucket.take(now)):
+                self._resume_at[client_socket] = now + delay
+                self._hold(client_socket, lines)
+                return
+            if not self._queue.try_put(client_socket, lines[0]):
+                if bucket:
+                    bucket.refund()
+                logging.warning(f"ConnectionManager: ingress queue full, pausing {self._addresses.get(client_socket)}")
+                self._waiting_room.add(client_socket)
+                self._hold(client_socket, lines)
+                return
+            lines.popleft()
+
+    def _hold(self, client_socket: socket.socket, lines: deque[str]) -> None:
+        self._held[client_socket] = lines
+        self._update_events(client_socket)
+
+    def _shutdown(self) -> None:
+        for client_socket in list(self._connections):
+            self._close(client_socket)
+        self._selector.close()
+        self._socket.close()
+        self._waker.close()
+        self._wakeup_socket.close()
+
+    def _accept(self, server_socket: socket.socket, _: int) -> None:
+        try:
+            client_socket, client_address = server_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        except socket.error as e:
+            logging.warning(f"ConnectionManager: server socket error: {e}")
+            return
+        if not self._accept_allowed(client_socket, client_address[0]):
+            return
+        logging.info(f"ConnectionManager: Connected with {client_address}")
+        self._attach_send_queue(client_socket)
+        self._limit_commands(client_socket)
+        self._register(client_socket, str(client_address))
+
+    def _register(self, client_socket: socket.socket, client_address: str) -> None:
+        if client_socket.fileno() == -1:
+            return
+        self._connections.add(client_socket)
+        self._addresses[client_socket] = client_address
+        self._traffic[client_socket] = Traffic()
+        self._line_buffers[client_socket] = LineBuffer()
+        self._selector.register(client_socket, selectors.EVENT_READ, self._ready)
+
+    def _ready(self, client_socket: socket.socket, mask: int) -> None:
+        if mask & selectors.EVENT_WRITE:
+            send_queue = SendQueue.of(client_socket)
+            if not send_queue or send_queue.flush():
+                self._writing.discard(client_socket)
+                self._update_events(client_socket)
+        if mask & selectors.EVENT_READ:
+            self._read(client_socket)
+
+    def _read(self, client_socket: socket.socket) -> None:
+        try:
+            received = client_socket.recv_into(self._recv_buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logging.warning("ConnectionManager: " + f"{self._addresses.get(client_socket)} socket error: {e}")
+            self._close(client_socket)
+            return
+
+        if not received:
+            self._close(client_socket)
+            return
+
+        lines = self._line_buffers[client_socket].feed(self._recv_view[:received])
+        traffic = self._traffic[client_socket]
+        traffic.received_bytes += received
+        traffic.received_lines += len(lines)
+        if lines:
+            self._deliver(client_socket, deque(lines))
+
+    def _close(self, client_socket: socket.socket) -> None:
+        self._connections.discard(client_socket)
+        self._addresses.pop(client_socket, None)
+        self._traffic.pop(client_socket, None)
+        self._command_buckets.pop(client_socket, None)
+        if held := self._held.pop(client_socket, None):
+            self._queue.drop(len(held))
+        self._resume_at.pop(client_socket, None)
+        if client_socket in self._waiting_room:
+            self._waiting_room.discard(client_socket)
+            self._queue.resumed(client_socket)
+        self._writing.discard(client_socket)
+        if self._line_buffers.pop(client_socket, None) is not None and self._running:
+            self._queue.put(client_socket, self.CONNECTION_LOST)
+        SendQueue.detach(client_socket)
+        try:
+            self._selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        client_socket.close()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import socket
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from itertools import islice
+
+
+class SendQueue:
+    """
+    Bounded outbound buffer of a single connection.
+
+    Data put into the queue is written with non-blocking ``sendmsg`` calls,
+    all queued lines are batched into a single call. Whatever the socket
+    does not accept stays queued and the connection manager is asked to flush
+    the queue once the socket becomes writable, so a slow reader never blocks
+    the sender. When more than ``limit`` bytes are waiting, queued data is
+    dropped, ``ERROR :SendQ exceeded`` is written if the socket accepts it, the
+    queue is closed and the connection manager disconnects the peer.
+
+    Large amounts of data (e.g. state burst of a server link) are streamed with
+    ``put_stream``, chunks are pulled only while less than half of ``limit`` is
+    waiting. Data put while a stream is being sent is kept behind it.
+
+    A thread handling a batch of messages can ``cork`` the queues: data put by
+    that thread is only queued, every queue it was put to is written once with
+    ``uncork`` at the end of the batch.
+
+    Queues are looked up by socket with ``SendQueue.of``.
+
+    :param client_socket: socket the data is written to
+    :type client_socket: ``socket.socket``
+    :param limit: maximum number of bytes waiting to be sent
+    :type limit: ``int``
+    :param on_pending: called when data is left waiting for the socket to become writable
+    :type on_pending: ``Callable[[SendQueue], None]``
+    :param on_exceeded: called once when the limit is exceeded
+    :type on_exceeded: ``Callable[[SendQueue], None]``
+    :field sent_messages: number of ``put`` calls, i.e. messages queued
+    :type sent_messages: ``int``
+    :field sent_bytes: bytes written to the socket
+    :type sent_bytes: ``int``
+    """
+
+    DEFAULT_LIMIT = 512 * 1024
+    EXCEEDED_ERROR = b"ERROR :SendQ exceeded\r\n"
+    MAX_BATCH = 256  # buffers passed to a single sendmsg call, below IOV_MAX
+
+    _queues: dict[socket.socket, SendQueue] = {}
+    _corked = threading.local()
+
+    def __init__(
+        self,
+        client_socket: socket.socket,
+        limit: int = DEFAULT_LIMIT,
+        *,
+        on_pending: Callable[[SendQueue], None],
+        on_exceeded: Callable[[SendQueue], None],
+    ) -> None:
+        self.socket = client_socket
+        self.limit = limit
+        self.closed = False
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self._on_pending = on_pending
+        self._on_exceeded = on_exceeded
+        self._buffers: deque[bytes | memoryview] = deque()
+        self._size = 0
+        self._streams: deque[bytes | Iterator[bytes]] = deque()
+        self._deferred = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(
+        cls,
+        client_socket: socket.socket,
+        limit: int = DEFAULT_LIMIT,
+        *,
+        on_pending: Callable[[SendQueue], None],
+        on_exceeded: Callable[[SendQueue], None],
+    ) -> SendQueue:
+        """Create a queue for socket and make it available through ``SendQueue.of``."""
+        send_queue = cls(client_socket, limit, on_pending=on_pending, on_exceeded=on_exceeded)
+        cls._queues[client_socket] = send_queue
+        return send_queue
+
+    @classmethod
+    def of(cls, client_socket: socket.socket) -> SendQueue | None:
+        """Return queue attached to socket, None if socket has no queue."""
+        return cls._queues.get(client_socket)
+
+    @classmethod
+    def detach(cls, client_socket: socket.socket) -> None:
+        """Close and forget queue attached to socket."""
+        send_queue = cls._queues.pop(client_socket, None)
+        if send_queue:
+            send_queue.close()
+
+    @classmethod
+    def cork(cls) -> None:
+        """Hold back writes of data put by the current thread until ``uncork``."""
+        cls._corked.queues = {}
+
+    @classmethod
+    def uncork(cls) -> None:
+        """Write data put by the current thread since ``cork``, a single write per queue."""
+        queues = getattr(cls._corked, "queues", None)
+        cls._corked.queues = None
+        if not queues:
+            return
+        for send_queue in queues:
+            if not send_queue.flush():
+                send_queue._on_pending(send_queue)
+
+    @classmethod
+    @contextmanager
+    def corked(cls) -> Iterator[None]:
+        """Cork queues for the duration of a with block."""
+        cls.cork()
+        try:
+            yield
+        finally:
+            cls.uncork()
+
+    @property
+    def size(self) -> int:
+        """Number of bytes waiting to be sent, not counting streams not yet pulled."""
+        return self._size + self._deferred
+
+    def put(self, data: bytes) -> None:
+        """Queue data and try to send it right away.
+
+        :param data: data to send
+        :type data: ``bytes``
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.sent_messages += 1
+            if self._size + self._deferred + len(data) > self.limit:
+                self._exceed()
+                exceeded = True
+            elif self._streams:
+                # sent once streams before it are sent, flushing is scheduled
+                self._streams.append(data)
+                self._deferred += len(data)
+                return
+            else:
+                exceeded = False
+                self._buffers.append(data)
+                self._size += len(data)
+                was_idle = self._size == len(data)
+        if exceeded:
+            logging.warning(f"SendQueue: SendQ exceeded ({self.limit} bytes)")
+            self.flush()
+            self.close()
+            self._on_exceeded(self)
+            return
+        # queue already had data - flushing is scheduled
+        if was_idle:
+            self._schedule_flush()
+
+    def put_stream(self, chunks: Iterator[bytes]) -> None:
+        """Queue data produced lazily by an iterator.
+
+        :param chunks: iterator producing data to send
+        :type chunks: ``Iterator[bytes]``
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self._streams.append(chunks)
+            was_idle = not self._buffers and len(self._streams) == 1
+        if was_idle:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Flush data put to an idle queue, at ``uncork`` if the current thread corked the queues."""
+        corked = getattr(self._corked, "queues", None)
+        if corked is not None:
+            corked[self] = None
+        elif not self.flush():
+            self._on_pending(self)
+
+    def flush(self) -> bool:
+        """Write as much of the queued data as the socket accepts without blocking.
+
+        :return: True if nothing is left waiting, False otherwise
+        :rtype: ``bool``
+        """
+        with self._lock:
+            buffers = self._buffers
+            while True:
+                if self._streams and self._size < self.limit // 2:
+                    self._pull()
+                if not buffers:
+                    return True
+                try:
+                    sent = self.socket.sendmsg(islice(buffers, self.MAX_BATCH), (), socket.MSG_DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    return False
+                except OSError as e:
+                    logging.warning(f"SendQueue: dropping {self._size} bytes, socket error: {e}")
+                    self._close()
+                    return True
+                self._size -= sent
+                self.sent_bytes += sent
+                while sent:
+                    head = buffers[0]
+                    if sent >= len(head):
+                        sent -= len(head)
+                        buffers.popleft()
+                    else:
+                        buffers[0] = memoryview(head)[sent:]
+                        sent = 0
+
+    def _pull(self) -> None:
+        streams = self._streams
+        while streams and self._size < self.limit // 2:
+            head = streams[0]
+            if isinstance(head, bytes):
+                streams.popleft()
+                self._deferred -= len(head)
+                data: bytes | None = head
+            else:
+                data = next(head, None)
+                if data is None:
+                    streams.popleft()
+                    continue
+            self._buffers.append(data)
+            self._size += len(data)
+
+    def _exceed(self) -> None:
+        """Refuse new data and replace queued data with the error, past the limit."""
+        self.closed = True
+        # the rest of a partly written line is kept, so that the error starts a line
+        head = self._buffers[0] if self._buffers and isinstance(self._buffers[0], memoryview) else b""
+        self._buffers.clear()
+        self._streams.clear()
+        self._deferred = 0
+        if head:
+            self._buffers.append(head)
+        self._buffers.append(self.EXCEEDED_ERROR)
+        self._size = len(head) + len(self.EXCEEDED_ERROR)
+
+    def close(self) -> None:
+        """Drop all queued data and refuse new data."""
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        self.closed = True
+        self._buffers.clear()
+        self._size = 0
+        self._streams.clear()
+        self._deferred = 0
@@ -1,13 +1,25 @@
 from concurrent.futures import ThreadPoolExecutor
 import socket
+import signal
+import threading
 import importlib
+import time
 from psirc.connection_manager import ConnectionManager
+from psirc.selector_connection_manager import SelectorConnectionManager
+from psirc.send_queue import SendQueue
+from psirc.dispatcher import ShardedDispatcher
 from psirc.message_parser import MessageParser
 from psirc.session_info import SessionInfo, SessionType
 from psirc.session_info_manager import SessionInfoManager
 from psirc.client_manager import ClientManager
 from psirc.password_handler import PasswordHandler
 from psirc.channel_manager import ChannelManager
+from psirc.defines.responses import Command
+from psirc.burst import Burst
+from psirc.throttle import RateLimit
+from psirc.ingress_queue import IngressQueue
+from psirc.metrics import LinkStats, Metrics, serve_metrics
+from psirc.log_config import message_log
 
 import logging
 
@@ -16,9 +28,31 @@ class AlreadyRegistered(Exception):
     pass
 
 
+CONNECTION_MODES: dict[str, type[ConnectionManager]] = {
+    "threaded": ConnectionManager,
+    "selector": SelectorConnectionManager,
+}
+
+
 class IRCServer:
+    # messages taken from the connection manager and handled at once
+    BATCH_SIZE = 256
+
     def __init__(
-        self, nickname: str, host: str, port: int, max_workers: int = 10, *, config_file: str = "psirc.conf"
+        self,
+        nickname: str,
+        host: str,
+        port: int,
+        max_workers: int = 10,
+        *,
+        config_file: str = "psirc.conf",
+        connection_mode: str = "threaded",
+        sendq: int = SendQueue.DEFAULT_LIMIT,
+        dispatch_workers: int = 0,
+        accept_limit: RateLimit | None = None,
+        command_limit: RateLimit | None = None,
+        ingress_limit: int = IngressQueue.DEFAULT_LIMIT,
+        metrics_port: int | None = None,
     ) -> None:
         self.running = False
         self.nickname = nickname
@@ -26,46 +60,170 @@ class IRCServer:
         self.port = port
         self.password_handler = PasswordHandler(config_file)
         self._thread_executor = ThreadPoolExecutor(max_workers)
-        self._connection = ConnectionManager(host, port, self._thread_executor)
+        self._connection = CONNECTION_MODES[connection_mode](
+            host,
+            port,
+            self._thread_executor,
+            sendq=sendq,
+            accept_limit=accept_limit,
+            command_limit=command_limit,
+            ingress_limit=ingress_limit,
+            ingress_per_socket=max(1, ingress_limit // 10),
+        )
         self._sessions = SessionInfoManager()
         self._users = ClientManager()
         self._channels = ChannelManager()
-        self._commands = importlib.import_module("psirc.command_manager").CMD_FUNCTIONS
+        command_manager = importlib.import_module("psirc.command_manager")
+        self._commands = command_manager.CMD_FUNCTIONS
+        self._connection_lost = command_manager.handle_connection_lost
+        self._apply_burst = importlib.import_module("psirc.command_helpers").apply_burst
+        # state introduced by server links, applied at once on their first message other than NICK or JOIN
+        self._bursts: dict[socket.socket, Burst] = {}
+        # handle messages of different connections concurrently
+        self._dispatcher = ShardedDispatcher(dispatch_workers, self.handle_message, batch=SendQueue.corked) if dispatch_workers else None
+        self.metrics = Metrics()
+        # served on localhost only, not served if None
+        self.metrics_port = metrics_port
 
     def start(self) -> None:
         self.password_handler.parse_config()
         self.running = True
         self._connection.start()
+        if self._dispatcher:
+            self._dispatcher.start()
+        metrics_endpoint = serve_metrics(self.metrics_port, self.metrics_text) if self.metrics_port is not None else None
+        previous_sighup = self._handle_sighup()
 
         try:
             while self.running:
-                result = self._connection.get_message(timeout=1)
-                if result is None:
-                    continue
-
-                client_socket, data = result
-                message = MessageParser.parse_message(data)
-                if not message:
-                    logging.warning(f"Invalid message from client:\n{data}")
-                    # server sends no response
-                    continue
-                logging.info(f"Recived message: {message}")
-                session_info = self._sessions.get_info(client_socket)
-
-                if message.command not in self._commands.keys():
-                    continue
-                try:
-                    command_handler = self._commands[message.command]
-                except KeyError:
-                    logging.warning(f"Unrecognized command: {message.command}.")
-                command_handler(self, client_socket, session_info, message)
+                batch = self._connection.get_messages(self.BATCH_SIZE, timeout=1)
+                if self._dispatcher:
+                    for client_socket, data in batch:
+                        self._dispatcher.submit(client_socket, data)
+                elif batch:
+                    self.handle_batch(batch)
         except KeyboardInterrupt:
             self.running = False
         except Exception as e:
             logging.error(f"Aborting! Unhandled error:\n{e}")
         finally:
+            if previous_sighup is not None:
+                signal.signal(signal.SIGHUP, previous_sighup)
+            if metrics_endpoint:
+                metrics_endpoint.shutdown()
+                metrics_endpoint.server_close()
+            if self._dispatcher:
+                self._dispatcher.stop()
             self._connection.stop()
 
+    def _handle_sighup(self) -> signal.Handlers | None:
+        """Reload config on SIGHUP, signal handlers can only be set from the main thread.
+
+        :return: previous handler to restore, None if no handler was set
+        :rtype: ``signal.Handlers`` or ``None``
+        """
+        if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+            return None
+        return signal.signal(signal.SIGHUP, lambda signum, frame: self.rehash())
+
+    def rehash(self) -> None:
+        """Reload config file without blocking message handling.
+
+        The file is parsed by a separate thread, credentials are replaced at once
+        when parsing is done. If the file can't be read, current credentials are kept.
+        """
+        threading.Thread(target=self._rehash, name="psirc-rehash", daemon=True).start()
+
+    def _rehash(self) -> None:
+        try:
+            self.password_handler.parse_config()
+        except OSError as e:
+            logging.error(f"Rehash failed, keeping current config: {e}")
+            return
+        logging.info(f"Rehashed {self.password_handler.filename}")
+
+    def handle_batch(self, batch: list[tuple[socket.socket, str]]) -> None:
+        """Handle received messages, replies are written once per socket after the whole batch.
+
+        :param batch: sockets and messages received from them
+        :type batch: ``list[tuple[socket.socket, str]]``
+        """
+        with SendQueue.corked():
+            for client_socket, data in batch:
+                self.handle_message(client_socket, data)
+
+    def handle_message(self, client_socket: socket.socket, data: str) -> None:
+        """Parse message received from socket and call its command handler.
+
+        An error raised by the handler is counted in metrics and logged, as by dispatcher workers.
+
+        :param client_socket: socket from which the message was received
+        :type client_socket: ``socket.socket``
+        :param data: received message
+        :type data: ``str``
+        """
+        if data == self._connection.CONNECTION_LOST:
+            self._bursts.pop(client_socket, None)
+            self._connection_lost(self, client_socket, self._sessions.get_info(client_socket))
+            return
+        started = time.perf_counter()
+        message = MessageParser.parse_message(data)
+        parsed = time.perf_counter()
+        self.metrics.observe_parse(parsed - started, message is not None)
+        if not message:
+            logging.warning("Invalid message from client: %r", data)
+            # server sends no response
+            return
+        if client_socket in self._bursts and message.command not in (Command.NICK, Command.JOIN):
+            self.flush_burst(client_socket)
+        # formatted only if enabled, formatting parses the prefix
+        message_log.debug("Received message: %s", message)
+
+        command_handler = self._commands.get(message.command)
+        if not command_handler:
+            return
+        started = time.perf_counter()
+        try:
+            command_handler(self, client_socket, self._sessions.get_info(client_socket), message)
+        except Exception:
+            # counted and logged, an error handling one message must not stop the server
+            self.metrics.observe_command(message.command, time.perf_counter() - started, failed=True)
+            logging.exception("Unhandled error while handling message: %r", data)
+            return
+        self.metrics.observe_command(message.command, time.perf_counter() - started)
+
+    def link_stats(self) -> list[LinkStats]:
+        """Get traffic of every connection, registered ones are named by nickname.
+
+        :rtype: ``list[LinkStats]``
+        """
+        stats = []
+        for client_socket, link in self._connection.link_stats().items():
+            session_info = self._sessions.get_info(client_socket)
+            if session_info and session_info.nickname:
+                link = link._replace(name=session_info.nickname)
+            stats.append(link)
+        return stats
+
+    def metrics_text(self) -> str:
+        """Get metrics and current queue depths in the Prometheus text format.
+
+        :rtype: ``str``
+        """
+        ingress = self._connection.ingress_stats()
+        gauges = {
+            "psirc_ingress_depth": ingress.depth,
+            "psirc_ingress_limit": ingress.limit,
+            "psirc_ingress_paused_connections": ingress.paused,
+            "psirc_dispatch_depth": self._dispatcher.depth() if self._dispatcher else 0,
+            "psirc_pending_bursts": len(self._bursts),
+        }
+        counters = {
+            "psirc_ingress_pauses_total": ingress.pauses,
+            "psirc_ingress_dropped_total": ingress.dropped,
+        }
+        return self.metrics.render(gauges, counters, self.link_stats())
+
     # TODO: HANDLE SERVER TO SERVER CONNECTIONS
     def connect_to_server(self, address: str, port: str) -> socket.socket | None:
         ...
@@ -101,6 +259,7 @@ class IRCServer:
         self._sessions.remove(client_socket)
         if session_info.type is not SessionType.USER:
             raise ValueError("Server need to quit using SQUIT command")
+        self._users.release(session_info.nickname, client_socket)
         self._users.remove(session_info.nickname)
         self._channels.quit(session_info.nickname)
         return True
@@ -122,15 +281,114 @@ class IRCServer:
 
         return True
 
+    def reserve_nickname(self, nickname: str, client_socket: socket.socket) -> bool:
+        """Claim nickname for a connection registering as a user.
+
+        Connections handled on different dispatcher shards can't both claim the same nickname.
+
+        :param nickname: requested nickname
+        :type nickname: ``str``
+        :param client_socket: socket of the registering connection
+        :type client_socket: ``socket.socket``
+        :return: True if claimed, False if it is in use
+        :rtype: ``bool``
+        """
+        if nickname == self.nickname:
+            return False
+        return self._users.reserve(nickname, client_socket)
+
+    def release_nickname(self, nickname: str, client_socket: socket.socket) -> None:
+        """Release nickname claimed by a connection which did not register."""
+        self._users.release(nickname, client_socket)
+
     def register_local_user(self, client_socket: socket.socket, session_info: SessionInfo) -> None:
         """Register local user."""
         self._users.add_local(session_info.nickname, client_socket)
 
-    def register_external_user(self, user_nickname: str, session_info: SessionInfo) -> None:
-        self._users.add_external(user_nickname, session_info.hops + 1, session_info.nickname)
+    def register_external_user(self, user_nickname: str, hop_count: int, session_info: SessionInfo) -> None:
+        self._users.add_external(user_nickname, hop_count, session_info.nickname)
+
+    def queue_external_user(
+        self, server_socket: socket.socket, user_nickname: str, hop_count: int, session_info: SessionInfo
+    ) -> bool:
+        """Queue user introduced by a server to be registered with the rest of the burst, if the server is sending one.
+
+        :param server_socket: socket of the server introducing the user
+        :type server_socket: ``socket.socket``
+        :param user_nickname: nickname of the user
+        :type user_nickname: ``str``
+        :param hop_count: distance of the user from this server
+        :type hop_count: ``int``
+        :param session_info: session of the server introducing the user
+        :type session_info: ``SessionInfo``
+        :return: True if the user was queued, False if it has to be registered right away
+        :rtype: ``bool``
+        """
+        burst = self._bursts.get(server_socket)
+        if burst is None:
+            return False
+        burst.users.append((user_nickname, hop_count, session_info.nickname))
+        return True
+
+    def queue_join(self, server_socket: socket.socket, channel_name: str, user_nickname: str) -> bool:
+        """Queue JOIN relayed by a server, if the server is sending a burst.
+
+        :param server_socket: socket of the server relaying the JOIN
+        :type server_socket: ``socket.socket``
+        :param channel_name: name of the joined channel
+        :type channel_name: ``str``
+        :param user_nickname: nickname of the joining user
+        :type user_nickname: ``str``
+        :return: True if JOIN was queued, False if it has to be handled right away
+        :rtype: ``bool``
+        """
+        burst = self._bursts.get(server_socket)
+        if burst is None:
+            return False
+        burst.joins.setdefault(channel_name, []).append(user_nickname)
+        return True
+
+    def flush_burst(self, server_socket: socket.socket) -> None:
+        """Apply state queued for a server at once.
+
+        :param server_socket: socket of the server which sent the burst
+        :type server_socket: ``socket.socket``
+        """
+        burst = self._bursts.pop(server_socket, None)
+        if burst:
+            self._apply_burst(self, server_socket, burst)
+
+    def register_server(self, nickname: str, hops: int, location: str = "") -> None:
+        self._users.add_server(nickname, hops, location)
 
-    def register_server(self, nickname: str, hops: int) -> None:
-        self._users.add_server(nickname, hops)
+    def register_server_link(self, server_socket: socket.socket, session_info: SessionInfo) -> None:
+        """Register neighbouring server, commands it relays are not rate limited.
+
+        Users and JOINs the server sends are queued until its burst ends.
+        """
+        self.register_server(session_info.nickname, session_info.hops)
+        self._bursts[server_socket] = Burst()
+        self._connection.exempt(server_socket)
+        self._channels.invalidate_fanout()
+
+    def remove_server_link(self, server_socket: socket.socket, session_info: SessionInfo) -> list[str]:
+        """Remove neighbouring server, servers and users behind it.
+
+        Users are not parted from channels, so that channel members can be notified.
+
+        :param server_socket: socket of the lost server link
+        :type server_socket: ``socket.socket``
+        :param session_info: session of the lost server
+        :type session_info: ``SessionInfo``
+        :return: nicknames of removed users
+        :rtype: ``list[str]``
+        """
+        self._sessions.remove(server_socket)
+        self._connection.disconnect_client(server_socket)
+        self._channels.invalidate_fanout()
+        for irc_server in self._users.remove_servers_behind(session_info.nickname):
+            logging.info(f"Netsplit: {irc_server.nick} is no longer reachable")
+        return [user.nick for user in self._users.remove_from_server(session_info.nickname)]
 
     def get_local_users(self) -> list[str]:
         return self._users.get_local_users()
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from enum import Enum, auto
 
 
@@ -25,15 +26,42 @@ class SessionInfo:
     :type username: ``str``
     :param realname: real name of user - contains space
     :type realname: ``str``
+    :param on_change: optional, called with session, old nickname and old type when nickname or type changes
+    :type on_change: ``Callable[[SessionInfo, str, SessionType], None] | None``
     """
 
-    def __init__(self, password: str | None) -> None:
+    __slots__ = ("password", "_nickname", "username", "realname", "hops", "_type", "_on_change")
+
+    def __init__(
+        self, password: str | None, on_change: "Callable[[SessionInfo, str, SessionType], None] | None" = None
+    ) -> None:
         self.password = password
-        self.nickname = ""
+        self._nickname = ""
         self.username = ""
         self.realname = ""
         self.hops = 0
-        self.type = SessionType.UNKNOWN
+        self._type = SessionType.UNKNOWN
+        self._on_change = on_change
+
+    @property
+    def nickname(self) -> str:
+        return self._nickname
+
+    @nickname.setter
+    def nickname(self, nickname: str) -> None:
+        old_nickname, self._nickname = self._nickname, nickname
+        if self._on_change and old_nickname != nickname:
+            self._on_change(self, old_nickname, self._type)
+
+    @property
+    def type(self) -> SessionType:
+        return self._type
+
+    @type.setter
+    def type(self, type: SessionType) -> None:
+        old_type, self._type = self._type, type
+        if self._on_change and old_type is not type:
+            self._on_change(self, self._nickname, old_type)
 
     def registered(self) -> bool:
         """Checks if session has marks indicating registered status.
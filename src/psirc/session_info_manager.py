@@ -1,16 +1,36 @@
 from psirc.session_info import SessionInfo, SessionType
+from functools import partial
 import socket
+import threading
 
 
 class SessionInfoManager:
     """Holds SessionInfo associated with socket
 
+    Sessions are additionally indexed by nickname and by type. Indexes are kept
+    up to date by SessionInfo, which reports changes of its nickname and type.
+
     :field _socket_info: socket to SessionInfo association
     :type nickname: ``dict[socket.socket, SessionInfo]``
+    :field _nicknames: nickname to socket association, first session registered with a nickname owns it
+    :type _nicknames: ``dict[str, socket.socket]``
+    :field _shared_nicknames: nicknames used by more than one session
+    :type _shared_nicknames: ``set[str]``
+    :field _types: type to sessions association
+    :type _types: ``dict[SessionType, dict[socket.socket, SessionInfo]]``
+    :field _snapshots: copies of _types handed out by get_sessions_by_type, dropped when sessions of a type change
+    :type _snapshots: ``dict[SessionType, dict[socket.socket, SessionInfo]]``
+    :field _lock: guards associations, sessions can be added and removed concurrently
+    :type _lock: ``threading.Lock``
     """
 
     def __init__(self) -> None:
         self._socket_info: dict[socket.socket, SessionInfo] = {}
+        self._nicknames: dict[str, socket.socket] = {}
+        self._shared_nicknames: set[str] = set()
+        self._types: dict[SessionType, dict[socket.socket, SessionInfo]] = {}
+        self._snapshots: dict[SessionType, dict[socket.socket, SessionInfo]] = {}
+        self._lock = threading.Lock()
 
     def add(self, client_socket: socket.socket, password: str | None) -> None:
         """Create new SessionInfo to SessionManager
@@ -20,7 +40,13 @@ class SessionInfoManager:
         :param password: optional, password with which session will be registered
         :type password: ``str``
         """
-        self._socket_info[client_socket] = SessionInfo(password)
+        session_info = SessionInfo(password, on_change=partial(self._session_changed, client_socket))
+        with self._lock:
+            old_session_info = self._socket_info.get(client_socket)
+            if old_session_info:
+                self._unindex(client_socket, old_session_info.nickname, old_session_info.type)
+            self._socket_info[client_socket] = session_info
+            self._index_type(client_socket, session_info)
 
     def get_info(self, client_socket: socket.socket) -> SessionInfo | None:
         """Retrieve sessionInfo associated with socket
@@ -38,21 +64,27 @@ class SessionInfoManager:
         :param client_socket: socket of some local client
         :type client_socket: ``socket.socket``
         """
-        self._socket_info.pop(client_socket, None)
+        with self._lock:
+            session_info = self._socket_info.pop(client_socket, None)
+            if session_info:
+                session_info._on_change = None
+                self._unindex(client_socket, session_info.nickname, session_info.type)
 
     def get_sessions_by_type(self, type: SessionType) -> dict[socket.socket, SessionInfo]:
         """Return all sessionInfo of one type
 
+        Returned dictionary is shared between callers until sessions of the type change, it must not be modified.
+
         :param type: type of SessionInfo
         :type type: ``SessionType``
         :return: dictionary of socket to SessionInfo associations where only SessionInfo of type is present
         :rtype: ``dict[socket.socket, SessionInfo]``
         """
-        result = {}
-        for session in self._socket_info:
-            if self._socket_info[session].type == type:
-                result[session] = self._socket_info[session]
-        return result
+        snapshot = self._snapshots.get(type)
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshots.setdefault(type, dict(self._types.get(type, {})))
+        return snapshot
 
     def get_socket(self, nickname: str) -> socket.socket | None:
         """Return socket associated with a nickname
@@ -62,7 +94,49 @@ class SessionInfoManager:
         :return: socket associated with nickname, not if no association exists
         :rtype: ``socket.socket | None``
         """
+        return self._nicknames.get(nickname)
+
+    def _session_changed(
+        self, client_socket: socket.socket, session_info: SessionInfo, old_nickname: str, old_type: SessionType
+    ) -> None:
+        with self._lock:
+            if self._socket_info.get(client_socket) is not session_info:
+                return
+            if old_nickname != session_info.nickname:
+                self._unindex_nickname(client_socket, old_nickname)
+                self._index_nickname(client_socket, session_info.nickname)
+            if old_type is not session_info.type:
+                self._unindex_type(client_socket, old_type)
+                self._index_type(client_socket, session_info)
+
+    def _unindex(self, client_socket: socket.socket, nickname: str, type: SessionType) -> None:
+        self._unindex_nickname(client_socket, nickname)
+        self._unindex_type(client_socket, type)
+
+    def _index_nickname(self, client_socket: socket.socket, nickname: str) -> None:
+        if not nickname:
+            return
+        owner = self._nicknames.setdefault(nickname, client_socket)
+        if owner is not client_socket:
+            # nickname collisions are answered with an error but the nickname is still stored
+            self._shared_nicknames.add(nickname)
+
+    def _unindex_nickname(self, client_socket: socket.socket, nickname: str) -> None:
+        if self._nicknames.get(nickname) is not client_socket:
+            return
+        del self._nicknames[nickname]
+        if nickname not in self._shared_nicknames:
+            return
+        # hand the nickname over to another session using it
+        self._shared_nicknames.discard(nickname)
         for sock, info in self._socket_info.items():
-            if info.nickname == nickname:
-                return sock
-        return None
+            if info.nickname == nickname and sock is not client_socket:
+                self._index_nickname(sock, nickname)
+
+    def _index_type(self, client_socket: socket.socket, session_info: SessionInfo) -> None:
+        self._types.setdefault(session_info.type, {})[client_socket] = session_info
+        self._snapshots.pop(session_info.type, None)
+
+    def _unindex_type(self, client_socket: socket.socket, type: SessionType) -> None:
+        self._types.get(type, {}).pop(client_socket, None)
+        self._snapshots.pop(type, None)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import time
+from typing import NamedTuple
+
+
+class RateLimit(NamedTuple):
+    """
+    Limit of events, ``burst`` at once, then ``rate`` per second
+
+    :field rate: events allowed per second
+    :type rate: ``float``
+    :field burst: events allowed at once
+    :type burst: ``float``
+    """
+
+    rate: float
+    burst: float
+
+    @classmethod
+    def parse(cls, text: str) -> RateLimit:
+        """Parse ``rate:burst`` (e.g. ``0.5:5``), burst defaults to 1
+
+        :raises ValueError: if text is not a valid limit
+        """
+        rate, _, burst = text.partition(":")
+        limit = cls(float(rate), float(burst) if burst else 1.0)
+        if limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"invalid rate limit: {text}")
+        return limit
+
+    def bucket(self, now: float | None = None) -> TokenBucket:
+        return TokenBucket(self.rate, self.burst, now)
+
+
+class TokenBucket:
+    """
+    Token bucket, every event takes a token, tokens are refilled at a constant rate
+
+    Works as the RFC 1459 penalty clock - with rate 0.5 and burst 5 a client
+    can send 5 messages at once and then one every 2 seconds.
+    Not thread safe, every bucket is meant to be used by a single thread.
+
+    :param rate: tokens refilled per second
+    :type rate: ``float``
+    :param burst: capacity of the bucket
+    :type burst: ``float``
+    :param now: current ``time.monotonic()``, bucket starts full
+    :type now: ``float | None``
+    """
+
+    __slots__ = ("rate", "burst", "_tokens", "_updated")
+
+    def __init__(self, rate: float, burst: float, now: float | None = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic() if now is None else now
+
+    def take(self, now: float | None = None) -> float:
+        """Take a token if there is one.
+
+        :param now: current ``time.monotonic()``
+        :type now: ``float | None``
+        :return: 0 if a token was taken, otherwise seconds until a token is available
+        :rtype: ``float``
+        """
+        self._refill(time.monotonic() if now is None else now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def refund(self) -> None:
+        """Give back a taken token, e.g. when the event did not happen after all."""
+        self._tokens = min(self.burst, self._tokens + 1)
+
+    def full(self, now: float | None = None) -> bool:
+        """Check if bucket is full, a full bucket is the same as a new one."""
+        self._refill(time.monotonic() if now is None else now)
+        return self._tokens >= self.burst
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+
+class AcceptThrottle:
+    """
+    Limits how often connections from a single address are accepted
+
+    Buckets of addresses which did not connect for a while are full and get
+    dropped once there are more than ``max_addresses`` of them.
+
+    :param limit: connections allowed from a single address
+    :type limit: ``RateLimit``
+    :param max_addresses: tracked addresses before full buckets are dropped
+    :type max_addresses: ``int``
+    """
+
+    def __init__(self, limit: RateLimit, max_addresses: int = 4096) -> None:
+        self.limit = limit
+        self.max_addresses = max_addresses
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, address: str, now: float | None = None) -> bool:
+        """Check if a connection from address can be accepted, counting it if it can.
+
+        :param address: ip address of the peer
+        :type address: ``str``
+        :param now: current ``time.monotonic()``
+        :type now: ``float | None``
+        :rtype: ``bool``
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(address)
+        if bucket is None:
+            if len(self._buckets) >= self.max_addresses:
+                self._prune(now)
+            bucket = self._buckets[address] = self.limit.bucket(now)
+        return not bucket.take(now)
+
+    def _prune(self, now: float) -> None:
+        for address in [address for address, bucket in self._buckets.items() if bucket.full(now)]:
+            del self._buckets[address]
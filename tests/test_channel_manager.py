@@ -0,0 +1,141 @@
+import threading
+
+from psirc.channel import Channel, FanoutPlan
+from psirc.channel_manager import ChannelManager
+from psirc.defines.exceptions import NoSuchChannel, NotOnChannel, BannedFromChannel, BadChannelKey
+import pytest
+
+
+@pytest.fixture
+def channels():
+    channels = ChannelManager()
+    channels.join("#a", "alice")
+    channels.join("#b", "alice")
+    channels.join("#a", "bob")
+    channels.join("#c", "bob")
+    return channels
+
+
+def test_user_channels(channels):
+    assert sorted(channels.get_user_channels("alice")) == ["#a", "#b"]
+    assert sorted(channels.get_user_channels("bob")) == ["#a", "#c"]
+    assert channels.get_user_channels("carol") == []
+
+
+def test_quit_parts_only_user_channels(channels):
+    channels.quit("alice")
+    assert channels.get_user_channels("alice") == []
+    assert sorted(channels.channels) == ["#a", "#c"]
+    assert channels.get_channel("#a").users == {"bob"}
+    channels.quit("alice")
+
+
+def test_part_and_kick_update_index(channels):
+    channels.part_from_channel("#b", "alice")
+    assert channels.get_user_channels("alice") == ["#a"]
+    with pytest.raises(NoSuchChannel):
+        channels.get_channel("#b")
+
+    channels.kick("#a", "alice", "bob")
+    assert channels.get_user_channels("bob") == ["#c"]
+    channels.quit("bob")
+    assert sorted(channels.channels) == ["#a"]
+
+
+def test_quit_many(channels):
+    channels.join("#b", "carol")
+    channels.join("#d", "dave")
+    witnesses = channels.quit_many(["alice", "bob", "dave"])
+    assert witnesses == {"carol": {"alice"}}
+    assert sorted(channels.channels) == ["#b"]
+    assert channels.get_channel("#b").users == {"carol"}
+    assert channels.get_user_channels("alice") == []
+
+
+def test_join_many(channels):
+    assert channels.join_many("#b", ["carol", "alice", "dave"]) == ["carol", "dave"]
+    assert channels.join_many("#new", ["erin", "frank"]) == ["erin", "frank"]
+    assert channels.get_channel("#new").users == {"erin", "frank"}
+    assert channels.get_user_channels("carol") == ["#b"]
+    assert sorted(channels.get_user_channels("alice")) == ["#a", "#b"]
+
+
+def test_names_split_into_reply_sized_chunks():
+    channels = ChannelManager()
+    channels.join("#big", "op")
+    nicknames = [f"user{idx}" for idx in range(500)]
+    channels.join_many("#big", nicknames)
+    chunks = channels.get_names("#big")
+    assert len(chunks) > 1
+    width = Channel.MESSAGE_LIMIT - Channel.NAMREPLY_OVERHEAD - len("#big")
+    assert all(len(chunk) <= width for chunk in chunks)
+    entries = " ".join(chunks).split()
+    assert sorted(entries) == sorted(["@op"] + [f"+{nickname}" for nickname in nicknames])
+
+
+def test_names_cache_follows_membership(channels):
+    assert sorted(channels.get_names("#a")[0].split()) == ["+bob", "@alice"]
+    channels.join("#a", "carol")
+    assert sorted(channels.get_names("#a")[0].split()) == ["+bob", "+carol", "@alice"]
+    channels.part_from_channel("#a", "alice")
+    assert sorted(channels.get_names("#a")[0].split()) == ["+bob", "+carol"]
+
+
+def test_fanout_plan_rebuilt_on_membership_change(channels):
+    builds = []
+
+    def build(members):
+        builds.append(sorted(members))
+        return FanoutPlan((), {})
+
+    channel = channels.get_channel("#a")
+    plan = channel.fanout_plan(build)
+    assert channel.fanout_plan(build) is plan
+    channels.join("#a", "carol")
+    channel.fanout_plan(build)
+    channels.part_from_channel("#a", "bob")
+    channel.fanout_plan(build)
+    channels.invalidate_fanout()
+    channel.fanout_plan(build)
+    assert builds == [["alice", "bob"], ["alice", "bob", "carol"], ["alice", "carol"], ["alice", "carol"]]
+
+
+def test_join_channels(channels):
+    channels.get_channel("#b")._key = "secret"
+    channels.get_channel("#c").banned_users.add("carol")
+    results = channels.join_channels("carol", [("#a", "ignored"), ("#b", "wrong"), ("#c", ""), ("#d", "")])
+    assert results["#a"] is None and results["#d"] is None
+    assert isinstance(results["#b"], BadChannelKey)
+    assert isinstance(results["#c"], BannedFromChannel)
+    assert sorted(channels.get_user_channels("carol")) == ["#a", "#d"]
+    assert channels.get_channel("#d").is_chanop("carol")
+
+
+def test_part_channels(channels):
+    results = channels.part_channels("alice", ["#a", "#b", "#c", "#none"])
+    assert results["#a"] is channels.get_channel("#a")
+    # parted channel is returned even when it was deleted as empty
+    assert results["#b"].name == "#b" and "#b" not in channels.channels
+    assert isinstance(results["#c"], NotOnChannel)
+    assert isinstance(results["#none"], NoSuchChannel)
+    assert channels.get_user_channels("alice") == []
+
+
+def test_join_checks_ban_under_lock():
+    channel = Channel("#channel", "op")
+    errors = []
+
+    def join():
+        try:
+            channel.join("nick")
+        except BannedFromChannel as error:
+            errors.append(error)
+
+    with channel._lock:
+        thread = threading.Thread(target=join)
+        thread.start()
+        thread.join(0.05)
+        channel.banned_users.add("nick")
+    thread.join()
+    assert errors
+    assert "nick" not in channel.members()
@@ -0,0 +1,69 @@
+import contextlib
+import socket
+import threading
+from psirc.dispatcher import ShardedDispatcher
+import pytest
+
+
+def test_messages_of_socket_handled_in_order():
+    sockets = [socket.socket() for _ in range(4)]
+    handled: dict[socket.socket, list[str]] = {sock: [] for sock in sockets}
+    threads: dict[socket.socket, set[str]] = {sock: set() for sock in sockets}
+
+    def handler(sock, data):
+        handled[sock].append(data)
+        threads[sock].add(threading.current_thread().name)
+
+    dispatcher = ShardedDispatcher(3, handler)
+    dispatcher.start()
+    for idx in range(100):
+        for sock in sockets:
+            dispatcher.submit(sock, str(idx))
+    dispatcher.stop()
+
+    for sock in sockets:
+        assert handled[sock] == [str(idx) for idx in range(100)]
+        assert len(threads[sock]) == 1
+        sock.close()
+
+
+def test_handler_error_does_not_stop_worker():
+    sock = socket.socket()
+    handled = []
+
+    def handler(sock, data):
+        if data == "fail":
+            raise ValueError(data)
+        handled.append(data)
+
+    dispatcher = ShardedDispatcher(1, handler)
+    dispatcher.start()
+    dispatcher.submit(sock, "fail")
+    dispatcher.submit(sock, "ok")
+    dispatcher.stop()
+    assert handled == ["ok"]
+    sock.close()
+
+
+def test_no_workers():
+    with pytest.raises(ValueError):
+        ShardedDispatcher(0, print)
+
+
+def test_batches_handled_in_context():
+    sock = socket.socket()
+    events = []
+
+    @contextlib.contextmanager
+    def batch():
+        events.append("start")
+        yield
+        events.append("end")
+
+    dispatcher = ShardedDispatcher(1, lambda sock, data: events.append(data), batch=batch)
+    for idx in range(3):
+        dispatcher.submit(sock, str(idx))
+    dispatcher.start()
+    dispatcher.stop()
+    assert events == ["start", "0", "1", "2", "end"]
+    sock.close()
@@ -0,0 +1,42 @@
+from psirc.host_matcher import HostMatcher
+import pytest
+
+
+@pytest.fixture
+def matcher():
+    matcher = HostMatcher()
+    for pattern in ("admin@10.0.0.1", "*@10.0.*", "*@127.0", "*@192.168.0.0/16", "*@*"):
+        matcher.add(pattern)
+    return matcher
+
+
+def test_first_added_wins(matcher):
+    assert matcher.match("admin", "10.0.0.1") == "admin@10.0.0.1"
+    assert matcher.match("other", "10.0.0.1") == "*@10.0.*"
+    assert matcher.match("other", "10.1.0.1") == "*@*"
+
+
+def test_prefix_and_wildcard(matcher):
+    assert matcher.match("user", "127.0.0.1") == "*@127.0"
+    # wildcard needs an element to match
+    assert HostMatcher().match("user", "10") is None
+    only_wildcard = HostMatcher()
+    only_wildcard.add("*@10.*")
+    assert only_wildcard.match("user", "10") is None
+    assert only_wildcard.match("user", "10.2") == "*@10.*"
+
+
+def test_cidr(matcher):
+    assert matcher.match("user", "192.168.3.4") == "*@192.168.0.0/16"
+    v6 = HostMatcher()
+    v6.add("*@fe80::/10")
+    assert v6.match("user", "fe80::1") == "*@fe80::/10"
+    assert v6.match("user", "2001:db8::1") is None
+    assert v6.match("user", "host.example.com") is None
+
+
+def test_invalid_pattern():
+    matcher = HostMatcher()
+    assert not matcher.add("no-at-sign")
+    assert len(matcher) == 0
+
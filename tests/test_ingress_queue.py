@@ -0,0 +1,75 @@
+import socket
+import threading
+
+from psirc.ingress_queue import IngressQueue
+
+
+def test_limits_per_socket_and_total():
+    noisy, quiet, other = socket.socket(), socket.socket(), socket.socket()
+    ingress = IngressQueue(limit=5, per_socket=3)
+    assert all(ingress.try_put(noisy, f"line {idx}") for idx in range(3))
+    assert not ingress.try_put(noisy, "line 3")
+    assert ingress.try_put(quiet, "line 0")
+    assert ingress.try_put(quiet, "line 1")
+    assert not ingress.try_put(other, "line 0")
+    # connection lost markers are always accepted
+    assert ingress.put(other, "")
+
+    stats = ingress.stats()
+    assert (stats.depth, stats.paused, stats.pauses) == (5, 2, 2)
+    assert stats.pending == {noisy: 3, quiet: 2}
+    assert ingress.get() == (noisy, "line 0")
+    assert ingress.stats().pending == {noisy: 2, quiet: 2}
+    for sock in (noisy, quiet, other):
+        sock.close()
+
+
+def test_on_room_called_at_low_watermark():
+    sock = socket.socket()
+    ingress = IngressQueue(limit=8, per_socket=8)
+    calls = []
+    ingress.on_room = lambda: calls.append(len(ingress))
+    for idx in range(8):
+        ingress.try_put(sock, str(idx))
+    assert not ingress.try_put(sock, "8")
+    while ingress.get(blocking=False):
+        pass
+    # called once, when a quarter of the queue was free
+    assert calls == [6]
+    ingress.resumed(sock)
+    assert ingress.stats().paused == 0
+    sock.close()
+
+
+def test_put_waits_for_room():
+    sock = socket.socket()
+    ingress = IngressQueue(limit=4, per_socket=2)
+    ingress.put(sock, "first")
+    ingress.put(sock, "second")
+    assert not ingress.put(sock, "timed out", timeout=0.01)
+
+    producer = threading.Thread(target=ingress.put, args=(sock, "third"))
+    producer.start()
+    assert ingress.get() == (sock, "first")
+    producer.join(1)
+    assert not producer.is_alive()
+    assert [ingress.get(timeout=0.1), ingress.get(timeout=0.1), ingress.get(timeout=0.01)] == [
+        (sock, "second"),
+        (sock, "third"),
+        None,
+    ]
+    sock.close()
+
+
+def test_get_many():
+    first, second = socket.socket(), socket.socket()
+    ingress = IngressQueue()
+    for idx in range(3):
+        ingress.put(first, f"first {idx}")
+        ingress.put(second, f"second {idx}")
+    assert ingress.get_many(4) == [(first, "first 0"), (second, "second 0"), (first, "first 1"), (second, "second 1")]
+    assert len(ingress.get_many(10)) == 2
+    assert ingress.get_many(10, timeout=0.01) == []
+    assert ingress.stats().depth == 0
+    first.close()
+    second.close()
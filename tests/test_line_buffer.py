@@ -0,0 +1,65 @@
+from psirc.line_buffer import LineBuffer
+import pytest
+
+
+def test_complete_lines():
+    buffer = LineBuffer()
+    assert buffer.feed(b"NICK alice\r\nUSER alice host serv :Real Name\r\n") == [
+        "NICK alice",
+        "USER alice host serv :Real Name",
+    ]
+    assert len(buffer) == 0
+
+
+def test_line_split_between_chunks():
+    buffer = LineBuffer()
+    assert buffer.feed(b"PRIVMSG #chan :hel") == []
+    assert buffer.feed(b"lo\r") == []
+    assert buffer.feed(b"\nPING x\r\n") == ["PRIVMSG #chan :hello", "PING x"]
+
+
+def test_codepoint_split_between_chunks():
+    buffer = LineBuffer()
+    data = "PRIVMSG #chan :zażółć\r\n".encode()
+    split = data.index("ż".encode()) + 1
+    assert buffer.feed(data[:split]) == []
+    assert buffer.feed(data[split:]) == ["PRIVMSG #chan :zażółć"]
+    assert buffer.dropped == 0
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (b"NICK a\n", ["NICK a"]),
+        (b"\r\n\r\nNICK a\r\n", ["NICK a"]),
+        (b"NICK a\r\nNICK b", ["NICK a"]),
+    ],
+)
+def test_line_endings(data, expected):
+    assert LineBuffer().feed(data) == expected
+
+
+def test_invalid_unicode_drops_only_one_line():
+    buffer = LineBuffer()
+    assert buffer.feed(b"PRIVMSG #chan :\xff\xfe\r\nPING x\r\n") == ["PING x"]
+    assert buffer.dropped == 1
+
+
+def test_overlong_complete_line():
+    buffer = LineBuffer()
+    assert buffer.feed(b"PRIVMSG #chan :" + b"a" * 600 + b"\r\nPING x\r\n") == ["PING x"]
+    assert buffer.dropped == 1
+
+
+def test_overlong_line_in_chunks():
+    buffer = LineBuffer()
+    assert buffer.feed(b"PRIVMSG #chan :" + b"a" * 500) == []
+    assert buffer.feed(b"a" * 500) == []
+    assert len(buffer) == 0
+    assert buffer.feed(b"a" * 100 + b"\r\nPING x\r\n") == ["PING x"]
+    assert buffer.dropped == 1
+
+
+def test_max_length_line():
+    line = b"PRIVMSG #chan :" + b"a" * (510 - 15)
+    assert LineBuffer().feed(line + b"\r\n") == [line.decode()]
@@ -0,0 +1,53 @@
+import io
+import logging
+
+import pytest
+
+from psirc.log_config import DroppingQueueHandler, SampleFilter, configure_logging, message_log
+
+
+def make_record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("psirc.messages", logging.DEBUG, __file__, 0, message, (), None)
+
+
+def test_sample_filter_passes_every_nth():
+    sample = SampleFilter(3)
+    assert [sample.filter(make_record(str(idx))) for idx in range(7)] == [True, False, False, True, False, False, True]
+
+
+def test_dropping_queue_handler_never_blocks():
+    handler = DroppingQueueHandler(2)
+    for idx in range(5):
+        handler.handle(make_record(str(idx)))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    message_level, message_filters = message_log.level, message_log.filters[:]
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    message_log.setLevel(message_level)
+    message_log.filters[:] = message_filters
+
+
+def test_message_log_off_by_default(restore_logging):
+    stream = io.StringIO()
+    assert configure_logging(logging.DEBUG, queued=False, stream=stream) is None
+    message_log.debug("Received message: %s", "PRIVMSG nick :hello")
+    logging.info("server started")
+    assert "PRIVMSG" not in stream.getvalue()
+    assert "server started" in stream.getvalue()
+
+    listener = configure_logging(logging.INFO, messages=True, sample=2, stream=stream)
+    for idx in range(4):
+        message_log.debug("Received message: %s", idx)
+    listener.stop()
+    assert stream.getvalue().count("Received message") == 2
@@ -1,4 +1,5 @@
 from psirc.message import Prefix, Params, Message
+from psirc.defines.responses import Command
 import pytest
 
 Prefix.sender = "example.com"
@@ -38,3 +39,49 @@ def test_prefix(sender, user, host):
 )
 def test_prefix_string(prefix, expected_str):
     assert str(prefix) == expected_str
+
+
+def test_message_bytes_cached():
+    message = Message(prefix=Prefix("nick", "user", "host"), command=Command.PRIVMSG, params=Params({"receiver": "#chan", "trailing": "hi"}))
+    data = message.to_bytes()
+    assert data == b":nick!user@host PRIVMSG #chan :hi\r\n"
+    assert data == str(message).encode()
+    assert message.to_bytes() is data
+
+
+@pytest.mark.parametrize(
+    ("mutate", "expected"),
+    [
+        (lambda msg: setattr(msg, "prefix", Prefix("other")), b":other PRIVMSG #chan :hi\r\n"),
+        (lambda msg: setattr(msg.prefix, "host", "elsewhere"), b":nick!user@elsewhere PRIVMSG #chan :hi\r\n"),
+        (lambda msg: msg.params.__setitem__("trailing", "bye"), b":nick!user@host PRIVMSG #chan :bye\r\n"),
+        (lambda msg: setattr(msg, "params", None), b":nick!user@host PRIVMSG\r\n"),
+    ],
+)
+def test_message_bytes_invalidated(mutate, expected):
+    message = Message(prefix=Prefix("nick", "user", "host"), command=Command.PRIVMSG, params=Params({"receiver": "#chan", "trailing": "hi"}))
+    message.to_bytes()
+    mutate(message)
+    assert message.to_bytes() == expected
+
+
+def test_params_tuple_backed():
+    params = Params.from_values(("nickname", "hopcount"), ("nick", "1"))
+    assert params.params == {"nickname": "nick", "hopcount": "1"}
+    assert "hopcount" in params and "trailing" not in params
+    assert str(params) == "nick 1"
+    params["hopcount"] = "2"
+    params["trailing"] = "text"
+    assert params.params == {"nickname": "nick", "hopcount": "2", "trailing": "text"}
+    assert str(params) == "nick 2 :text"
+    with pytest.raises(KeyError):
+        params["port"]
+
+
+def test_params_slotted():
+    params = Params({"receiver": "#chan"}, recepient="nick")
+    assert str(params) == "nick #chan"
+    params.recepient = "other"
+    assert str(params) == "other #chan"
+    with pytest.raises(AttributeError):
+        params.extra = "value"
@@ -69,3 +69,53 @@ def test_parse_params(text, params):
     assert isinstance(msg, Message)
     assert isinstance(msg.params, Params)
     assert params == msg.params.params
+
+
+@pytest.mark.parametrize(
+    ("text", "command"),
+    [
+        ("001 nick :Welcome", Command.RPL_WELCOME),
+        ("1 nick :Welcome", Command.RPL_WELCOME),
+        ("403 nick #chan", Command.ERR_NOSUCHCHANNEL),
+        ("999 nick", None),
+        ("UNKNOWN param", None),
+        (":prefix", None),
+        (": NICK nick", None),
+        ("", None),
+    ],
+)
+def test_parse_command_lookup(text, command):
+    msg = MessageParser.parse_message(text)
+    assert (msg.command if msg else None) == command
+
+
+@pytest.mark.parametrize(
+    ("text", "params"),
+    [
+        ("PRIVMSG  #fishing   :Going  fishing : today!", {"receiver": "#fishing", "trailing": "Going  fishing : today!"}),
+        ("PRIVMSG #fishing", None),
+        ("PRIVMSG #fishing :", None),
+        ("PRIVMSG :#fishing", None),
+        ("NICK newnick 2 extra", {"nickname": "newnick", "hopcount": "2"}),
+        ("USER guest tolmoon tolsun :Ronnie Reagan", {"username": "guest", "hostname": "tolmoon", "servername": "tolsun", "realname": "Ronnie Reagan"}),
+        ("QUIT :Gone to have lunch", {"trailing": "Gone to have lunch"}),
+        ("REHASH :now", None),
+    ],
+)
+def test_parse_params_edge_cases(text, params):
+    msg = MessageParser.parse_message(text)
+    assert isinstance(msg, Message)
+    assert (msg.params.params if msg.params else None) == params
+
+
+def test_prefix_parsed_lazily():
+    msg = MessageParser.parse_message(":bad..prefix PING client1")
+    assert isinstance(msg, Message)
+    assert msg._raw_prefix == "bad..prefix"
+    assert msg.prefix is None
+    assert str(msg) == "PING client1\r\n"
+
+    msg = MessageParser.parse_message(":nick!user@host PING client1")
+    assert isinstance(msg, Message)
+    msg.prefix = Prefix("other")
+    assert str(msg) == ":other PING client1\r\n"
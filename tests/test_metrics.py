@@ -0,0 +1,52 @@
+import math
+
+from psirc.defines.responses import Command
+from psirc.metrics import Histogram, LinkStats, Metrics
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for seconds in (0.000005, 0.00001, 0.00002, 0.003, 2.0):
+        histogram.observe(seconds)
+    assert histogram.count == 5
+    assert histogram.counts[0] == 2  # bounds are inclusive
+    assert histogram.counts[1] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.quantile(0.5) == 2.5e-5
+    assert histogram.quantile(0.8) == 5e-3
+    assert histogram.quantile(1) == math.inf
+    assert Histogram().quantile(0.99) == 0
+
+
+def test_commands_counted():
+    metrics = Metrics()
+    metrics.observe_command(Command.PRIVMSG, 0.0001)
+    metrics.observe_command(Command.PRIVMSG, 0.0002, failed=True)
+    metrics.observe_command(Command.JOIN, 0.001)
+    stats = metrics.commands()
+    assert [(stat.command, stat.calls, stat.errors) for stat in stats] == [("JOIN", 1, 0), ("PRIVMSG", 2, 1)]
+    # snapshot is not changed by later observations
+    metrics.observe_command(Command.JOIN, 0.001)
+    assert stats[0].latency.count == 1
+
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    metrics.observe_command(Command.NICK, 0.00003)
+    metrics.observe_parse(0.000001)
+    metrics.observe_parse(0.000001, valid=False)
+    text = metrics.render(
+        {"psirc_ingress_depth": 3}, {"psirc_ingress_dropped_total": 1}, [LinkStats('a"b', 0, 1, 10, 2, 20, 5)]
+    )
+    lines = text.splitlines()
+    assert 'psirc_command_duration_seconds_bucket{command="NICK",le="2.5e-05"} 0' in lines
+    assert 'psirc_command_duration_seconds_bucket{command="NICK",le="5e-05"} 1' in lines
+    assert 'psirc_command_duration_seconds_bucket{command="NICK",le="+Inf"} 1' in lines
+    assert 'psirc_command_duration_seconds_count{command="NICK"} 1' in lines
+    assert 'psirc_command_errors_total{command="NICK"} 0' in lines
+    assert "psirc_parse_duration_seconds_count 2" in lines
+    assert "psirc_invalid_messages_total 1" in lines
+    assert "# TYPE psirc_ingress_depth gauge" in lines
+    assert "psirc_ingress_dropped_total 1" in lines
+    assert 'psirc_connection_received_bytes_total{peer="a\\"b"} 20' in lines
+    assert text.endswith("\n")
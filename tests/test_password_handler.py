@@ -0,0 +1,53 @@
+from psirc.password_handler import PasswordHandler
+import pytest
+
+
+def test_password_handler_first_match(tmp_path):
+    config = tmp_path / "psirc.conf"
+    config.write_text("I:doaads@*:inne_haslo:\nI:*@127.*:p@ssw0rd:\nI:*@10.0.0.0/8::\n")
+    handler = PasswordHandler(str(config))
+    handler.parse_config()
+    assert handler.valid_user_password("doaads@127.0.0.1", "inne_haslo")
+    assert not handler.valid_user_password("doaads@127.0.0.1", "p@ssw0rd")
+    assert handler.valid_user_password("user@127.0.0.1", "p@ssw0rd")
+    assert handler.valid_user_password("user@10.1.2.3", None)
+    assert not handler.valid_user_password("user@11.1.2.3", None)
+
+
+def test_ipv6_i_lines(tmp_path):
+    config = tmp_path / "psirc.conf"
+    config.write_text("I:*@fe80::/10:linklocal:\nI:admin@::1::\nI:*@127.*:p@ssw0rd:\n")
+    handler = PasswordHandler(str(config))
+    handler.parse_config()
+    assert handler.valid_user_password("user@fe80::1", "linklocal")
+    assert not handler.valid_user_password("user@fe80::1", None)
+    assert handler.valid_user_password("admin@::1", None)
+    assert not handler.valid_user_password("user@::1", None)
+    assert handler.valid_user_password("user@127.0.0.1", "p@ssw0rd")
+
+
+def test_reload_replaces_table(tmp_path):
+    config = tmp_path / "psirc.conf"
+    config.write_text("I:*@*:first:\nO:operator:oper_passwd:\n")
+    handler = PasswordHandler(str(config))
+    handler.parse_config()
+    credentials = handler._credentials
+
+    config.write_text("I:*@*:second:\nO:admin:admin_passwd:\nI:broken\n")
+    handler.parse_config()
+    assert handler.valid_user_password("user@127.0.0.1", "second")
+    assert handler.valid_operator("admin", "admin_passwd")
+    assert not handler.valid_operator("operator", "oper_passwd")
+    # previous table is left untouched for checks already using it
+    assert credentials.passwords["I"] == {"*@*": "first"}
+
+
+def test_failed_reload_keeps_table(tmp_path):
+    config = tmp_path / "psirc.conf"
+    config.write_text("I:*@*::\n")
+    handler = PasswordHandler(str(config))
+    handler.parse_config()
+    config.unlink()
+    with pytest.raises(OSError):
+        handler.parse_config()
+    assert handler.valid_user_password("user@127.0.0.1", None)
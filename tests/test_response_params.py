@@ -0,0 +1,29 @@
+import pytest
+
+from psirc.defines.responses import Command
+from psirc.message import Message, Prefix
+from psirc.response_params import CMD_PARAMS, REPLY_TEMPLATES, parametrize
+
+
+def reference(command, prefix, recepient, values):
+    params = parametrize(command, recepient=recepient, **values)
+    return Message(prefix=prefix, command=command, params=params).to_bytes()
+
+
+@pytest.mark.parametrize("command", sorted(REPLY_TEMPLATES, key=lambda command: command.value))
+def test_template_matches_parametrize(command):
+    values = {name.strip("[]"): f"v{idx}" for idx, name in enumerate(CMD_PARAMS.get(command, []))}
+    if "trailing" in values:
+        values["trailing"] = "text with spaces"
+    prefix = Prefix("alpha.server")
+    template = REPLY_TEMPLATES[command]
+    assert template.format("", "alice", values) == reference(command, None, "alice", values)
+    assert template.format(str(prefix), "alice", values) == reference(command, prefix, "alice", values)
+
+
+def test_template_refuses_incomplete_params():
+    topic = REPLY_TEMPLATES[Command.RPL_TOPIC]
+    assert topic.format("", "alice", {"channel": "#a"}) is None
+    assert topic.format("", None, {"channel": "#a", "trailing": "topic"}) is None
+    # replies without parameters only need the recepient
+    assert REPLY_TEMPLATES[Command.RPL_WELCOME].format("", "alice", {}) == b"001 alice :Welcome to the server!\r\n"
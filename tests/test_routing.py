@@ -0,0 +1,275 @@
+import socket
+
+import pytest
+
+from psirc.command_manager import MAX_TARGETS
+from psirc.defines.responses import Command
+from psirc.send_queue import SendQueue
+from psirc.server import IRCServer
+
+
+class Peer:
+    """Connection to the tested server over a socket pair, its lines are handled by the test"""
+
+    def __init__(self, server: IRCServer) -> None:
+        self.server = server
+        self.socket, self._remote = socket.socketpair()
+        self._remote.setblocking(False)
+        SendQueue.attach(self.socket, on_pending=lambda send_queue: None, on_exceeded=lambda send_queue: None)
+
+    def send(self, *lines: str) -> None:
+        self.server.handle_batch([(self.socket, line) for line in lines])
+
+    def received(self) -> list[str]:
+        data = b""
+        try:
+            while chunk := self._remote.recv(65536):
+                data += chunk
+        except BlockingIOError:
+            pass
+        return data.decode().splitlines()
+
+    def close(self) -> None:
+        SendQueue.detach(self.socket)
+        self.socket.close()
+        self._remote.close()
+
+
+class Network:
+    """Server named alpha.server with users and server links connected to it"""
+
+    def __init__(self, config_file: str) -> None:
+        self.server = IRCServer("alpha.server", "127.0.0.1", 0, config_file=config_file, connection_mode="selector")
+        self.server.password_handler.parse_config()
+        self.peers: list[Peer] = []
+
+    def user(self, nickname: str, *channels: str) -> Peer:
+        peer = self._connect()
+        peer.send(f"NICK {nickname}", f"USER {nickname} host server :Test", *(f"JOIN {channel}" for channel in channels))
+        peer.received()
+        return peer
+
+    def link(self, name: str, *burst: str) -> Peer:
+        """Link a server, ``burst`` is sent after SERVER and ended with PING"""
+        peer = self._connect()
+        peer.send("PASS linkpw", f":{name} SERVER {name} 1 :Test", *burst, f"PING {name}")
+        peer.received()
+        return peer
+
+    def _connect(self) -> Peer:
+        peer = Peer(self.server)
+        self.peers.append(peer)
+        return peer
+
+    def close(self) -> None:
+        for peer in self.peers:
+            peer.close()
+        self.server._connection._socket.close()
+
+
+@pytest.fixture
+def network(tmp_path):
+    config_file = tmp_path / "psirc.conf"
+    config_file.write_text("I:*@*::\nC:*:linkpw:\n")
+    network = Network(str(config_file))
+    yield network
+    network.close()
+
+
+def test_relayed_quit_keeps_reason(network):
+    alice = network.user("alice", "#a")
+    beta = network.link("beta.server", "NICK bob 1", "NICK carol 1", ":bob JOIN #a")
+    gamma = network.link("gamma.server")
+    alice.received()
+
+    beta.send(":bob QUIT :gone fishing")
+    assert alice.received() == [":bob QUIT :gone fishing"]
+    assert gamma.received() == [":bob QUIT :gone fishing"]
+    assert network.server._users.get_user("bob") is None
+
+    # nickname is the default reason
+    beta.send(":carol QUIT")
+    assert gamma.received() == [":carol QUIT :carol"]
+
+
+def test_burst_relayed_with_hop_counts(network):
+    alice = network.user("alice", "#a")
+    gamma = network.link("gamma.server")
+    network.link("beta.server", "NICK bob 1", "NICK carol 2", ":bob JOIN #a", ":carol JOIN #b")
+    assert network.server.get_external_users() == {"bob": 2, "carol": 3}
+    assert alice.received() == [":bob JOIN #a"]
+    # introduced users reach servers two hops from beta, as a burst of their own
+    assert gamma.received() == [
+        ":beta.server SERVER beta.server 2 :Test",
+        "NICK bob 2",
+        "NICK carol 3",
+        ":bob JOIN #a",
+        ":carol JOIN #b",
+        "PING alpha.server",
+    ]
+
+    # and are sent on with the same hop counts to servers linked later
+    delta = network._connect()
+    delta.send("PASS linkpw", ":delta.server SERVER delta.server 1 :Test")
+    received = delta.received()
+    assert "NICK bob 2" in received and "NICK carol 3" in received
+
+
+def test_users_introduced_after_burst_registered_at_once(network):
+    alice = network.user("alice", "#a")
+    beta = network.link("beta.server", "NICK bob 1")
+    gamma = network.link("gamma.server")
+    alice.received()
+    beta.received()
+
+    beta.send("NICK dave 1")
+    assert network.server.get_external_users() == {"bob": 2, "dave": 2}
+    assert gamma.received() == ["NICK dave 2"]
+    alice.send("PRIVMSG dave :hi")
+    assert alice.received() == []
+    assert beta.received() == [":alice!alice@alpha.server PRIVMSG dave :hi"]
+
+    beta.send(":dave JOIN #a")
+    assert alice.received() == [":dave JOIN #a"]
+
+    # collisions with users already known are detected
+    beta.send("NICK alice 1")
+    assert "alice" not in network.server.get_external_users()
+    assert gamma.received() == []
+
+
+def test_channel_privmsg_relayed_by_server(network):
+    alice = network.user("alice", "#a")
+    beta = network.link("beta.server", "NICK bob 1", "NICK dave 1", ":bob JOIN #a")
+    gamma = network.link("gamma.server", "NICK carol 1", ":carol JOIN #a")
+    alice.received()
+    beta.received()
+
+    # membership is checked for the user named in the prefix, not for the relaying server
+    beta.send(":bob PRIVMSG #a :hello")
+    assert alice.received() == [":bob PRIVMSG #a :hello"]
+    assert gamma.received() == [":bob PRIVMSG #a :hello"]
+    assert beta.received() == []
+
+    beta.send(":dave PRIVMSG #a :not a member")
+    assert alice.received() == []
+    assert gamma.received() == []
+
+
+def test_served_sockets_send_without_delay(network):
+    listener = socket.create_server(("127.0.0.1", 0))
+    client = socket.create_connection(listener.getsockname())
+    served, _ = listener.accept()
+    try:
+        network.server._connection._attach_send_queue(served)
+        assert served.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    finally:
+        SendQueue.detach(served)
+        for sock in (served, client, listener):
+            sock.close()
+
+
+def test_privmsg_too_many_targets(network):
+    alice = network.user("alice")
+    bob = network.user("bob")
+    targets = ",".join(["bob"] + [f"nick{idx}" for idx in range(MAX_TARGETS)])
+
+    alice.send(f"PRIVMSG {targets} :hi")
+    assert alice.received() == [f"407 alice {targets} :Duplicate recipients, No message delivered"]
+    assert bob.received() == []
+
+
+def test_privmsg_drops_duplicate_receivers(network):
+    alice = network.user("alice")
+    bob = network.user("bob")
+
+    # repeated receivers do not count towards MAX_TARGETS
+    alice.send("PRIVMSG " + ",".join(["bob"] * (MAX_TARGETS + 1)) + " :hi")
+    assert alice.received() == []
+    assert bob.received() == [":alice!alice@alpha.server PRIVMSG bob :hi"]
+
+
+def test_privmsg_one_copy_per_socket(network):
+    alice = network.user("alice", "#a", "#b")
+    bob = network.user("bob", "#a", "#b")
+    alice.received()
+
+    alice.send("PRIVMSG #a,bob,#b :hi")
+    assert bob.received() == [":alice!alice@alpha.server PRIVMSG #a :hi"]
+    assert alice.received() == []
+
+
+def test_privmsg_one_copy_per_link(network):
+    alice = network.user("alice", "#a")
+    beta = network.link("beta.server", "NICK bob 1", "NICK carol 1", ":carol JOIN #a")
+    gamma = network.link("gamma.server", "NICK dave 1", ":dave JOIN #a")
+    alice.received()
+    beta.received()
+
+    alice.send("PRIVMSG bob,carol,#a :hi")
+    assert beta.received() == [":alice!alice@alpha.server PRIVMSG bob,carol,#a :hi"]
+    assert gamma.received() == [":alice!alice@alpha.server PRIVMSG #a :hi"]
+
+
+def test_privmsg_partial_delivery(network):
+    alice = network.user("alice", "#a")
+    bob = network.user("bob", "#a")
+    carol = network.user("carol")
+    alice.received()
+    bob.received()
+
+    alice.send("PRIVMSG nobody,#a,#none,carol :hi")
+    assert alice.received() == ["401 alice nobody :No such nick/channel", "403 alice #none :No such channel"]
+    assert bob.received() == [":alice!alice@alpha.server PRIVMSG #a :hi"]
+    assert carol.received() == [":alice!alice@alpha.server PRIVMSG carol :hi"]
+
+    alice.send("PRIVMSG nobody,carol :bye")
+    assert alice.received() == ["401 alice nobody :No such nick/channel"]
+    assert carol.received() == [":alice!alice@alpha.server PRIVMSG carol :bye"]
+
+
+def test_nickname_claimed_once(network):
+    first = network._connect()
+    second = network._connect()
+    first.send("NICK alice")
+    second.send("NICK alice")
+    assert second.received() == ["436 *"]
+
+    # the second connection is not registered under the claimed nickname
+    second.send("USER alice host server :Test")
+    assert second.received() == ["431 * :No nickname given"]
+    first.send("USER alice host server :Test")
+    assert first.received()[0].startswith("001 alice ")
+
+
+def test_nickname_released_by_lost_connection(network):
+    first = network._connect()
+    first.send("NICK alice", network.server._connection.CONNECTION_LOST)
+    second = network._connect()
+    second.send("NICK alice", "USER alice host server :Test")
+    assert second.received()[0].startswith("001 alice ")
+
+
+def test_nickname_introduced_by_server_during_registration(network):
+    alice = network._connect()
+    alice.send("NICK alice")
+    beta = network.link("beta.server")
+    beta.send("NICK alice 1")
+
+    alice.send("USER alice host server :Test")
+    assert alice.received() == ["436 *"]
+    assert network.server.get_external_users() == {"alice": 2}
+    alice.send("NICK alice2", "USER alice2 host server :Test")
+    assert alice.received()[0].startswith("001 alice2 ")
+
+
+def test_handler_error_counted_and_not_raised(network, monkeypatch):
+    def fail(server, client_socket, session_info, message):
+        raise ValueError("broken handler")
+
+    alice = network.user("alice")
+    monkeypatch.setitem(network.server._commands, Command.PING, fail)
+    alice.send("PING alpha.server", "PRIVMSG alice :still served")
+    assert alice.received() == [":alice!alice@alpha.server PRIVMSG alice :still served"]
+    stats = {stats.command: stats for stats in network.server.metrics.commands()}
+    assert stats["PING"].errors == 1
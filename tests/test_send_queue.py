@@ -0,0 +1,144 @@
+import socket
+from psirc.send_queue import SendQueue
+import pytest
+
+
+@pytest.fixture
+def sockets():
+    sender, receiver = socket.socketpair()
+    sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    yield sender, receiver
+    SendQueue.detach(sender)
+    sender.close()
+    receiver.close()
+
+
+def read_all(receiver):
+    receiver.setblocking(False)
+    data = b""
+    try:
+        while chunk := receiver.recv(65536):
+            data += chunk
+    except BlockingIOError:
+        pass
+    return data
+
+
+def test_put_sends_immediately(sockets):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue.attach(sender, on_pending=pending.append, on_exceeded=exceeded.append)
+    assert SendQueue.of(sender) is send_queue
+    send_queue.put(b"PING a\r\n")
+    send_queue.put(b"PING b\r\n")
+    assert read_all(receiver) == b"PING a\r\nPING b\r\n"
+    assert send_queue.size == 0
+    assert not pending and not exceeded
+
+
+def test_slow_reader_keeps_data_queued(sockets):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue(sender, on_pending=pending.append, on_exceeded=exceeded.append)
+    lines = [f"PRIVMSG #chan :{i:05} {'x' * 400}\r\n".encode() for i in range(200)]
+    for line in lines:
+        send_queue.put(line)
+    assert pending == [send_queue]
+    assert send_queue.size > 0
+
+    received = b""
+    while True:
+        received += read_all(receiver)
+        if send_queue.flush():
+            break
+    received += read_all(receiver)
+    assert received == b"".join(lines)
+    assert send_queue.size == 0
+    assert not exceeded
+
+
+def test_limit_exceeded(sockets):
+    sender, _ = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue(sender, 8192, on_pending=pending.append, on_exceeded=exceeded.append)
+    for _ in range(200):
+        send_queue.put(b"x" * 510 + b"\r\n")
+    assert exceeded == [send_queue]
+    assert send_queue.closed
+    assert send_queue.size == 0
+
+
+def test_detach():
+    sender, receiver = socket.socketpair()
+    send_queue = SendQueue.attach(sender, on_pending=print, on_exceeded=print)
+    SendQueue.detach(sender)
+    assert SendQueue.of(sender) is None
+    assert send_queue.closed
+    sender.close()
+    receiver.close()
+
+
+def test_stream_keeps_order_and_limit(sockets):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue(sender, 16384, on_pending=pending.append, on_exceeded=exceeded.append)
+    chunks = [f"NICK user{i:05} 1\r\n".encode() * 100 for i in range(100)]
+    send_queue.put(b"SERVER a 1 :a\r\n")
+    send_queue.put_stream(iter(chunks))
+    send_queue.put(b"PING a\r\n")
+    assert send_queue.size <= 16384
+
+    received = b""
+    while True:
+        received += read_all(receiver)
+        if send_queue.flush():
+            break
+    received += read_all(receiver)
+    assert received == b"SERVER a 1 :a\r\n" + b"".join(chunks) + b"PING a\r\n"
+    assert send_queue.size == 0
+    assert not exceeded
+
+
+def test_corked_writes_once(sockets, monkeypatch):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue.attach(sender, on_pending=pending.append, on_exceeded=exceeded.append)
+    calls = []
+    flush = send_queue.flush
+    monkeypatch.setattr(send_queue, "flush", lambda: calls.append(1) or flush())
+    with SendQueue.corked():
+        send_queue.put(b"PING a\r\n")
+        send_queue.put(b"PING b\r\n")
+        assert read_all(receiver) == b""
+    assert read_all(receiver) == b"PING a\r\nPING b\r\n"
+    assert len(calls) == 1
+    send_queue.put(b"PING c\r\n")
+    assert read_all(receiver) == b"PING c\r\n"
+    assert len(calls) == 2
+
+
+def test_corked_stream_writes_once(sockets, monkeypatch):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue.attach(sender, on_pending=pending.append, on_exceeded=exceeded.append)
+    calls = []
+    flush = send_queue.flush
+    monkeypatch.setattr(send_queue, "flush", lambda: calls.append(1) or flush())
+    with SendQueue.corked():
+        send_queue.put_stream(iter([b"353 a = #chan :a\r\n", b"366 a #chan :End of /NAMES list\r\n"]))
+        send_queue.put(b"PING a\r\n")
+        assert read_all(receiver) == b""
+    assert read_all(receiver) == b"353 a = #chan :a\r\n366 a #chan :End of /NAMES list\r\nPING a\r\n"
+    assert len(calls) == 1
+
+
+def test_limit_exceeded_sends_error(sockets):
+    sender, receiver = sockets
+    pending, exceeded = [], []
+    send_queue = SendQueue(sender, 1024, on_pending=pending.append, on_exceeded=exceeded.append)
+    send_queue.put(b"PING a\r\n")
+    send_queue.put(b"x" * 2048)
+    assert read_all(receiver) == b"PING a\r\nERROR :SendQ exceeded\r\n"
+    assert exceeded == [send_queue]
+    assert send_queue.closed
@@ -0,0 +1,61 @@
+import socket
+from psirc.session_info import SessionType
+from psirc.session_info_manager import SessionInfoManager
+import pytest
+
+
+@pytest.fixture
+def sockets():
+    sockets = [socket.socket() for _ in range(3)]
+    yield sockets
+    for sock in sockets:
+        sock.close()
+
+
+def test_get_socket_follows_nickname(sockets):
+    sessions = SessionInfoManager()
+    sessions.add(sockets[0], None)
+    info = sessions.get_info(sockets[0])
+    assert info
+    assert sessions.get_socket("nick") is None
+    info.nickname = "nick"
+    assert sessions.get_socket("nick") is sockets[0]
+    info.nickname = "other"
+    assert sessions.get_socket("nick") is None
+    assert sessions.get_socket("other") is sockets[0]
+    sessions.remove(sockets[0])
+    assert sessions.get_socket("other") is None
+    info.nickname = "again"
+    assert sessions.get_socket("again") is None
+
+
+def test_colliding_nickname_handed_over(sockets):
+    sessions = SessionInfoManager()
+    for sock in sockets[:2]:
+        sessions.add(sock, None)
+        info = sessions.get_info(sock)
+        assert info
+        info.nickname = "nick"
+    assert sessions.get_socket("nick") is sockets[0]
+    sessions.remove(sockets[0])
+    assert sessions.get_socket("nick") is sockets[1]
+
+
+def test_sessions_by_type(sockets):
+    sessions = SessionInfoManager()
+    for sock in sockets:
+        sessions.add(sock, None)
+    assert list(sessions.get_sessions_by_type(SessionType.UNKNOWN)) == sockets
+    assert sessions.get_sessions_by_type(SessionType.SERVER) == {}
+
+    servers = sessions.get_sessions_by_type(SessionType.SERVER)
+    info = sessions.get_info(sockets[1])
+    assert info
+    info.type = SessionType.SERVER
+    assert sessions.get_sessions_by_type(SessionType.SERVER) == {sockets[1]: info}
+    assert sessions.get_sessions_by_type(SessionType.SERVER) is sessions.get_sessions_by_type(SessionType.SERVER)
+    assert servers == {}
+    assert list(sessions.get_sessions_by_type(SessionType.UNKNOWN)) == [sockets[0], sockets[2]]
+
+    sessions.remove(sockets[1])
+    assert sessions.get_sessions_by_type(SessionType.SERVER) == {}
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from psirc.throttle import AcceptThrottle, RateLimit, TokenBucket
+
+
+def test_bucket_burst_then_rate():
+    bucket = TokenBucket(0.5, 5)
+    now = time.monotonic()
+    assert all(bucket.take(now) == 0 for _ in range(5))
+    assert bucket.take(now) == pytest.approx(2)
+    assert bucket.take(now + 1) == pytest.approx(1)
+    assert bucket.take(now + 2) == 0
+    assert not bucket.full(now + 2)
+    assert bucket.full(now + 100)
+
+
+def test_rate_limit_parse():
+    assert RateLimit.parse("0.5:5") == RateLimit(0.5, 5)
+    assert RateLimit.parse("2") == RateLimit(2, 1)
+    with pytest.raises(ValueError):
+        RateLimit.parse("0:5")
+    with pytest.raises(ValueError):
+        RateLimit.parse("fast")
+
+
+def test_accept_throttle_per_address():
+    throttle = AcceptThrottle(RateLimit(1, 2))
+    now = time.monotonic()
+    assert throttle.allow("10.0.0.1", now)
+    assert throttle.allow("10.0.0.1", now)
+    assert not throttle.allow("10.0.0.1", now)
+    assert throttle.allow("10.0.0.2", now)
+    assert throttle.allow("10.0.0.1", now + 1)
+
+
+def test_accept_throttle_drops_full_buckets():
+    throttle = AcceptThrottle(RateLimit(1, 1), max_addresses=2)
+    now = time.monotonic()
+    throttle.allow("10.0.0.1", now)
+    throttle.allow("10.0.0.2", now)
+    throttle.allow("10.0.0.3", now + 10)
+    assert len(throttle) == 1
@@ -53,3 +53,54 @@ def test_remove_from_server():
     assert len(manager.list_users()) == 2
     assert any([user == "nickname" for user in manager.list_users()])
     assert any([user == "nickname3" for user in manager.list_users()])
+
+
+def test_remove_from_server_index():
+    manager = ClientManager()
+    manager.add_external("nickname1", 1, "server_nickname")
+    manager.add_external("nickname2", 2, "server_nickname")
+    manager.remove("nickname1")
+    assert [user.nick for user in manager.remove_from_server("server_nickname")] == ["nickname2"]
+    assert manager.remove_from_server("server_nickname") == []
+    assert manager.list_users() == []
+
+
+def test_remove_servers_behind():
+    manager = ClientManager()
+    manager.add_server("neighbour", 1)
+    manager.add_server("remote", 2, "neighbour")
+    manager.add_server("other", 1)
+    removed = manager.remove_servers_behind("neighbour")
+    assert sorted(irc_server.nick for irc_server in removed) == ["neighbour", "remote"]
+    assert list(manager.list_servers()) == ["other"]
+
+
+def test_add_external_many():
+    manager = ClientManager()
+    manager.add_local("taken", None)
+    rejected = manager.add_external_many([("nickname1", 2, "remote"), ("taken", 2, "remote"), ("nickname2", 3, "remote")])
+    assert rejected == ["taken"]
+    assert manager.get_user("nickname2").hop_count == 3
+    assert sorted(user.nick for user in manager.remove_from_server("remote")) == ["nickname1", "nickname2"]
+
+
+def test_reserve_nickname():
+    manager = ClientManager()
+    assert manager.reserve("nickname", "socket")
+    assert manager.reserve("nickname", "socket")
+    assert not manager.reserve("nickname", "other_socket")
+    with pytest.raises(NickAlreadyInUse):
+        manager.add_local("nickname", "other_socket")
+    manager.add_local("nickname", "socket")
+    assert not manager.reserve("nickname", "socket")
+
+
+def test_reserve_releases_previous_nickname():
+    manager = ClientManager()
+    manager.reserve("first", "socket")
+    manager.reserve("second", "socket")
+    assert manager.reserve("first", "other_socket")
+    manager.release("second", "other_socket")
+    assert not manager.reserve("second", "other_socket")
+    manager.release("second", "socket")
+    assert manager.reserve("second", "other_socket")